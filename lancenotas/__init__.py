@@ -1,9 +1,19 @@
 from flask import Flask
 
 from .config import Settings
+from . import readonly  # noqa: F401  (registra a proteção de escrita em GET/HEAD)
 from .extensions import db, login_manager, migrate
 from .routes import register_blueprints
-from .cli import create_professor_command
+from .services.agenda import carregar_feriados
+from .services.dashboard_cache import dashboard_cache
+from .cli import (
+    create_professor_command,
+    import_turmas_command,
+    purge_sync_command,
+    rebuild_busca_command,
+    rebuild_stats_command,
+    rollup_dashboard_command,
+)
 
 
 def create_app() -> Flask:
@@ -28,6 +38,13 @@ def create_app() -> Flask:
         SQLALCHEMY_DATABASE_URI=database_url,
         SQLALCHEMY_TRACK_MODIFICATIONS=False,
         MAX_CONTENT_LENGTH=8 * 1024 * 1024,  # 8MB
+        ETAG_SEED=settings.etag_seed,
+        FERIADOS=carregar_feriados(settings.feriados_file) if settings.feriados_file else frozenset(),
+    )
+
+    dashboard_cache.configure(
+        max_entries=settings.dashboard_cache_max_entries,
+        ttl_seconds=settings.dashboard_cache_ttl,
     )
 
     db.init_app(app)
@@ -46,5 +63,10 @@ def create_app() -> Flask:
 
     register_blueprints(app)
     app.cli.add_command(create_professor_command)
+    app.cli.add_command(rebuild_stats_command)
+    app.cli.add_command(rollup_dashboard_command)
+    app.cli.add_command(rebuild_busca_command)
+    app.cli.add_command(import_turmas_command)
+    app.cli.add_command(purge_sync_command)
 
     return app
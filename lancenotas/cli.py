@@ -1,8 +1,15 @@
+from datetime import date, datetime, timedelta
+
 import click
 from werkzeug.security import generate_password_hash
 
 from .extensions import db
 from .models import Professor
+from .services.busca import busca_fts_disponivel, install_busca_index
+from .services.dashboard_rollup import rollup_dashboard_day
+from .services.lancamentos import purge_sync_items
+from .services.turma_stats import rebuild_stats
+from .services.turmas import import_turmas_csv
 
 
 @click.command("create-professor")
@@ -25,3 +32,86 @@ def create_professor_command(nome: str, email: str, senha: str) -> None:
     db.session.commit()
 
     click.echo(f"Professor criado: {professor.email} (id={professor.id})")
+
+
+@click.command("rebuild-stats")
+@click.option("--check", is_flag=True, help="Apenas verifica divergências, sem regravar as estatísticas.")
+def rebuild_stats_command(check: bool) -> None:
+    turmas, pares, drifts = rebuild_stats(apply=not check)
+
+    for d in drifts[:20]:
+        click.echo(f"Divergência em {d.tabela} {d.chave}: gravado={d.armazenado} calculado={d.calculado}")
+    if len(drifts) > 20:
+        click.echo(f"... e mais {len(drifts) - 20} divergência(s).")
+
+    if check:
+        db.session.rollback()
+        click.echo(f"Verificadas {turmas} turma(s) e {pares} par(es) atividade/aluno: {len(drifts)} divergência(s).")
+        if drifts:
+            raise SystemExit(1)
+        return
+
+    db.session.commit()
+    click.echo(f"Estatísticas recalculadas: {turmas} turma(s), {pares} par(es) atividade/aluno ({len(drifts)} corrigida(s)).")
+
+
+@click.command("rollup-dashboard")
+@click.option(
+    "--dia",
+    "dia_str",
+    default=None,
+    help="Dia (AAAA-MM-DD) a consolidar; padrão: hoje. Rodar de novo para o mesmo dia substitui as linhas.",
+)
+def rollup_dashboard_command(dia_str: str | None) -> None:
+    try:
+        dia = date.fromisoformat(dia_str) if dia_str else date.today()
+    except ValueError as exc:
+        raise click.ClickException("Data inválida. Use o formato AAAA-MM-DD.") from exc
+
+    turmas = rollup_dashboard_day(dia)
+    db.session.commit()
+    click.echo(f"Rollup do dashboard de {dia.isoformat()}: {turmas} turma(s).")
+
+
+@click.command("rebuild-busca")
+def rebuild_busca_command() -> None:
+    if not busca_fts_disponivel():
+        raise click.ClickException(
+            "O índice de busca (FTS5) só existe no SQLite; no PostgreSQL os índices pg_trgm são mantidos pelo próprio banco."
+        )
+
+    linhas = install_busca_index()
+    db.session.commit()
+    click.echo(f"Índice de busca recriado: {linhas} linha(s).")
+
+
+@click.command("import-turmas")
+@click.argument("arquivo", type=click.File("r", encoding="utf-8-sig"))
+@click.option("--ano-letivo", type=int, default=2026, show_default=True, help="Ano letivo das linhas sem ano_letivo.")
+def import_turmas_command(arquivo, ano_letivo: int) -> None:
+    """Cria turmas (com horários) a partir de um CSV, tudo numa transação.
+
+    Colunas: professor_email, serie, turma, disciplina, ano_letivo, horarios ("SEG 07:30 Manhã|QUA 09:00 Manhã").
+    """
+    result = import_turmas_csv(arquivo.read(), default_ano_letivo=ano_letivo)
+    if result.erros:
+        db.session.rollback()
+        for erro in result.erros:
+            click.echo(erro, err=True)
+        raise click.ClickException(f"{len(result.erros)} erro(s); nenhuma turma foi importada.")
+
+    db.session.commit()
+    click.echo(f"Turmas importadas: {result.criadas}.")
+
+
+@click.command("purge-sync")
+@click.option("--dias", type=click.IntRange(min=1), default=30, show_default=True, help="Mantém as chaves dos últimos N dias.")
+def purge_sync_command(dias: int) -> None:
+    """Apaga as chaves de idempotência antigas de /api/sync/lancamentos.
+
+    Um lote reenviado depois desse prazo é reaplicado; as versões (updated_at) ainda evitam sobrescrever
+    o que mudou no servidor.
+    """
+    apagadas = purge_sync_items(antes=datetime.utcnow() - timedelta(days=dias))
+    db.session.commit()
+    click.echo(f"Chaves de sincronização apagadas: {apagadas}.")
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import os
+import secrets
 from dataclasses import dataclass
 
 
@@ -8,10 +9,28 @@ from dataclasses import dataclass
 class Settings:
     secret_key: str
     database_url: str
+    dashboard_cache_ttl: int
+    dashboard_cache_max_entries: int
+    etag_seed: str
+    feriados_file: str | None
 
     @staticmethod
     def from_env() -> "Settings":
         secret_key = os.environ.get("SECRET_KEY", "dev-secret-key")
         database_url = os.environ.get("DATABASE_URL", "sqlite:///instance/lancenotas.sqlite3")
-        return Settings(secret_key=secret_key, database_url=database_url)
+        dashboard_cache_ttl = int(os.environ.get("DASHBOARD_CACHE_TTL", "300"))
+        dashboard_cache_max_entries = int(os.environ.get("DASHBOARD_CACHE_MAX_ENTRIES", "256"))
+        # Entra em todos os ETags: trocar a cada deploy invalida páginas renderizadas por templates antigos.
+        # Sem a variável, cada processo usa um valor próprio (correto, mas com menos 304 entre workers).
+        etag_seed = os.environ.get("ETAG_SEED") or secrets.token_hex(8)
+        # Arquivo com os feriados e recessos pulados ao agendar as aulas (ver services/agenda.py).
+        feriados_file = os.environ.get("FERIADOS_FILE") or None
+        return Settings(
+            secret_key=secret_key,
+            database_url=database_url,
+            dashboard_cache_ttl=dashboard_cache_ttl,
+            dashboard_cache_max_entries=dashboard_cache_max_entries,
+            etag_seed=etag_seed,
+            feriados_file=feriados_file,
+        )
 
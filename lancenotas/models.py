@@ -3,8 +3,10 @@ from __future__ import annotations
 from datetime import datetime
 
 from flask_login import UserMixin
+from sqlalchemy import event
 
 from .extensions import db
+from .text import norm_text
 
 
 class Estudante(db.Model):
@@ -37,6 +39,7 @@ class FechamentoTrimestreAluno(db.Model):
             "trimestre",
             name="uq_fechamento_turma_estudante_ano_tri",
         ),
+        db.Index("ix_fechamento_aluno_ano_estudante_tri", "ano_letivo", "estudante_id", "trimestre", "created_at"),
     )
 
 class FechamentoTrimestreTurma(db.Model):
@@ -83,8 +86,21 @@ class Turma(db.Model):
     ano_serie = db.Column(db.String(120), nullable=True)
     ano_letivo = db.Column(db.Integer, nullable=False, default=2026)
     trimestre_atual = db.Column(db.Integer, nullable=False, default=1)
+    # nome + disciplina normalizados (sem acentos, minúsculas) para o filtro de busca da listagem.
+    busca = db.Column(db.String(255), nullable=True)
+    # Incrementado por toda escrita em alunos, atividades, aulas, lançamentos, fechamentos e diário da turma
+    # (ver services.turmas.bump_data_version); base dos ETags das páginas da turma.
+    data_version = db.Column(db.Integer, nullable=False, default=0)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
 
+    __table_args__ = (db.Index("ix_turma_professor_ano_letivo", "professor_id", "ano_letivo"),)
+
+
+@event.listens_for(Turma, "before_insert")
+@event.listens_for(Turma, "before_update")
+def _turma_busca(_mapper, _connection, target: Turma) -> None:
+    target.busca = norm_text(f"{target.nome or ''} {target.disciplina or ''}")
+
 
 class TurmaHorario(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -189,6 +205,44 @@ class LancamentoAulaAluno(db.Model):
     )
 
 
+class LancamentoHistorico(db.Model):
+    """Cada mudança de nota/atestado num lançamento (só inserção): quem, quando, antes e depois.
+
+    aula_id e aluno_id não têm chave estrangeira: o histórico continua legível depois que aulas são
+    removidas. Só é apagado junto com a turma.
+    """
+
+    id = db.Column(db.Integer, primary_key=True)
+    turma_id = db.Column(db.Integer, db.ForeignKey("turma.id"), nullable=False, index=True)
+    aula_id = db.Column(db.Integer, nullable=False)
+    aluno_id = db.Column(db.Integer, nullable=False)
+    professor_id = db.Column(db.Integer, db.ForeignKey("professor.id"), nullable=False)
+    nota_antes = db.Column(db.Float, nullable=True)
+    atestado_antes = db.Column(db.Boolean, nullable=False, default=False)
+    nota_depois = db.Column(db.Float, nullable=True)
+    atestado_depois = db.Column(db.Boolean, nullable=False, default=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index("ix_lancamento_historico_aluno_id", "aluno_id", "id"),
+        db.Index("ix_lancamento_historico_aula_id", "aula_id", "id"),
+    )
+
+
+class LancamentoSyncItem(db.Model):
+    """Edição já processada por /api/sync/lancamentos: a chave de idempotência do cliente e o resultado."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    professor_id = db.Column(db.Integer, db.ForeignKey("professor.id"), nullable=False)
+    chave = db.Column(db.String(64), nullable=False)
+    resultado = db.Column(db.JSON, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("professor_id", "chave", name="uq_lancamento_sync_professor_chave"),
+    )
+
+
 class DiarioAnotacao(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     turma_id = db.Column(db.Integer, db.ForeignKey("turma.id"), nullable=False, index=True)
@@ -198,3 +252,55 @@ class DiarioAnotacao(db.Model):
     anotacao = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class TurmaStats(db.Model):
+    """Contadores materializados por turma (mantidos nas escritas; ver services/turma_stats.py)."""
+
+    turma_id = db.Column(db.Integer, db.ForeignKey("turma.id"), primary_key=True)
+    alunos_count = db.Column(db.Integer, nullable=False, default=0)
+    alunos_ativos_count = db.Column(db.Integer, nullable=False, default=0)
+    notas_sum = db.Column(db.Float, nullable=False, default=0.0)
+    notas_count = db.Column(db.Integer, nullable=False, default=0)
+    atestados_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class AtividadeAlunoStats(db.Model):
+    """Soma/contagem de lançamentos por (atividade, aluno), somando todas as aulas da atividade."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    atividade_id = db.Column(db.Integer, db.ForeignKey("atividade.id"), nullable=False, index=True)
+    aluno_id = db.Column(db.Integer, db.ForeignKey("aluno.id"), nullable=False, index=True)
+    turma_id = db.Column(db.Integer, db.ForeignKey("turma.id"), nullable=False, index=True)
+    notas_sum = db.Column(db.Float, nullable=False, default=0.0)
+    notas_count = db.Column(db.Integer, nullable=False, default=0)
+    atestados_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("atividade_id", "aluno_id", name="uq_atividade_aluno_stats"),
+    )
+
+
+class DashboardDailyRollup(db.Model):
+    """Fotografia diária dos indicadores de cada turma (preenchida por `flask rollup-dashboard`)."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    dia = db.Column(db.Date, nullable=False, index=True)
+    professor_id = db.Column(db.Integer, db.ForeignKey("professor.id"), nullable=False, index=True)
+    turma_id = db.Column(db.Integer, db.ForeignKey("turma.id"), nullable=False, index=True)
+    ano_letivo = db.Column(db.Integer, nullable=False)
+    alunos = db.Column(db.Integer, nullable=False, default=0)
+    eligible_slots = db.Column(db.Integer, nullable=False, default=0)
+    notas_count = db.Column(db.Integer, nullable=False, default=0)
+    notas_sum = db.Column(db.Float, nullable=False, default=0.0)
+    atestados_count = db.Column(db.Integer, nullable=False, default=0)
+    pendentes = db.Column(db.Integer, nullable=False, default=0)
+    media = db.Column(db.Float, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint("dia", "turma_id", name="uq_dashboard_rollup_dia_turma"),
+        db.Index("ix_dashboard_rollup_professor_ano_dia", "professor_id", "ano_letivo", "dia"),
+    )
@@ -0,0 +1,58 @@
+"""Requisições GET/HEAD rodam numa sessão somente leitura.
+
+Uma visita de página não pode escrever no banco: no SQLite a escrita pega o lock do arquivo e a visita
+passa a disputar com os salvamentos de todo mundo. Durante um GET, flush com alterações e qualquer comando
+SQL que não seja leitura (inclusive `text("UPDATE …")`) levantam ReadOnlyRequestError (vira 500 e aparece no
+log). `scripts/check_readonly_gets.py` visita as páginas GET e confere que nenhuma escreve.
+"""
+
+from __future__ import annotations
+
+import re
+
+from flask import has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+READ_ONLY_METHODS = frozenset({"GET", "HEAD"})
+
+# Primeira palavra dos comandos permitidos num GET: leituras e controle de transação/savepoint.
+READ_ONLY_COMMANDS = frozenset({"SELECT", "WITH", "EXPLAIN", "SAVEPOINT", "RELEASE", "ROLLBACK"})
+_DML = re.compile(r"\b(INSERT|UPDATE|DELETE|REPLACE|MERGE)\b", re.IGNORECASE)
+
+
+class ReadOnlyRequestError(RuntimeError):
+    """Tentativa de escrita no banco durante uma requisição GET/HEAD."""
+
+
+def _read_only_request() -> bool:
+    return has_request_context() and request.method in READ_ONLY_METHODS
+
+
+def _fail(what: str) -> None:
+    raise ReadOnlyRequestError(f"{request.method} {request.path} tentou {what} no banco")
+
+
+@event.listens_for(Session, "before_flush")
+def _block_flush(session: Session, _flush_context, _instances) -> None:
+    if not _read_only_request():
+        return
+    if session.new or session.deleted or any(session.is_modified(obj) for obj in session.dirty):
+        _fail("gravar")
+
+
+def is_read_only_statement(statement: str) -> bool:
+    """O comando é leitura? (um WITH só é leitura se não tiver INSERT/UPDATE/DELETE dentro)."""
+    palavras = statement.lstrip(" \t\r\n(").split(None, 1)
+    comando = palavras[0].upper() if palavras else ""
+    if comando not in READ_ONLY_COMMANDS:
+        return False
+    return comando != "WITH" or _DML.search(statement) is None
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _block_write_statements(_conn, _cursor, statement: str, _parameters, _context, _executemany) -> None:
+    # No nível do engine pega também SQL textual e INSERT … ON CONFLICT, que não passam pelos eventos do ORM.
+    if _read_only_request() and not is_read_only_statement(statement):
+        _fail(f"executar {statement.split(None, 1)[0].upper()}")
@@ -1,5 +1,7 @@
 from flask import Flask
 
+from .views.admin import admin_bp
+from .views.api import api_bp
 from .views.auth import auth_bp
 from .views.pages import pages_bp
 
@@ -7,4 +9,6 @@ from .views.pages import pages_bp
 def register_blueprints(app: Flask) -> None:
     app.register_blueprint(auth_bp)
     app.register_blueprint(pages_bp)
+    app.register_blueprint(api_bp)
+    app.register_blueprint(admin_bp)
 
@@ -0,0 +1,113 @@
+"""Datas das aulas a partir dos horários semanais da turma (TurmaHorario), pulando feriados.
+
+Cada horário semanal é um encontro: uma turma com dois horários na segunda recebe duas aulas nesse dia.
+O calendário de feriados vem de um arquivo de texto (FERIADOS_FILE) carregado na inicialização.
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+from typing import Collection
+
+from sqlalchemy import update
+
+from ..extensions import db
+from ..models import AtividadeAula, TurmaHorario
+
+# Procura datas até este limite à frente do início; um calendário só de feriados não trava o laço.
+HORIZONTE_DIAS = 2 * 366
+
+
+def carregar_feriados(path: str) -> frozenset[date]:
+    """Lê o arquivo de feriados: uma data ISO por linha, ou um período "AAAA-MM-DD..AAAA-MM-DD".
+
+    O que vem depois da data (ou do período) é descrição e é ignorado, assim como linhas vazias e as
+    iniciadas por "#". Levanta ValueError indicando a linha com data inválida.
+    """
+    dias: set[date] = set()
+    with open(path, encoding="utf-8") as fh:
+        for numero, linha in enumerate(fh, start=1):
+            linha = linha.strip()
+            if not linha or linha.startswith("#"):
+                continue
+            campo = linha.split(maxsplit=1)[0]
+            try:
+                inicio_raw, _, fim_raw = campo.partition("..")
+                inicio = date.fromisoformat(inicio_raw)
+                fim = date.fromisoformat(fim_raw) if fim_raw else inicio
+            except ValueError:
+                raise ValueError(f"{path}, linha {numero}: data inválida “{campo}”") from None
+            if fim < inicio:
+                raise ValueError(f"{path}, linha {numero}: período termina antes de começar")
+            dias.update(inicio + timedelta(days=k) for k in range((fim - inicio).days + 1))
+    return frozenset(dias)
+
+
+def encontros_por_dia(turma_id: int) -> list[int]:
+    """Quantos horários a turma tem em cada dia da semana (índice 0 = segunda), numa consulta."""
+    return encontros_por_turma([turma_id])[int(turma_id)]
+
+
+def encontros_por_turma(turma_ids: Collection[int]) -> dict[int, list[int]]:
+    """encontros_por_dia de várias turmas numa consulta só; turma sem horários fica com sete zeros."""
+    contagem = {int(turma_id): [0] * 7 for turma_id in turma_ids}
+    if not contagem:
+        return contagem
+    for turma_id, dia in db.session.query(TurmaHorario.turma_id, TurmaHorario.dia_semana).filter(
+        TurmaHorario.turma_id.in_(list(contagem))
+    ):
+        contagem[int(turma_id)][int(dia)] += 1
+    return contagem
+
+
+def proximas_datas(
+    *, encontros: list[int], inicio: date, quantidade: int, feriados: Collection[date] = frozenset()
+) -> list[date]:
+    """As próximas `quantidade` datas de aula a partir de `inicio` (inclusive), uma por encontro semanal.
+
+    Levanta ValueError se a turma não tem horários ou se o horizonte acaba antes de completar as datas.
+    """
+    if quantidade <= 0:
+        return []
+    if not any(encontros):
+        raise ValueError("A turma não tem horários cadastrados.")
+    datas: list[date] = []
+    dia = inicio
+    fim = inicio + timedelta(days=HORIZONTE_DIAS)
+    while len(datas) < quantidade:
+        if dia > fim:
+            raise ValueError("Não há dias letivos suficientes no calendário para todas as aulas.")
+        if dia not in feriados:
+            datas.extend([dia] * min(encontros[dia.weekday()], quantidade - len(datas)))
+        dia += timedelta(days=1)
+    return datas
+
+
+def agendar_atividades(
+    *, turma_id: int, atividade_ids: list[int], inicio: date, feriados: Collection[date] = frozenset()
+) -> list[date]:
+    """Data as aulas das atividades em sequência, na ordem de `atividade_ids`, a partir de `inicio`.
+
+    A primeira atividade fica com os primeiros encontros, a seguinte continua de onde ela parou. Lê as
+    aulas numa consulta e grava todas as datas num único UPDATE em lote (por id). Retorna as datas
+    atribuídas, na ordem das aulas. Não faz commit.
+    """
+    if not atividade_ids:
+        return []
+    ordem = {int(atividade_id): k for k, atividade_id in enumerate(atividade_ids)}
+    aulas = sorted(
+        db.session.query(AtividadeAula.id, AtividadeAula.atividade_id, AtividadeAula.numero).filter(
+            AtividadeAula.atividade_id.in_(list(ordem))
+        ),
+        key=lambda row: (ordem[int(row.atividade_id)], int(row.numero)),
+    )
+    datas = proximas_datas(
+        encontros=encontros_por_dia(turma_id), inicio=inicio, quantidade=len(aulas), feriados=feriados
+    )
+    if aulas:
+        db.session.execute(
+            update(AtividadeAula),
+            [{"id": int(aula.id), "data": data} for aula, data in zip(aulas, datas)],
+            execution_options={"synchronize_session": False},
+        )
+    return datas
@@ -0,0 +1,69 @@
+"""Plano de aulas de uma atividade: quantas aulas ela tem e a data de cada uma.
+
+As aulas são lidas uma vez e comparadas com o pedido; criações, remoções e mudanças de data saem num
+único flush (INSERT e UPDATE em lote, um DELETE), sem uma consulta por número de aula.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+
+from ..extensions import db
+from ..models import AtividadeAula, LancamentoAulaAluno
+
+AULAS_COM_LANCAMENTOS = "Não é possível reduzir o número de aulas: há lançamentos nas aulas finais."
+
+
+class AulasComLancamentos(Exception):
+    """As aulas que sairiam do plano já têm lançamentos."""
+
+    def __init__(self) -> None:
+        super().__init__(AULAS_COM_LANCAMENTOS)
+
+
+@dataclass(frozen=True)
+class PlanoAulasResultado:
+    criadas: int = 0
+    removidas: int = 0
+    redatadas: int = 0
+
+
+def aplicar_plano_aulas(
+    *, atividade_id: int, aulas_planejadas: int, datas: dict[int, date | None] | None = None
+) -> PlanoAulasResultado:
+    """Deixa a atividade com as aulas 1..aulas_planejadas e as datas de `datas` (número -> data ou None).
+
+    Números ausentes de `datas` mantêm a data atual (sem `datas`, nenhuma data muda). Aulas além de
+    `aulas_planejadas` são removidas num DELETE, a menos que tenham lançamentos: nesse caso levanta
+    AulasComLancamentos sem alterar nada. Não mexe em Atividade.aulas_planejadas. Não faz commit.
+    """
+    aulas_planejadas = max(1, int(aulas_planejadas))
+    datas = datas or {}
+    aulas = AtividadeAula.query.filter_by(atividade_id=atividade_id).all()
+
+    remover = [int(a.id) for a in aulas if int(a.numero) > aulas_planejadas]
+    if remover:
+        usadas = db.session.query(LancamentoAulaAluno.id).filter(LancamentoAulaAluno.aula_id.in_(remover)).first()
+        if usadas is not None:
+            raise AulasComLancamentos()
+        AtividadeAula.query.filter(AtividadeAula.id.in_(remover)).delete(synchronize_session=False)
+
+    redatadas = 0
+    numeros: set[int] = set()
+    for aula in aulas:
+        numero = int(aula.numero)
+        numeros.add(numero)
+        if numero <= aulas_planejadas and numero in datas and aula.data != datas[numero]:
+            aula.data = datas[numero]
+            redatadas += 1
+    novas = [
+        AtividadeAula(atividade_id=atividade_id, numero=n, data=datas.get(n))
+        for n in range(1, aulas_planejadas + 1)
+        if n not in numeros
+    ]
+    db.session.add_all(novas)
+    db.session.flush()
+    # Aulas removidas nunca têm lançamentos (senão AulasComLancamentos acima), então não contribuíam para
+    # AtividadeAlunoStats/TurmaStats: não há estatística a recalcular.
+    return PlanoAulasResultado(criadas=len(novas), removidas=len(remover), redatadas=redatadas)
@@ -0,0 +1,314 @@
+"""Busca global (alunos, estudantes, turmas, atividades e anotações do diário).
+
+No SQLite o índice é a tabela virtual FTS5 `busca_fts`, mantida por triggers (criados na migração e por
+`install_busca_index`). O tokenizer `unicode61 remove_diacritics 2` ignora acentos e maiúsculas do mesmo
+jeito que `norm_text`. Cada linha usa rowid = id * 8 + código do tipo, para que os triggers apaguem e
+regravem por rowid sem varrer o índice.
+
+No PostgreSQL a busca é LIKE sobre `lower(translate(coluna, acentuadas, sem acento))`, a mesma
+dobra de `norm_text` para as letras acentuadas do português, apoiada por índices GIN pg_trgm sobre essas
+expressões (migração e8b3f5a2c917). Outros bancos não são suportados.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import func, literal_column, text
+
+from ..extensions import db
+from ..models import Aluno, Atividade, DiarioAnotacao, Estudante, Turma
+from ..text import norm_text
+
+BUSCA_MIN_CHARS = 2
+BUSCA_MAX_TERMOS = 8
+BUSCA_CANDIDATOS = 500
+
+# Letras que `norm_text` desacentua, e o resultado de cada uma. Entram no SQL como literais (não como
+# parâmetros) para que a expressão seja idêntica à dos índices pg_trgm e o planejador os use.
+BUSCA_ACENTUADAS = "áàâãäåéèêëíìîïóòôõöúùûüçñýÿÁÀÂÃÄÅÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑÝ"
+BUSCA_SEM_ACENTO = "".join(norm_text(ch) for ch in BUSCA_ACENTUADAS)
+
+BUSCA_FTS_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(
+        texto,
+        tipo UNINDEXED,
+        ref_id UNINDEXED,
+        turma_id UNINDEXED,
+        professor_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    # aluno
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_aluno_ai AFTER INSERT ON aluno BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 1, new.nome_completo, 'aluno', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_aluno_au AFTER UPDATE OF nome_completo, turma_id ON aluno BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 1;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 1, new.nome_completo, 'aluno', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_aluno_ad AFTER DELETE ON aluno BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 1;
+    END
+    """,
+    # estudante (sem professor: o escopo vem dos alunos vinculados)
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_estudante_ai AFTER INSERT ON estudante BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 2, new.nome_completo, 'estudante', new.id, NULL, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_estudante_au AFTER UPDATE OF nome_completo ON estudante BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 2;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 2, new.nome_completo, 'estudante', new.id, NULL, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_estudante_ad AFTER DELETE ON estudante BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 2;
+    END
+    """,
+    # turma
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_turma_ai AFTER INSERT ON turma BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 3, new.nome, 'turma', new.id, new.id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_turma_au AFTER UPDATE OF nome, professor_id ON turma BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 3;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 3, new.nome, 'turma', new.id, new.id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_turma_ad AFTER DELETE ON turma BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 3;
+    END
+    """,
+    # atividade
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_atividade_ai AFTER INSERT ON atividade BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 4, new.titulo, 'atividade', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_atividade_au AFTER UPDATE OF titulo, turma_id ON atividade BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 4;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 4, new.titulo, 'atividade', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_atividade_ad AFTER DELETE ON atividade BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 4;
+    END
+    """,
+    # diario_anotacao
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_anotacao_ai AFTER INSERT ON diario_anotacao BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 5, coalesce(new.titulo || ' ', '') || new.anotacao, 'anotacao', new.id,
+                new.turma_id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_anotacao_au
+    AFTER UPDATE OF titulo, anotacao, turma_id, professor_id ON diario_anotacao BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 5;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 5, coalesce(new.titulo || ' ', '') || new.anotacao, 'anotacao', new.id,
+                new.turma_id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_anotacao_ad AFTER DELETE ON diario_anotacao BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 5;
+    END
+    """,
+]
+
+BUSCA_FTS_POPULATE = """
+    INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+    SELECT a.id * 8 + 1, a.nome_completo, 'aluno', a.id, a.turma_id, t.professor_id
+    FROM aluno a JOIN turma t ON t.id = a.turma_id
+    UNION ALL
+    SELECT e.id * 8 + 2, e.nome_completo, 'estudante', e.id, NULL, NULL FROM estudante e
+    UNION ALL
+    SELECT t.id * 8 + 3, t.nome, 'turma', t.id, t.id, t.professor_id FROM turma t
+    UNION ALL
+    SELECT at.id * 8 + 4, at.titulo, 'atividade', at.id, at.turma_id, t.professor_id
+    FROM atividade at JOIN turma t ON t.id = at.turma_id
+    UNION ALL
+    SELECT d.id * 8 + 5, coalesce(d.titulo || ' ', '') || d.anotacao, 'anotacao', d.id, d.turma_id, d.professor_id
+    FROM diario_anotacao d
+"""
+
+
+@dataclass(frozen=True)
+class BuscaResultado:
+    tipo: str
+    ref_id: int
+    turma_id: int | None
+    texto: str
+
+
+def busca_fts_disponivel() -> bool:
+    return db.engine.dialect.name == "sqlite"
+
+
+def install_busca_index() -> int:
+    """(Re)cria a tabela FTS5 e os triggers e repopula o índice a partir das tabelas de origem.
+
+    Usado por `flask rebuild-busca` e por bancos criados com `create_all` (sem migrações). Não faz commit.
+    """
+    if not busca_fts_disponivel():
+        return 0
+    db.session.execute(text("DROP TABLE IF EXISTS busca_fts"))
+    for ddl in BUSCA_FTS_DDL:
+        db.session.execute(text(ddl))
+    db.session.execute(text(BUSCA_FTS_POPULATE))
+    return int(db.session.execute(text("SELECT count(*) FROM busca_fts")).scalar() or 0)
+
+
+def _termos(q: str) -> list[str]:
+    return re.findall(r"\w+", norm_text(q or ""))[:BUSCA_MAX_TERMOS]
+
+
+def buscar(*, professor_id: int, q: str, limit: int = 50) -> list[BuscaResultado]:
+    """Busca sem acentos/maiúsculas restrita às turmas do professor; cada termo casa por prefixo."""
+    termos = _termos(q)
+    if not termos or sum(len(t) for t in termos) < BUSCA_MIN_CHARS:
+        return []
+    dialect_name = db.engine.dialect.name
+    if dialect_name == "postgresql":
+        return _buscar_like(professor_id=professor_id, termos=termos, limit=limit)
+    if not busca_fts_disponivel():
+        raise NotImplementedError(f"Busca global não suportada em {dialect_name}")
+
+    # Termos comuns casam com dezenas de milhares de anotações; ordenar todas por relevância custa caro.
+    # Os candidatos são os mais recentes (o FTS5 percorre o rowid em ordem e para no LIMIT) e só eles
+    # são ordenados por relevância.
+    match = " ".join(f'"{t}"*' for t in termos)
+    rows = db.session.execute(
+        text(
+            """
+            SELECT tipo, ref_id, turma_id, trecho FROM (
+                SELECT tipo, ref_id, turma_id, rank, snippet(busca_fts, 0, '', '', '…', 16) AS trecho
+                FROM busca_fts
+                WHERE busca_fts MATCH :match
+                  AND (
+                    professor_id = :professor_id
+                    OR (
+                      tipo = 'estudante'
+                      AND ref_id IN (
+                        SELECT a.estudante_id FROM aluno a JOIN turma t ON t.id = a.turma_id
+                        WHERE t.professor_id = :professor_id AND a.estudante_id IS NOT NULL
+                      )
+                    )
+                  )
+                ORDER BY rowid DESC
+                LIMIT :candidatos
+            )
+            ORDER BY rank
+            LIMIT :limit
+            """
+        ),
+        {
+            "match": match,
+            "professor_id": int(professor_id),
+            "candidatos": BUSCA_CANDIDATOS,
+            "limit": int(limit),
+        },
+    ).all()
+    return [
+        BuscaResultado(
+            tipo=tipo,
+            ref_id=int(ref_id),
+            turma_id=int(turma_id) if turma_id is not None else None,
+            texto=trecho,
+        )
+        for tipo, ref_id, turma_id, trecho in rows
+    ]
+
+
+def sem_acentos_sql(column):
+    """`lower(translate(column, …))`: a dobra de `norm_text` em SQL (a expressão dos índices pg_trgm)."""
+    return func.lower(
+        func.translate(column, literal_column(f"'{BUSCA_ACENTUADAS}'"), literal_column(f"'{BUSCA_SEM_ACENTO}'"))
+    )
+
+
+def anotacao_texto_sql():
+    """Texto indexado de uma anotação (título + anotação), como no FTS5."""
+    return func.coalesce(DiarioAnotacao.titulo + literal_column("' '"), literal_column("''")) + DiarioAnotacao.anotacao
+
+
+def _buscar_like(*, professor_id: int, termos: list[str], limit: int) -> list[BuscaResultado]:
+    """Busca do PostgreSQL: cada termo (já dobrado por norm_text) é LIKE '%termo%' na coluna dobrada."""
+
+    def like_all(column):
+        dobrada = sem_acentos_sql(column)
+        return [dobrada.contains(t, autoescape=True) for t in termos]
+
+    resultados: list[BuscaResultado] = []
+    anotacao_texto = anotacao_texto_sql()
+    fontes = [
+        ("aluno", Aluno.id, Aluno.turma_id, Aluno.nome_completo, Aluno.turma_id),
+        ("turma", Turma.id, Turma.id, Turma.nome, None),
+        ("atividade", Atividade.id, Atividade.turma_id, Atividade.titulo, Atividade.turma_id),
+        ("anotacao", DiarioAnotacao.id, DiarioAnotacao.turma_id, anotacao_texto, DiarioAnotacao.turma_id),
+    ]
+    for tipo, id_col, turma_col, texto_col, join_col in fontes:
+        query = db.session.query(id_col, turma_col, texto_col)
+        if join_col is not None:
+            query = query.join(Turma, join_col == Turma.id)
+        rows = query.filter(Turma.professor_id == professor_id, *like_all(texto_col)).limit(limit).all()
+        resultados.extend(BuscaResultado(tipo, int(i), int(t), txt) for i, t, txt in rows)
+
+    # Estudante não tem professor: o escopo vem dos alunos vinculados às turmas dele, como no FTS5.
+    estudantes_do_professor = (
+        db.session.query(Aluno.estudante_id)
+        .join(Turma, Aluno.turma_id == Turma.id)
+        .filter(Turma.professor_id == professor_id, Aluno.estudante_id.isnot(None))
+    )
+    estudantes = (
+        db.session.query(Estudante.id, Estudante.nome_completo)
+        .filter(Estudante.id.in_(estudantes_do_professor), *like_all(Estudante.nome_completo))
+        .limit(limit)
+        .all()
+    )
+    resultados.extend(BuscaResultado("estudante", int(i), None, txt) for i, txt in estudantes)
+    return resultados[:limit]
+
+
+def estudantes_turma_recente(*, professor_id: int, estudante_ids: list[int]) -> dict[int, int]:
+    """Turma mais recente (maior id) do professor em que cada estudante aparece, para montar links."""
+    if not estudante_ids:
+        return {}
+    rows = (
+        db.session.query(Aluno.estudante_id, func.max(Turma.id))
+        .join(Turma, Aluno.turma_id == Turma.id)
+        .filter(Turma.professor_id == professor_id, Aluno.estudante_id.in_(estudante_ids))
+        .group_by(Aluno.estudante_id)
+        .all()
+    )
+    return {int(e): int(t) for e, t in rows}
@@ -0,0 +1,191 @@
+"""Operações sobre a coluna inteira de uma aula (preencher, limpar, copiar de outra aula da atividade).
+
+Cada operação grava com comandos em conjunto — INSERT … SELECT … ON CONFLICT, UPDATE e DELETE filtrados
+pela lista de alunos ativos — em vez de um comando por aluno. A coluna dos alunos ativos é lida antes e
+depois da gravação (uma consulta cada) para atualizar TurmaStats / AtividadeAlunoStats e o histórico.
+Alunos transferidos não são tocados, e nada é gravado em trimestre fechado.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import Boolean, DateTime, Float, Integer, and_, literal, or_, select
+from sqlalchemy.orm import aliased
+
+from ..extensions import db
+from ..models import Aluno, Atividade, FechamentoTrimestreTurma, LancamentoAulaAluno, Turma
+from .historico import Mudanca, registrar_mudancas
+from .turma_stats import LancamentoValor, apply_lancamento_changes
+from .upsert import upsert_insert
+
+OPERACOES_COLUNA = {"preencher", "limpar", "copiar"}
+
+
+class TrimestreFechado(Exception):
+    """O trimestre da atividade está fechado: os lançamentos dele não podem mudar."""
+
+    def __init__(self, trimestre: int) -> None:
+        super().__init__(f"O {trimestre}º trimestre está fechado. Reabra o trimestre para alterar as notas.")
+        self.trimestre = trimestre
+
+
+def trimestre_fechado(*, turma_id: int, atividade_id: int) -> int | None:
+    """Trimestre da atividade se ele estiver fechado para a turma (no ano letivo dela); senão None."""
+    row = (
+        db.session.query(Atividade.trimestre)
+        .join(Turma, Turma.id == Atividade.turma_id)
+        .join(
+            FechamentoTrimestreTurma,
+            and_(
+                FechamentoTrimestreTurma.turma_id == Turma.id,
+                FechamentoTrimestreTurma.ano_letivo == Turma.ano_letivo,
+                FechamentoTrimestreTurma.trimestre == Atividade.trimestre,
+            ),
+        )
+        .filter(Atividade.id == atividade_id, Atividade.turma_id == turma_id)
+        .filter(FechamentoTrimestreTurma.status == "fechado")
+        .first()
+    )
+    return int(row[0]) if row is not None else None
+
+
+def _ativos(turma_id: int):
+    return select(Aluno.id).where(Aluno.turma_id == turma_id, Aluno.status == "ativo")
+
+
+def _preenchido():
+    return or_(LancamentoAulaAluno.nota.isnot(None), LancamentoAulaAluno.atestado.is_(True))
+
+
+def _coluna(*, turma_id: int, aula_id: int, lock: bool = False) -> dict[int, LancamentoValor]:
+    """(nota, atestado) dos alunos ativos que têm lançamento na aula, por aluno_id."""
+    query = db.session.query(
+        LancamentoAulaAluno.aluno_id, LancamentoAulaAluno.nota, LancamentoAulaAluno.atestado
+    ).filter(LancamentoAulaAluno.aula_id == aula_id, LancamentoAulaAluno.aluno_id.in_(_ativos(turma_id)))
+    if lock:
+        query = query.with_for_update()
+    return {int(aluno_id): (nota, bool(atestado)) for aluno_id, nota, atestado in query}
+
+
+def _upsert_from(select_stmt, *, apenas_vazias: bool = False) -> None:
+    """INSERT … SELECT (aula_id, aluno_id, nota, atestado, updated_at) com ON CONFLICT DO UPDATE.
+
+    Só atualiza as linhas cuja nota/atestado mudam (as demais mantêm o `updated_at`); com `apenas_vazias`,
+    só as que não têm nota nem atestado. A observação existente é mantida.
+    """
+    table = LancamentoAulaAluno.__table__
+    stmt = upsert_insert(LancamentoAulaAluno).from_select(
+        ["aula_id", "aluno_id", "nota", "atestado", "updated_at"], select_stmt
+    )
+    where = or_(table.c.nota.is_distinct_from(stmt.excluded.nota), table.c.atestado != stmt.excluded.atestado)
+    if apenas_vazias:
+        where = and_(table.c.nota.is_(None), table.c.atestado.is_(False))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.aula_id, table.c.aluno_id],
+        set_={
+            "nota": stmt.excluded.nota,
+            "atestado": stmt.excluded.atestado,
+            "updated_at": stmt.excluded.updated_at,
+        },
+        where=where,
+    )
+    db.session.execute(stmt)
+
+
+def _limpar(*, turma_id: int, aula_id: int, now: datetime, exceto=None) -> None:
+    """Apaga nota e atestado da coluna: um DELETE para lançamentos sem observação e um UPDATE para os demais."""
+    filtros = [LancamentoAulaAluno.aula_id == aula_id, LancamentoAulaAluno.aluno_id.in_(_ativos(turma_id))]
+    if exceto is not None:
+        filtros.append(LancamentoAulaAluno.aluno_id.notin_(exceto))
+    LancamentoAulaAluno.query.filter(
+        *filtros, or_(LancamentoAulaAluno.observacao.is_(None), LancamentoAulaAluno.observacao == "")
+    ).delete(synchronize_session=False)
+    LancamentoAulaAluno.query.filter(*filtros, _preenchido()).update(
+        {LancamentoAulaAluno.nota: None, LancamentoAulaAluno.atestado: False, LancamentoAulaAluno.updated_at: now},
+        synchronize_session=False,
+    )
+
+
+def operar_coluna(
+    *,
+    turma_id: int,
+    atividade_id: int,
+    aula_id: int,
+    professor_id: int,
+    operacao: str,
+    valor: LancamentoValor | None = None,
+    apenas_vazias: bool = False,
+    origem_aula_id: int | None = None,
+) -> int:
+    """Aplica `operacao` à coluna da aula para todos os alunos ativos da turma; retorna quantas células mudaram.
+
+    - "preencher": grava `valor` (nota, atestado) em todas as células (ou só nas vazias, com `apenas_vazias`);
+    - "limpar": apaga nota e atestado (lançamentos com observação ficam, só com ela);
+    - "copiar": deixa nota e atestado iguais aos de `origem_aula_id` (outra aula da mesma atividade).
+
+    A aula (e a origem) devem pertencer à atividade da turma — conferido por quem chama. Levanta
+    TrimestreFechado se o trimestre da atividade estiver fechado. Não faz commit.
+    """
+    if operacao not in OPERACOES_COLUNA:
+        raise ValueError(f"operação desconhecida: {operacao}")
+    if operacao == "preencher" and (valor is None or (valor[0] is None and not valor[1])):
+        raise ValueError("informe a nota (ou atestado) para preencher a coluna")
+    if operacao == "copiar" and (origem_aula_id is None or origem_aula_id == aula_id):
+        raise ValueError("informe outra aula da atividade como origem")
+    fechado = trimestre_fechado(turma_id=turma_id, atividade_id=atividade_id)
+    if fechado is not None:
+        raise TrimestreFechado(fechado)
+
+    now = datetime.utcnow()
+    antes = _coluna(turma_id=turma_id, aula_id=aula_id, lock=True)
+    if operacao == "preencher":
+        nota, atestado = valor
+        _upsert_from(
+            select(
+                literal(aula_id, Integer),
+                Aluno.id,
+                literal(None if atestado else nota, Float),
+                literal(bool(atestado), Boolean),
+                literal(now, DateTime),
+            ).where(Aluno.turma_id == turma_id, Aluno.status == "ativo"),
+            apenas_vazias=apenas_vazias,
+        )
+    elif operacao == "limpar":
+        _limpar(turma_id=turma_id, aula_id=aula_id, now=now)
+    else:
+        origem = (
+            select(
+                literal(aula_id, Integer),
+                LancamentoAulaAluno.aluno_id,
+                LancamentoAulaAluno.nota,
+                LancamentoAulaAluno.atestado,
+                literal(now, DateTime),
+            )
+            .where(LancamentoAulaAluno.aula_id == origem_aula_id, _preenchido())
+            .where(LancamentoAulaAluno.aluno_id.in_(_ativos(turma_id)))
+        )
+        _upsert_from(origem)
+        # Alias: a subconsulta lê a mesma tabela que o DELETE/UPDATE altera e não deve ser correlacionada.
+        src = aliased(LancamentoAulaAluno)
+        _limpar(
+            turma_id=turma_id,
+            aula_id=aula_id,
+            now=now,
+            exceto=select(src.aluno_id).where(
+                src.aula_id == origem_aula_id, or_(src.nota.isnot(None), src.atestado.is_(True))
+            ),
+        )
+
+    depois = _coluna(turma_id=turma_id, aula_id=aula_id)
+    vazio: LancamentoValor = (None, False)
+    mudancas: list[Mudanca] = [
+        (aula_id, aluno_id, antes.get(aluno_id), depois.get(aluno_id))
+        for aluno_id in antes.keys() | depois.keys()
+        if antes.get(aluno_id, vazio) != depois.get(aluno_id, vazio)
+    ]
+    apply_lancamento_changes(
+        turma_id=turma_id, atividade_id=atividade_id, changes=[(aluno_id, old, new) for _, aluno_id, old, new in mudancas]
+    )
+    registrar_mudancas(turma_id=turma_id, professor_id=professor_id, mudancas=mudancas)
+    return len(mudancas)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Hashable
+
+from .dashboard_stats import DashboardStats, compute_dashboard_stats, compute_dashboard_summary
+
+
+class DashboardCache:
+    """Cache LRU com TTL dos indicadores do dashboard, chaveado por (professor_id, ano_letivo, dia[, parte]).
+
+    O cache é por processo: com vários workers, cada um guarda a sua cópia e o TTL limita
+    por quanto tempo um worker que não recebeu a escrita pode servir números antigos.
+    """
+
+    def __init__(self, *, max_entries: int = 256, ttl_seconds: float = 300.0) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, DashboardStats]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, *, max_entries: int, ttl_seconds: float) -> None:
+        with self._lock:
+            self.max_entries = max(1, int(max_entries))
+            self.ttl_seconds = float(ttl_seconds)
+            self._entries.clear()
+
+    def get(self, key: tuple[Hashable, ...]) -> DashboardStats | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def peek(self, key: tuple[Hashable, ...]) -> DashboardStats | None:
+        """Como get, mas sem contar acerto/falta nem mexer na ordem LRU."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None and entry[0] >= time.monotonic() else None
+
+    def set(self, key: tuple[Hashable, ...], value: DashboardStats) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate_professor(self, professor_id: int) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == professor_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict[str, int | float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+            }
+
+
+dashboard_cache = DashboardCache()
+
+
+def get_dashboard_summary(*, professor_id: int, ano_letivo: int, today: date) -> DashboardStats:
+    """Totais dos cartões; reaproveita o cálculo completo se ele já estiver no cache."""
+    stats = dashboard_cache.peek((professor_id, ano_letivo, today))
+    if stats is not None:
+        return stats
+    cache_key = (professor_id, ano_letivo, today, "resumo")
+    stats = dashboard_cache.get(cache_key)
+    if stats is None:
+        stats = compute_dashboard_summary(professor_id=professor_id, ano_letivo=ano_letivo, today=today)
+        dashboard_cache.set(cache_key, stats)
+    return stats
+
+
+def get_dashboard_stats(*, professor_id: int, ano_letivo: int, today: date) -> DashboardStats:
+    cache_key = (professor_id, ano_letivo, today)
+    stats = dashboard_cache.get(cache_key)
+    if stats is None:
+        stats = compute_dashboard_stats(professor_id=professor_id, ano_letivo=ano_letivo, today=today)
+        dashboard_cache.set(cache_key, stats)
+    return stats
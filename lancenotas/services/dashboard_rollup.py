@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models import DashboardDailyRollup
+from .dashboard_stats import compute_turma_metrics
+
+
+def rollup_dashboard_day(dia: date) -> int:
+    """Regrava as linhas de `dia` com os indicadores atuais de todas as turmas. Idempotente.
+
+    A data só define quais aulas contam como esperadas (data <= dia); os lançamentos são os de agora,
+    então rodar para um dia passado é uma aproximação útil apenas para preencher histórico.
+    Não faz commit.
+    """
+    metrics = compute_turma_metrics(today=dia)
+
+    DashboardDailyRollup.query.filter_by(dia=dia).delete(synchronize_session=False)
+    now = datetime.utcnow()
+    db.session.add_all(
+        [
+            DashboardDailyRollup(
+                dia=dia,
+                professor_id=m.professor_id,
+                turma_id=m.turma_id,
+                ano_letivo=m.ano_letivo,
+                alunos=m.alunos,
+                eligible_slots=m.eligible_slots,
+                notas_count=m.notas_count,
+                notas_sum=m.notas_sum,
+                atestados_count=m.atestados_count,
+                pendentes=m.pendentes,
+                media=m.media,
+                created_at=now,
+            )
+            for m in metrics
+        ]
+    )
+    return len(metrics)
+
+
+def dashboard_trend(
+    *,
+    professor_id: int,
+    ano_letivo: int,
+    desde: date,
+    turma_id: int | None = None,
+) -> list[dict]:
+    """Série diária de média e pendências do professor (ou de uma turma) a partir dos rollups."""
+    query = db.session.query(
+        DashboardDailyRollup.dia,
+        func.sum(DashboardDailyRollup.eligible_slots),
+        func.sum(DashboardDailyRollup.atestados_count),
+        func.sum(DashboardDailyRollup.notas_sum),
+        func.sum(DashboardDailyRollup.pendentes),
+    ).filter(
+        DashboardDailyRollup.professor_id == professor_id,
+        DashboardDailyRollup.ano_letivo == ano_letivo,
+        DashboardDailyRollup.dia >= desde,
+    )
+    if turma_id is not None:
+        query = query.filter(DashboardDailyRollup.turma_id == turma_id)
+
+    serie: list[dict] = []
+    for dia, slots, atestados, notas_sum, pendentes in (
+        query.group_by(DashboardDailyRollup.dia).order_by(DashboardDailyRollup.dia.asc()).all()
+    ):
+        denom = int(slots or 0) - int(atestados or 0)
+        serie.append(
+            {
+                "dia": dia.isoformat(),
+                "media": round(float(notas_sum or 0.0) / float(denom), 2) if denom > 0 else None,
+                "pendentes": int(pendentes or 0),
+            }
+        )
+    return serie
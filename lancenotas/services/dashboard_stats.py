@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from datetime import date
+
+from sqlalchemy import case, func, null, or_
+
+from ..extensions import db
+from ..models import Atividade, AtividadeAula, LancamentoAulaAluno, Professor, Turma, TurmaStats
+
+
+@dataclass(frozen=True)
+class DashboardStats:
+    turmas_ativas: int
+    total_alunos: int
+    avaliacoes_pendentes: int
+    desempenho_media: float | None
+    desempenho_por_turma: list[dict] = field(default_factory=list)
+
+
+def _aula_ja_ocorreu(today: date):
+    return or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today)
+
+
+def _nota_valida():
+    return case((LancamentoAulaAluno.atestado.is_(True), null()), else_=LancamentoAulaAluno.nota)
+
+
+def _aulas_esperadas_sq(today: date, *turma_filters):
+    """Subconsulta (turma_id, aulas) com as aulas já ocorridas (ou sem data) de cada turma."""
+    query = db.session.query(
+        Atividade.turma_id.label("turma_id"), func.count(AtividadeAula.id).label("aulas")
+    ).join(AtividadeAula, AtividadeAula.atividade_id == Atividade.id)
+    if turma_filters:
+        query = query.join(Turma, Atividade.turma_id == Turma.id).filter(*turma_filters)
+    return query.filter(_aula_ja_ocorreu(today)).group_by(Atividade.turma_id).subquery()
+
+
+def _lancamentos_futuros_sq(today: date, *turma_filters):
+    """Subconsulta (turma_id, notas_sum, notas_count, atestados_count) dos lançamentos em aulas futuras."""
+    query = (
+        db.session.query(
+            Atividade.turma_id.label("turma_id"),
+            func.sum(_nota_valida()).label("notas_sum"),
+            func.count(_nota_valida()).label("notas_count"),
+            func.sum(case((LancamentoAulaAluno.atestado.is_(True), 1), else_=0)).label("atestados_count"),
+        )
+        .select_from(AtividadeAula)
+        .join(LancamentoAulaAluno, LancamentoAulaAluno.aula_id == AtividadeAula.id)
+        .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+    )
+    if turma_filters:
+        query = query.join(Turma, Atividade.turma_id == Turma.id).filter(*turma_filters)
+    return query.filter(AtividadeAula.data > today).group_by(Atividade.turma_id).subquery()
+
+
+@dataclass(frozen=True)
+class TurmaMetrics:
+    turma_id: int
+    professor_id: int
+    ano_letivo: int
+    nome: str
+    serie: str | None
+    turma_letra: str | None
+    disciplina: str | None
+    alunos: int
+    eligible_slots: int
+    notas_count: int
+    notas_sum: float
+    atestados_count: int
+
+    @property
+    def pendentes(self) -> int:
+        return max(0, self.eligible_slots - self.notas_count - self.atestados_count)
+
+    @property
+    def media(self) -> float | None:
+        denom = max(0, self.eligible_slots - self.atestados_count)
+        return round(self.notas_sum / float(denom), 2) if denom > 0 else None
+
+
+def compute_turma_metrics(
+    *,
+    today: date,
+    professor_id: int | None = None,
+    ano_letivo: int | None = None,
+) -> list[TurmaMetrics]:
+    """Indicadores por turma com três consultas agrupadas, para um professor/ano ou para todas as turmas.
+
+    Uma aula conta como "esperada" quando não tem data ou já aconteceu (data <= today).
+    Os totais de alunos e lançamentos vêm de TurmaStats; só os lançamentos de aulas com data futura
+    (normalmente nenhum) são lidos da tabela de lançamentos, para descontá-los.
+    """
+    turma_filters = []
+    if professor_id is not None:
+        turma_filters.append(Turma.professor_id == professor_id)
+    if ano_letivo is not None:
+        turma_filters.append(Turma.ano_letivo == ano_letivo)
+
+    turmas = (
+        db.session.query(
+            Turma.id,
+            Turma.professor_id,
+            Turma.ano_letivo,
+            Turma.nome,
+            Turma.serie,
+            Turma.turma_letra,
+            Turma.disciplina,
+            TurmaStats.alunos_count,
+            TurmaStats.notas_sum,
+            TurmaStats.notas_count,
+            TurmaStats.atestados_count,
+        )
+        .outerjoin(TurmaStats, TurmaStats.turma_id == Turma.id)
+        .filter(*turma_filters)
+        .all()
+    )
+    if not turmas:
+        return []
+
+    aulas_count_by_turma: dict[int, int] = {
+        int(turma_id): int(count or 0)
+        for turma_id, count in (
+            db.session.query(Atividade.turma_id, func.count(AtividadeAula.id))
+            .join(AtividadeAula, AtividadeAula.atividade_id == Atividade.id)
+            .join(Turma, Atividade.turma_id == Turma.id)
+            .filter(*turma_filters)
+            .filter(_aula_ja_ocorreu(today))
+            .group_by(Atividade.turma_id)
+            .all()
+        )
+    }
+
+    futuros_by_turma: dict[int, tuple[float, int, int]] = {
+        int(turma_id): (float(sum_notas or 0.0), int(count_notas or 0), int(count_atestados or 0))
+        for turma_id, sum_notas, count_notas, count_atestados in (
+            db.session.query(
+                Atividade.turma_id,
+                func.sum(_nota_valida()),
+                func.count(_nota_valida()),
+                func.sum(case((LancamentoAulaAluno.atestado.is_(True), 1), else_=0)),
+            )
+            .select_from(AtividadeAula)
+            .join(LancamentoAulaAluno, LancamentoAulaAluno.aula_id == AtividadeAula.id)
+            .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+            .join(Turma, Atividade.turma_id == Turma.id)
+            .filter(*turma_filters)
+            .filter(AtividadeAula.data > today)
+            .group_by(Atividade.turma_id)
+            .all()
+        )
+    }
+
+    metrics: list[TurmaMetrics] = []
+    for t in turmas:
+        turma_id = int(t.id)
+        futuro_sum, futuro_notas, futuro_atestados = futuros_by_turma.get(turma_id, (0.0, 0, 0))
+        alunos_count = int(t.alunos_count or 0)
+        metrics.append(
+            TurmaMetrics(
+                turma_id=turma_id,
+                professor_id=int(t.professor_id),
+                ano_letivo=int(t.ano_letivo),
+                nome=t.nome,
+                serie=t.serie,
+                turma_letra=t.turma_letra,
+                disciplina=t.disciplina,
+                alunos=alunos_count,
+                eligible_slots=int(aulas_count_by_turma.get(turma_id, 0)) * alunos_count,
+                notas_count=int(t.notas_count or 0) - futuro_notas,
+                notas_sum=float(t.notas_sum or 0.0) - futuro_sum,
+                atestados_count=int(t.atestados_count or 0) - futuro_atestados,
+            )
+        )
+    return metrics
+
+
+def compute_dashboard_summary(*, professor_id: int, ano_letivo: int, today: date) -> DashboardStats:
+    """Só os totais dos cartões do dashboard, num único SELECT agregado (sem desempenho_por_turma).
+
+    Mesmas regras de compute_dashboard_stats, somadas no banco em vez de montar e ordenar as linhas
+    por turma; a tabela por turma é pedida depois pela página (/api/dashboard/turmas).
+    """
+    turma_filters = (Turma.professor_id == professor_id, Turma.ano_letivo == ano_letivo)
+    aulas_sq = _aulas_esperadas_sq(today, *turma_filters)
+    futuros_sq = _lancamentos_futuros_sq(today, *turma_filters)
+    alunos = func.coalesce(TurmaStats.alunos_count, 0)
+    turmas, alunos_total, slots, notas_count, notas_sum, atestados_count = (
+        db.session.query(
+            func.count(Turma.id),
+            func.sum(alunos),
+            func.sum(func.coalesce(aulas_sq.c.aulas, 0) * alunos),
+            func.sum(func.coalesce(TurmaStats.notas_count, 0) - func.coalesce(futuros_sq.c.notas_count, 0)),
+            func.sum(func.coalesce(TurmaStats.notas_sum, 0.0) - func.coalesce(futuros_sq.c.notas_sum, 0.0)),
+            func.sum(func.coalesce(TurmaStats.atestados_count, 0) - func.coalesce(futuros_sq.c.atestados_count, 0)),
+        )
+        .select_from(Turma)
+        .outerjoin(TurmaStats, TurmaStats.turma_id == Turma.id)
+        .outerjoin(aulas_sq, aulas_sq.c.turma_id == Turma.id)
+        .outerjoin(futuros_sq, futuros_sq.c.turma_id == Turma.id)
+        .filter(*turma_filters)
+        .one()
+    )
+    eligible_slots = int(slots or 0)
+    notas_count = int(notas_count or 0)
+    atestados_count = int(atestados_count or 0)
+    denom = eligible_slots - atestados_count
+    return DashboardStats(
+        turmas_ativas=int(turmas or 0),
+        total_alunos=int(alunos_total or 0),
+        avaliacoes_pendentes=max(0, eligible_slots - notas_count - atestados_count) if eligible_slots > 0 else 0,
+        desempenho_media=(
+            round(float(notas_sum or 0.0) / float(denom), 2) if eligible_slots > 0 and denom > 0 else None
+        ),
+    )
+
+
+def compute_dashboard_stats(*, professor_id: int, ano_letivo: int, today: date) -> DashboardStats:
+    """Calcula os indicadores do dashboard de um professor (ver compute_turma_metrics).
+
+    Nota não lançada conta como 0 na média, então o denominador é a carga esperada menos os atestados.
+    """
+    metrics = compute_turma_metrics(today=today, professor_id=professor_id, ano_letivo=ano_letivo)
+    if not metrics:
+        return DashboardStats(
+            turmas_ativas=0,
+            total_alunos=0,
+            avaliacoes_pendentes=0,
+            desempenho_media=None,
+        )
+
+    desempenho_por_turma = [
+        {
+            "id": m.turma_id,
+            "nome": m.nome,
+            "serie": m.serie,
+            "turma_letra": m.turma_letra,
+            "disciplina": m.disciplina,
+            "alunos": m.alunos,
+            "media": m.media,
+            "pendentes": m.pendentes,
+        }
+        for m in metrics
+    ]
+    desempenho_por_turma.sort(key=lambda x: (x["media"] is None, -(x["media"] or 0.0), x["nome"].lower()))
+
+    eligible_slots = sum(m.eligible_slots for m in metrics)
+    notas_count = sum(m.notas_count for m in metrics)
+    atestados_count = sum(m.atestados_count for m in metrics)
+    sum_notas_total = sum(m.notas_sum for m in metrics)
+
+    avaliacoes_pendentes = max(0, eligible_slots - notas_count - atestados_count) if eligible_slots > 0 else 0
+    denom = eligible_slots - atestados_count
+    desempenho_media = round(sum_notas_total / float(denom), 2) if eligible_slots > 0 and denom > 0 else None
+
+    return DashboardStats(
+        turmas_ativas=len(metrics),
+        total_alunos=sum(m.alunos for m in metrics),
+        avaliacoes_pendentes=avaliacoes_pendentes,
+        desempenho_media=desempenho_media,
+        desempenho_por_turma=desempenho_por_turma,
+    )
+
+
+@dataclass(frozen=True)
+class ProfessorMetrics:
+    professor_id: int
+    nome: str
+    email: str
+    escola: str | None
+    turmas: int
+    alunos: int
+    eligible_slots: int
+    notas_count: int
+    notas_sum: float
+    atestados_count: int
+
+    @property
+    def pendentes(self) -> int:
+        return max(0, self.eligible_slots - self.notas_count - self.atestados_count)
+
+    @property
+    def media(self) -> float | None:
+        denom = max(0, self.eligible_slots - self.atestados_count)
+        return round(self.notas_sum / float(denom), 2) if denom > 0 else None
+
+
+def compute_professor_metrics(
+    *,
+    ano_letivo: int,
+    today: date,
+    page: int | None = None,
+    per_page: int = 25,
+) -> tuple[list[ProfessorMetrics], int]:
+    """Indicadores de todos os professores num único SELECT agrupado por professor_id.
+
+    Carga esperada e lançamentos de aulas futuras são agregados por turma em subconsultas e somados
+    por professor no banco. Retorna (página de professores ordenada por nome, total de professores);
+    sem `page`, retorna todos.
+    """
+    aulas_sq = _aulas_esperadas_sq(today)
+    futuros_sq = _lancamentos_futuros_sq(today)
+
+    alunos = func.coalesce(TurmaStats.alunos_count, 0)
+    query = (
+        db.session.query(
+            Professor.id,
+            Professor.nome,
+            Professor.email,
+            Professor.escola,
+            func.count(Turma.id),
+            func.sum(alunos),
+            func.sum(func.coalesce(aulas_sq.c.aulas, 0) * alunos),
+            func.sum(func.coalesce(TurmaStats.notas_count, 0) - func.coalesce(futuros_sq.c.notas_count, 0)),
+            func.sum(func.coalesce(TurmaStats.notas_sum, 0.0) - func.coalesce(futuros_sq.c.notas_sum, 0.0)),
+            func.sum(func.coalesce(TurmaStats.atestados_count, 0) - func.coalesce(futuros_sq.c.atestados_count, 0)),
+        )
+        .outerjoin(Turma, (Turma.professor_id == Professor.id) & (Turma.ano_letivo == ano_letivo))
+        .outerjoin(TurmaStats, TurmaStats.turma_id == Turma.id)
+        .outerjoin(aulas_sq, aulas_sq.c.turma_id == Turma.id)
+        .outerjoin(futuros_sq, futuros_sq.c.turma_id == Turma.id)
+        .group_by(Professor.id, Professor.nome, Professor.email, Professor.escola)
+        .order_by(func.lower(Professor.nome).asc(), Professor.id.asc())
+    )
+
+    total = int(db.session.query(func.count(Professor.id)).scalar() or 0)
+    if page is not None:
+        query = query.limit(per_page).offset((max(1, page) - 1) * per_page)
+
+    return [
+        ProfessorMetrics(
+            professor_id=int(pid),
+            nome=nome,
+            email=email,
+            escola=escola,
+            turmas=int(turmas or 0),
+            alunos=int(alunos_count or 0),
+            eligible_slots=int(slots or 0),
+            notas_count=int(notas_count or 0),
+            notas_sum=float(notas_sum or 0.0),
+            atestados_count=int(atestados_count or 0),
+        )
+        for pid, nome, email, escola, turmas, alunos_count, slots, notas_count, notas_sum, atestados_count in query.all()
+    ], total
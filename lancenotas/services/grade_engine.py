@@ -0,0 +1,223 @@
+"""Cálculo de médias (por atividade, por trimestre e total) compartilhado por turma_detail e fechamento.
+
+Os lançamentos são carregados uma vez, como tuplas de colunas, em matrizes planas `array` (linha = aluno,
+coluna = aula), e reduzidos para aluno × atividade. As médias saem dessas matrizes em laços sobre índices,
+sem dicionários por (atividade, aluno).
+
+Regras (as mesmas das telas):
+- só contam aulas iniciadas: com data <= hoje ou com algum lançamento;
+- nota não lançada vale 0; aula com atestado sai do denominador;
+- média da atividade = soma das notas / (aulas iniciadas - atestados), se o denominador for > 0;
+- média do trimestre = média das atividades ponderada por `peso` (só atividades com denominador > 0).
+"""
+
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import date
+from typing import Iterable
+
+from sqlalchemy import func
+
+from ..constants import MAX_TRIMESTRE
+from ..extensions import db
+from ..models import Atividade, AtividadeAlunoStats, AtividadeAula, LancamentoAulaAluno
+
+
+@dataclass(frozen=True)
+class TrimestreResultado:
+    media: float | None
+    total_pontos: float | None
+    avaliadas: int
+    total_previstas: int
+
+
+class GradeBook:
+    """Somas por aluno × atividade em arrays planos (índice = aluno_idx * n_atividades + atividade_idx)."""
+
+    def __init__(self, *, aluno_ids: list[int], atividades: list[Atividade]) -> None:
+        self.aluno_ids = [int(a) for a in aluno_ids]
+        self.atividade_ids = [int(a.id) for a in atividades]
+        self.aluno_idx = {aid: i for i, aid in enumerate(self.aluno_ids)}
+        self.atividade_idx = {aid: j for j, aid in enumerate(self.atividade_ids)}
+        self.pesos = array("d", [float(a.peso or 1) for a in atividades])
+        self.trimestres = array("b", [max(1, min(MAX_TRIMESTRE, int(a.trimestre or 1))) for a in atividades])
+        self.aulas_iniciadas = array("l", [0]) * len(atividades)
+
+        size = len(self.aluno_ids) * len(self.atividade_ids)
+        self.notas_sum = array("d", [0.0]) * size
+        self.notas_count = array("l", [0]) * size
+        self.atestados = array("l", [0]) * size
+
+    def _media_cell(self, cell: int, j: int) -> float | None:
+        denom = self.aulas_iniciadas[j] - self.atestados[cell]
+        if self.aulas_iniciadas[j] <= 0 or denom <= 0:
+            return None
+        return self.notas_sum[cell] / float(denom)
+
+    def medias_atividade(self, atividade_id: int) -> dict[int, float | None]:
+        """Média de cada aluno numa atividade, arredondada a 2 casas (None sem aulas avaliáveis)."""
+        j = self.atividade_idx.get(int(atividade_id))
+        if j is None:
+            return {aid: None for aid in self.aluno_ids}
+        n = len(self.atividade_ids)
+        result: dict[int, float | None] = {}
+        for i, aid in enumerate(self.aluno_ids):
+            media = self._media_cell(i * n + j, j)
+            result[aid] = round(media, 2) if media is not None else None
+        return result
+
+    def resultados_trimestre(self, trimestre: int) -> dict[int, TrimestreResultado]:
+        """Média ponderada, pontos, notas lançadas e aulas previstas de cada aluno no trimestre."""
+        n = len(self.atividade_ids)
+        cols = [j for j in range(n) if self.trimestres[j] == int(trimestre)]
+        result: dict[int, TrimestreResultado] = {}
+        for i, aid in enumerate(self.aluno_ids):
+            base = i * n
+            tri_sum = 0.0
+            tri_peso = 0.0
+            pontos = 0.0
+            previstas = 0
+            avaliadas = 0
+            for j in cols:
+                cell = base + j
+                avaliadas += self.notas_count[cell]
+                denom = self.aulas_iniciadas[j] - self.atestados[cell]
+                if self.aulas_iniciadas[j] <= 0 or denom <= 0:
+                    continue
+                previstas += denom
+                pontos += self.notas_sum[cell]
+                tri_sum += self.notas_sum[cell] / float(denom) * self.pesos[j]
+                tri_peso += self.pesos[j]
+            result[aid] = TrimestreResultado(
+                media=round(tri_sum / tri_peso, 2) if tri_peso > 0 else None,
+                total_pontos=round(pontos, 2) if previstas > 0 else None,
+                avaliadas=avaliadas,
+                total_previstas=previstas,
+            )
+        return result
+
+
+def _aulas_iniciadas(
+    aula_rows: Iterable[tuple[int, int, date | None]], lancadas: set[int], today: date
+) -> list[tuple[int, int]]:
+    return [
+        (int(aula_id), int(atividade_id))
+        for aula_id, atividade_id, data in aula_rows
+        if (data is not None and data <= today) or int(aula_id) in lancadas
+    ]
+
+
+def gradebook_from_lancamentos(*, aluno_ids: list[int], atividades: list[Atividade], today: date) -> GradeBook:
+    """Carrega aulas e lançamentos das atividades (2 consultas) numa matriz aluno × aula e reduz por atividade."""
+    book = GradeBook(aluno_ids=aluno_ids, atividades=atividades)
+    if not book.atividade_ids:
+        return book
+
+    aula_rows = (
+        db.session.query(AtividadeAula.id, AtividadeAula.atividade_id, AtividadeAula.data)
+        .filter(AtividadeAula.atividade_id.in_(book.atividade_ids))
+        .all()
+    )
+    if not aula_rows:
+        return book
+    lanc_rows = (
+        db.session.query(
+            LancamentoAulaAluno.aula_id,
+            LancamentoAulaAluno.aluno_id,
+            LancamentoAulaAluno.nota,
+            LancamentoAulaAluno.atestado,
+        )
+        .filter(LancamentoAulaAluno.aula_id.in_([int(r[0]) for r in aula_rows]))
+        .all()
+    )
+
+    aulas = _aulas_iniciadas(aula_rows, {int(r[0]) for r in lanc_rows}, today)
+    aula_idx = {aula_id: k for k, (aula_id, _) in enumerate(aulas)}
+    aula_atividade = array("l", [book.atividade_idx[atividade_id] for _, atividade_id in aulas])
+    for j in aula_atividade:
+        book.aulas_iniciadas[j] += 1
+
+    # Matriz aluno × aula: nota (0.0 quando vazia) e estado (0 = sem lançamento, 1 = nota, 2 = atestado).
+    n_aulas = len(aulas)
+    notas = array("d", [0.0]) * (len(book.aluno_ids) * n_aulas)
+    estado = bytearray(len(book.aluno_ids) * n_aulas)
+    for aula_id, aluno_id, nota, atestado in lanc_rows:
+        k = aula_idx.get(int(aula_id))
+        i = book.aluno_idx.get(int(aluno_id))
+        if k is None or i is None:
+            continue
+        cell = i * n_aulas + k
+        if atestado:
+            estado[cell] = 2
+        elif nota is not None:
+            estado[cell] = 1
+            notas[cell] = float(nota)
+
+    n = len(book.atividade_ids)
+    for i in range(len(book.aluno_ids)):
+        row = i * n_aulas
+        base = i * n
+        for k in range(n_aulas):
+            st = estado[row + k]
+            if st == 0:
+                continue
+            cell = base + aula_atividade[k]
+            if st == 2:
+                book.atestados[cell] += 1
+            else:
+                book.notas_sum[cell] += notas[row + k]
+                book.notas_count[cell] += 1
+    return book
+
+
+def gradebook_from_stats(
+    *, turma_id: int, aluno_ids: list[int], atividades: list[Atividade], today: date
+) -> GradeBook:
+    """Mesmo resultado de `gradebook_from_lancamentos`, lendo as somas já agregadas em AtividadeAlunoStats.
+
+    Todo lançamento está numa aula iniciada, então os agregados cobrem exatamente as aulas elegíveis.
+    """
+    book = GradeBook(aluno_ids=aluno_ids, atividades=atividades)
+    if not book.atividade_ids:
+        return book
+
+    lancadas = (
+        db.session.query(LancamentoAulaAluno.aula_id)
+        .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
+        .filter(AtividadeAula.atividade_id.in_(book.atividade_ids))
+        .filter((AtividadeAula.data.is_(None)) | (AtividadeAula.data > today))
+        .distinct()
+    )
+    for atividade_id, count in (
+        db.session.query(AtividadeAula.atividade_id, func.count(AtividadeAula.id))
+        .filter(AtividadeAula.atividade_id.in_(book.atividade_ids))
+        .filter(((AtividadeAula.data.isnot(None)) & (AtividadeAula.data <= today)) | AtividadeAula.id.in_(lancadas))
+        .group_by(AtividadeAula.atividade_id)
+        .all()
+    ):
+        book.aulas_iniciadas[book.atividade_idx[int(atividade_id)]] = int(count)
+
+    n = len(book.atividade_ids)
+    for atividade_id, aluno_id, notas_sum, notas_count, atestados in (
+        db.session.query(
+            AtividadeAlunoStats.atividade_id,
+            AtividadeAlunoStats.aluno_id,
+            AtividadeAlunoStats.notas_sum,
+            AtividadeAlunoStats.notas_count,
+            AtividadeAlunoStats.atestados_count,
+        )
+        .filter(AtividadeAlunoStats.turma_id == turma_id)
+        .filter(AtividadeAlunoStats.atividade_id.in_(book.atividade_ids))
+        .all()
+    ):
+        i = book.aluno_idx.get(int(aluno_id))
+        j = book.atividade_idx.get(int(atividade_id))
+        if i is None or j is None:
+            continue
+        cell = i * n + j
+        book.notas_sum[cell] = float(notas_sum or 0.0)
+        book.notas_count[cell] = int(notas_count or 0)
+        book.atestados[cell] = int(atestados or 0)
+    return book
@@ -0,0 +1,128 @@
+"""Histórico dos lançamentos: as mudanças de cada salvamento entram num único INSERT, na mesma transação,
+e são lidas em páginas por aluno ou por aula."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import func
+
+from ..extensions import db
+from ..models import Aluno, Atividade, AtividadeAula, LancamentoHistorico, Professor
+from .turma_stats import LancamentoValor
+
+HISTORICO_PER_PAGE = 50
+
+# (aula_id, aluno_id, antes, depois); None quando o lançamento não existia / deixou de existir.
+Mudanca = tuple[int, int, LancamentoValor | None, LancamentoValor | None]
+
+
+def registrar_mudancas(*, turma_id: int, professor_id: int, mudancas: list[Mudanca]) -> int:
+    """Grava uma linha de histórico por mudança de nota ou atestado, todas num único INSERT.
+
+    Roda na transação do salvamento: o histórico é gravado se e somente se a mudança for. Mudanças só de
+    observação não entram. Retorna quantas linhas foram gravadas. Não faz commit.
+    """
+    now = datetime.utcnow()
+    rows: list[dict] = []
+    for aula_id, aluno_id, antes, depois in mudancas:
+        nota_antes, atestado_antes = antes if antes is not None else (None, False)
+        nota_depois, atestado_depois = depois if depois is not None else (None, False)
+        if (nota_antes, bool(atestado_antes)) == (nota_depois, bool(atestado_depois)):
+            continue
+        rows.append(
+            {
+                "turma_id": int(turma_id),
+                "aula_id": int(aula_id),
+                "aluno_id": int(aluno_id),
+                "professor_id": int(professor_id),
+                "nota_antes": nota_antes,
+                "atestado_antes": bool(atestado_antes),
+                "nota_depois": nota_depois,
+                "atestado_depois": bool(atestado_depois),
+                "created_at": now,
+            }
+        )
+    if rows:
+        db.session.execute(LancamentoHistorico.__table__.insert(), rows)
+    return len(rows)
+
+
+def _valor_texto(nota: float | None, atestado: bool) -> str:
+    if atestado:
+        return "A"
+    if nota is None:
+        return "—"
+    return ("%.2f" % nota).rstrip("0").rstrip(".")
+
+
+@dataclass(frozen=True)
+class HistoricoLinha:
+    id: int
+    created_at: datetime
+    professor_nome: str
+    aula_id: int
+    aula_numero: int | None
+    atividade_titulo: str | None
+    aluno_id: int
+    aluno_nome: str | None
+    nota_antes: float | None
+    atestado_antes: bool
+    nota_depois: float | None
+    atestado_depois: bool
+
+    @property
+    def antes(self) -> str:
+        return _valor_texto(self.nota_antes, self.atestado_antes)
+
+    @property
+    def depois(self) -> str:
+        return _valor_texto(self.nota_depois, self.atestado_depois)
+
+
+def historico_paginado(
+    *,
+    turma_id: int,
+    aluno_id: int | None = None,
+    aula_id: int | None = None,
+    page: int = 1,
+    per_page: int = HISTORICO_PER_PAGE,
+) -> tuple[list[HistoricoLinha], int]:
+    """Página do histórico da turma (mais recente primeiro), filtrada por aluno e/ou aula; retorna (linhas, total).
+
+    Aula, atividade e aluno vêm por junção externa: mudanças de aulas já removidas aparecem sem o título.
+    """
+    filtros = [LancamentoHistorico.turma_id == turma_id]
+    if aluno_id is not None:
+        filtros.append(LancamentoHistorico.aluno_id == aluno_id)
+    if aula_id is not None:
+        filtros.append(LancamentoHistorico.aula_id == aula_id)
+
+    total = int(db.session.query(func.count(LancamentoHistorico.id)).filter(*filtros).scalar() or 0)
+    rows = (
+        db.session.query(
+            LancamentoHistorico.id,
+            LancamentoHistorico.created_at,
+            Professor.nome,
+            LancamentoHistorico.aula_id,
+            AtividadeAula.numero,
+            Atividade.titulo,
+            LancamentoHistorico.aluno_id,
+            Aluno.nome_completo,
+            LancamentoHistorico.nota_antes,
+            LancamentoHistorico.atestado_antes,
+            LancamentoHistorico.nota_depois,
+            LancamentoHistorico.atestado_depois,
+        )
+        .join(Professor, Professor.id == LancamentoHistorico.professor_id)
+        .outerjoin(AtividadeAula, AtividadeAula.id == LancamentoHistorico.aula_id)
+        .outerjoin(Atividade, Atividade.id == AtividadeAula.atividade_id)
+        .outerjoin(Aluno, Aluno.id == LancamentoHistorico.aluno_id)
+        .filter(*filtros)
+        .order_by(LancamentoHistorico.id.desc())
+        .limit(per_page)
+        .offset((max(1, page) - 1) * per_page)
+        .all()
+    )
+    return [HistoricoLinha(*row) for row in rows], total
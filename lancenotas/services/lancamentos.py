@@ -0,0 +1,414 @@
+"""Gravação dos lançamentos de uma aula (nota, atestado e observação por aluno): em lote, pelo
+formulário da aula; uma célula por vez, pela API, com controle de concorrência por `updated_at`; ou
+em lotes de edições feitas sem conexão, com chave de idempotência (`sync_lancamentos`)."""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+from typing import NamedTuple
+
+from ..extensions import db
+from ..models import Aluno, Atividade, AtividadeAula, LancamentoAulaAluno, LancamentoSyncItem, Turma
+from .historico import Mudanca, registrar_mudancas
+from .turma_stats import LancamentoValor, apply_lancamento_changes
+from .upsert import upsert_insert
+
+# (nota, atestado, observacao) informados para um aluno; None quando o lançamento deve ser apagado.
+LancamentoEntrada = tuple[float | None, bool, str | None]
+# (aula_id, aluno_id)
+Celula = tuple[int, int]
+
+NOTA_INVALIDA = "Valor inválido em nota. Use 0–10 ou 'A' (atestado)."
+
+
+class LancamentoConflito(Exception):
+    """O lançamento mudou (ou foi criado/apagado) depois do `updated_at` que o cliente tinha."""
+
+    def __init__(self, atual: LancamentoAulaAluno | None) -> None:
+        super().__init__("lançamento alterado por outra sessão")
+        self.atual = atual
+
+
+def parse_lancamento(nota_raw: str, atestado: bool, observacao_raw: str) -> LancamentoEntrada | None:
+    """Valida os campos de um aluno como no formulário da aula; None quando ficou tudo vazio.
+
+    Nota de 0 a 10 (aceita vírgula; fora da faixa é limitada), "A" marca atestado, e com atestado a nota é
+    descartada. Levanta ValueError(NOTA_INVALIDA) para nota que não é número.
+    """
+    nota_str = (nota_raw or "").strip()
+    observacao = (observacao_raw or "").strip()
+    atestado = bool(atestado)
+    nota = None
+    if nota_str != "":
+        if nota_str.upper() == "A":
+            atestado = True
+        elif not atestado:
+            try:
+                nota = max(0.0, min(10.0, float(nota_str.replace(",", "."))))
+            except ValueError:
+                raise ValueError(NOTA_INVALIDA) from None
+    if not atestado and nota is None and observacao == "":
+        return None
+    return nota, atestado, observacao or None
+
+
+def _gravar(upserts: list[dict], delete_ids: list[int]) -> None:
+    """Um INSERT … ON CONFLICT (aula_id, aluno_id) DO UPDATE para `upserts` e um DELETE para `delete_ids`."""
+    if upserts:
+        stmt = upsert_insert(LancamentoAulaAluno)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LancamentoAulaAluno.aula_id, LancamentoAulaAluno.aluno_id],
+            set_={
+                "nota": stmt.excluded.nota,
+                "atestado": stmt.excluded.atestado,
+                "observacao": stmt.excluded.observacao,
+                "updated_at": stmt.excluded.updated_at,
+            },
+        )
+        db.session.execute(stmt, upserts)
+    if delete_ids:
+        LancamentoAulaAluno.query.filter(LancamentoAulaAluno.id.in_(delete_ids)).delete(synchronize_session=False)
+
+
+def _existentes(aula_ids) -> dict[Celula, tuple[int, float | None, bool, str | None]]:
+    """Lançamentos das aulas, numa consulta: (aula_id, aluno_id) -> (id, nota, atestado, observacao)."""
+    return {
+        (int(aula_id), int(aluno_id)): (int(lanc_id), nota, bool(atestado), observacao)
+        for lanc_id, aula_id, aluno_id, nota, atestado, observacao in db.session.query(
+            LancamentoAulaAluno.id,
+            LancamentoAulaAluno.aula_id,
+            LancamentoAulaAluno.aluno_id,
+            LancamentoAulaAluno.nota,
+            LancamentoAulaAluno.atestado,
+            LancamentoAulaAluno.observacao,
+        ).filter(LancamentoAulaAluno.aula_id.in_(list(aula_ids)))
+    }
+
+
+def _aplicar_entradas(
+    *,
+    turma_id: int,
+    atividade_id: int,
+    professor_id: int,
+    existentes: dict[Celula, tuple[int, float | None, bool, str | None]],
+    entradas: dict[Celula, LancamentoEntrada | None],
+) -> tuple[int, int]:
+    now = datetime.utcnow()
+    upserts: list[dict] = []
+    delete_ids: list[int] = []
+    mudancas: list[Mudanca] = []
+    for (aula_id, aluno_id), entrada in entradas.items():
+        atual = existentes.get((aula_id, aluno_id))
+        old_valor: LancamentoValor | None = (atual[1], atual[2]) if atual is not None else None
+        if entrada is None:
+            if atual is not None:
+                delete_ids.append(atual[0])
+                mudancas.append((aula_id, aluno_id, old_valor, None))
+            continue
+        if atual is not None and atual[1:] == entrada:
+            continue
+        nota, atestado, observacao = entrada
+        upserts.append(
+            {
+                "aula_id": aula_id,
+                "aluno_id": aluno_id,
+                "nota": nota,
+                "atestado": bool(atestado),
+                "observacao": observacao,
+                "updated_at": now,
+            }
+        )
+        mudancas.append((aula_id, aluno_id, old_valor, (nota, bool(atestado))))
+
+    _gravar(upserts, delete_ids)
+    apply_lancamento_changes(
+        turma_id=turma_id, atividade_id=atividade_id, changes=[(aluno_id, old, new) for _, aluno_id, old, new in mudancas]
+    )
+    registrar_mudancas(turma_id=turma_id, professor_id=professor_id, mudancas=mudancas)
+    return len(upserts), len(delete_ids)
+
+
+def save_aula_lancamentos(
+    *,
+    turma_id: int,
+    atividade_id: int,
+    aula_id: int,
+    professor_id: int,
+    entradas: dict[int, LancamentoEntrada | None],
+) -> tuple[int, int]:
+    """Grava os lançamentos de uma aula com um número fixo de comandos, qualquer que seja a turma.
+
+    Carrega os lançamentos existentes da aula numa consulta, grava os que mudaram com um único
+    INSERT … ON CONFLICT (aula_id, aluno_id) DO UPDATE e apaga os esvaziados com um único DELETE.
+    Alunos fora de `entradas` não são tocados; linhas sem mudança não são regravadas (mantêm updated_at).
+    Os agregados (TurmaStats / AtividadeAlunoStats) recebem as diferenças e as mudanças de nota/atestado
+    entram no histórico em nome de `professor_id`. Retorna (gravados, apagados). Não faz commit.
+    """
+    return _aplicar_entradas(
+        turma_id=turma_id,
+        atividade_id=atividade_id,
+        professor_id=professor_id,
+        existentes=_existentes([aula_id]),
+        entradas={(int(aula_id), int(aluno_id)): entrada for aluno_id, entrada in entradas.items()},
+    )
+
+
+def save_atividade_notas(
+    *,
+    turma_id: int,
+    atividade_id: int,
+    professor_id: int,
+    notas: dict[Celula, tuple[float | None, bool] | None],
+) -> tuple[int, int]:
+    """Grava a grade aluno × aula de uma atividade (nota ou atestado por célula) de uma vez.
+
+    Como `save_aula_lancamentos`, mas para todas as aulas: uma consulta, um upsert e um DELETE. A grade
+    não edita observações: elas são mantidas, e uma célula esvaziada que tem observação continua gravada
+    só com ela. Células fora de `notas` não são tocadas. Retorna (gravados, apagados). Não faz commit.
+    """
+    existentes = _existentes({aula_id for aula_id, _ in notas})
+    entradas: dict[Celula, LancamentoEntrada | None] = {}
+    for (aula_id, aluno_id), valor in notas.items():
+        nota, atestado = valor if valor is not None else (None, False)
+        atual = existentes.get((int(aula_id), int(aluno_id)))
+        observacao = atual[3] if atual is not None else None
+        vazia = not atestado and nota is None and not observacao
+        entradas[(int(aula_id), int(aluno_id))] = None if vazia else (nota, bool(atestado), observacao)
+    return _aplicar_entradas(
+        turma_id=turma_id, atividade_id=atividade_id, professor_id=professor_id, existentes=existentes, entradas=entradas
+    )
+
+
+def _lancamento_atual(aula_id: int, aluno_id: int) -> LancamentoAulaAluno | None:
+    return (
+        LancamentoAulaAluno.query.filter_by(aula_id=aula_id, aluno_id=aluno_id)
+        .execution_options(populate_existing=True)
+        .first()
+    )
+
+
+def save_lancamento(
+    *,
+    turma_id: int,
+    atividade_id: int,
+    aula_id: int,
+    aluno_id: int,
+    professor_id: int,
+    entrada: LancamentoEntrada | None,
+    updated_at: datetime | None,
+) -> datetime | None:
+    """Grava um único lançamento se ele ainda estiver como o cliente o viu (`updated_at`; None = não existia).
+
+    A comparação vai no próprio comando (UPDATE/DELETE … WHERE updated_at = :visto, INSERT … ON CONFLICT
+    DO NOTHING), então duas gravações simultâneas com o mesmo `updated_at` não passam as duas. Levanta
+    LancamentoConflito com o lançamento atual quando a versão não confere. Valores iguais aos gravados não
+    regravam nada. Retorna o novo `updated_at` (None se o lançamento foi apagado). Não faz commit.
+    """
+    atual = _lancamento_atual(aula_id, aluno_id)
+    if (atual.updated_at if atual is not None else None) != updated_at:
+        raise LancamentoConflito(atual)
+
+    if atual is not None and entrada is not None and (atual.nota, bool(atual.atestado), atual.observacao) == entrada:
+        return atual.updated_at
+    if atual is None and entrada is None:
+        return None
+
+    now = datetime.utcnow()
+    if entrada is None:
+        result = db.session.execute(
+            LancamentoAulaAluno.__table__.delete().where(
+                LancamentoAulaAluno.id == atual.id, LancamentoAulaAluno.updated_at == updated_at
+            )
+        )
+    elif atual is None:
+        nota, atestado, observacao = entrada
+        stmt = upsert_insert(LancamentoAulaAluno).values(
+            aula_id=aula_id, aluno_id=aluno_id, nota=nota, atestado=atestado, observacao=observacao, updated_at=now
+        )
+        result = db.session.execute(stmt.on_conflict_do_nothing(index_elements=["aula_id", "aluno_id"]))
+    else:
+        nota, atestado, observacao = entrada
+        result = db.session.execute(
+            LancamentoAulaAluno.__table__.update()
+            .where(LancamentoAulaAluno.id == atual.id, LancamentoAulaAluno.updated_at == updated_at)
+            .values(nota=nota, atestado=atestado, observacao=observacao, updated_at=now)
+        )
+    if result.rowcount != 1:
+        raise LancamentoConflito(_lancamento_atual(aula_id, aluno_id))
+
+    old_valor: LancamentoValor | None = (atual.nota, bool(atual.atestado)) if atual is not None else None
+    new_valor: LancamentoValor | None = (entrada[0], entrada[1]) if entrada is not None else None
+    apply_lancamento_changes(turma_id=turma_id, atividade_id=atividade_id, changes=[(aluno_id, old_valor, new_valor)])
+    registrar_mudancas(turma_id=turma_id, professor_id=professor_id, mudancas=[(aula_id, aluno_id, old_valor, new_valor)])
+    return now if entrada is not None else None
+
+
+class _Lancamento(NamedTuple):
+    nota: float | None
+    atestado: bool
+    observacao: str | None
+    updated_at: datetime
+
+
+def lancamento_json(*, aula_id: int, aluno_id: int, lanc) -> dict:
+    """Representação de um lançamento na API (`lanc` com nota/atestado/observacao/updated_at, ou None)."""
+    return {
+        "aula_id": int(aula_id),
+        "aluno_id": int(aluno_id),
+        "nota": lanc.nota if lanc is not None else None,
+        "atestado": bool(lanc.atestado) if lanc is not None else False,
+        "observacao": lanc.observacao if lanc is not None else None,
+        "updated_at": lanc.updated_at.isoformat() if lanc is not None else None,
+    }
+
+
+@dataclass(frozen=True)
+class SyncItem:
+    """Edição enfileirada no cliente: célula, valor, versão que o cliente tinha e quando editou."""
+
+    chave: str
+    aula_id: int
+    aluno_id: int
+    entrada: LancamentoEntrada | None
+    updated_at: datetime | None
+    cliente_em: datetime | None = None
+
+
+def sync_lancamentos(*, professor_id: int, itens: list[SyncItem]) -> tuple[dict[str, dict], set[int]]:
+    """Aplica um lote de edições feitas sem conexão, com um número fixo de comandos, qualquer que seja o lote.
+
+    Chaves já processadas (em LancamentoSyncItem ou repetidas no lote) devolvem o resultado gravado da
+    primeira vez, marcado com "repetido", e não são reaplicadas. As edições novas são agrupadas por célula
+    (aula, aluno) e ordenadas por `cliente_em`: a versão conferida é a da primeira edição da célula (a que
+    o cliente tinha antes de ficar sem conexão) e o valor gravado é o da última. Células que mudaram no
+    servidor voltam como "conflito" com o valor atual; as demais, "aplicado".
+    Retorna (resultado por chave, turmas alteradas). Não faz commit.
+    """
+    resultados: dict[str, dict] = {}
+    chaves = {item.chave for item in itens}
+    if chaves:
+        resultados = {
+            chave: {**resultado, "repetido": True}
+            for chave, resultado in db.session.query(LancamentoSyncItem.chave, LancamentoSyncItem.resultado).filter(
+                LancamentoSyncItem.professor_id == professor_id, LancamentoSyncItem.chave.in_(chaves)
+            )
+        }
+    novos: dict[str, SyncItem] = {}
+    for item in itens:
+        if item.chave not in resultados and item.chave not in novos:
+            novos[item.chave] = item
+    if not novos:
+        return resultados, set()
+
+    aulas: dict[int, tuple[int, int]] = {
+        int(aula_id): (int(atividade_id), int(turma_id))
+        for aula_id, atividade_id, turma_id in db.session.query(AtividadeAula.id, Atividade.id, Atividade.turma_id)
+        .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+        .join(Turma, Atividade.turma_id == Turma.id)
+        .filter(AtividadeAula.id.in_({item.aula_id for item in novos.values()}), Turma.professor_id == professor_id)
+    }
+    turma_do_aluno: dict[int, int] = {
+        int(aluno_id): int(turma_id)
+        for aluno_id, turma_id in db.session.query(Aluno.id, Aluno.turma_id).filter(
+            Aluno.id.in_({item.aluno_id for item in novos.values()}), Aluno.status == "ativo"
+        )
+    }
+
+    celulas: dict[tuple[int, int], list[SyncItem]] = {}
+    for item in novos.values():
+        aula = aulas.get(item.aula_id)
+        if aula is None or turma_do_aluno.get(item.aluno_id) != aula[1]:
+            resultados[item.chave] = {"status": "nao_encontrado", "error": "Lançamento não encontrado."}
+        else:
+            celulas.setdefault((item.aula_id, item.aluno_id), []).append(item)
+
+    atuais = {}
+    if celulas:
+        atuais = {
+            (int(row.aula_id), int(row.aluno_id)): row
+            for row in db.session.query(
+                LancamentoAulaAluno.id,
+                LancamentoAulaAluno.aula_id,
+                LancamentoAulaAluno.aluno_id,
+                LancamentoAulaAluno.nota,
+                LancamentoAulaAluno.atestado,
+                LancamentoAulaAluno.observacao,
+                LancamentoAulaAluno.updated_at,
+            )
+            .filter(
+                LancamentoAulaAluno.aula_id.in_({aula_id for aula_id, _ in celulas}),
+                LancamentoAulaAluno.aluno_id.in_({aluno_id for _, aluno_id in celulas}),
+            )
+            .with_for_update()
+        }
+
+    now = datetime.utcnow()
+    upserts: list[dict] = []
+    delete_ids: list[int] = []
+    changes: dict[tuple[int, int], list[Mudanca]] = {}
+    for (aula_id, aluno_id), edicoes in celulas.items():
+        edicoes.sort(key=lambda item: item.cliente_em or datetime.min)
+        atual = atuais.get((aula_id, aluno_id))
+        if edicoes[0].updated_at != (atual.updated_at if atual is not None else None):
+            resultado = {
+                "status": "conflito",
+                "error": "Este lançamento foi alterado em outra sessão.",
+                "lancamento": lancamento_json(aula_id=aula_id, aluno_id=aluno_id, lanc=atual),
+            }
+        else:
+            entrada = edicoes[-1].entrada
+            estado = atual
+            if entrada != ((atual.nota, bool(atual.atestado), atual.observacao) if atual is not None else None):
+                atividade_id, turma_id = aulas[aula_id]
+                if entrada is None:
+                    delete_ids.append(int(atual.id))
+                    estado = None
+                else:
+                    nota, atestado, observacao = entrada
+                    upserts.append(
+                        {
+                            "aula_id": aula_id,
+                            "aluno_id": aluno_id,
+                            "nota": nota,
+                            "atestado": atestado,
+                            "observacao": observacao,
+                            "updated_at": now,
+                        }
+                    )
+                    estado = _Lancamento(nota, atestado, observacao, now)
+                changes.setdefault((turma_id, atividade_id), []).append(
+                    (
+                        aula_id,
+                        aluno_id,
+                        (atual.nota, bool(atual.atestado)) if atual is not None else None,
+                        (entrada[0], entrada[1]) if entrada is not None else None,
+                    )
+                )
+            resultado = {"status": "aplicado", "lancamento": lancamento_json(aula_id=aula_id, aluno_id=aluno_id, lanc=estado)}
+        for item in edicoes:
+            resultados[item.chave] = resultado
+
+    _gravar(upserts, delete_ids)
+    mudancas_por_turma: dict[int, list[Mudanca]] = {}
+    for (turma_id, atividade_id), mudancas in changes.items():
+        apply_lancamento_changes(
+            turma_id=turma_id, atividade_id=atividade_id, changes=[(aluno_id, old, new) for _, aluno_id, old, new in mudancas]
+        )
+        mudancas_por_turma.setdefault(turma_id, []).extend(mudancas)
+    for turma_id, mudancas in mudancas_por_turma.items():
+        registrar_mudancas(turma_id=turma_id, professor_id=professor_id, mudancas=mudancas)
+
+    db.session.execute(
+        LancamentoSyncItem.__table__.insert(),
+        [
+            {"professor_id": professor_id, "chave": chave, "resultado": resultados[chave], "created_at": now}
+            for chave in novos
+        ],
+    )
+    return resultados, {turma_id for turma_id, _ in changes}
+
+
+def purge_sync_items(*, antes: datetime) -> int:
+    """Apaga as chaves de idempotência gravadas antes de `antes`; retorna quantas. Não faz commit."""
+    return LancamentoSyncItem.query.filter(LancamentoSyncItem.created_at < antes).delete(synchronize_session=False)
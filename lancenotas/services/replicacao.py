@@ -0,0 +1,88 @@
+"""Replicação de uma atividade (e do seu plano de aulas) em outras turmas do professor.
+
+As cópias das atividades saem num INSERT em lote e todas as aulas de todas as cópias num único
+executemany; com agendamento, as datas de cada turma são calculadas antes de qualquer escrita, a partir
+dos horários de todas as turmas lidos numa consulta.
+"""
+
+from __future__ import annotations
+
+from datetime import date
+from typing import Collection
+
+from sqlalchemy import insert
+
+from ..extensions import db
+from ..models import Atividade, AtividadeAula, Turma
+from .agenda import encontros_por_turma, proximas_datas
+
+
+def replicar_atividade(
+    *,
+    atividade: Atividade,
+    turmas: list[Turma],
+    inicio: date | None = None,
+    feriados: Collection[date] = frozenset(),
+) -> list[int]:
+    """Copia a atividade e suas aulas para cada turma de `turmas`; devolve os ids das cópias, na mesma ordem.
+
+    Sem `inicio` as aulas mantêm as datas da original; com `inicio` cada turma recebe as datas dos
+    próprios horários a partir dele. Levanta ValueError (com o nome da turma) se alguma turma não puder
+    ser agendada, antes de gravar qualquer coisa. Quem chama escolhe as turmas (mesmo professor e ano
+    letivo). Não faz commit.
+    """
+    if not turmas:
+        return []
+    aulas = (
+        db.session.query(AtividadeAula.numero, AtividadeAula.data)
+        .filter(AtividadeAula.atividade_id == atividade.id)
+        .order_by(AtividadeAula.numero.asc())
+        .all()
+    )
+
+    datas_por_turma: dict[int, list[date | None]] = {}
+    if inicio is None:
+        datas_por_turma = {int(turma.id): [aula.data for aula in aulas] for turma in turmas}
+    else:
+        encontros = encontros_por_turma([int(turma.id) for turma in turmas])
+        for turma in turmas:
+            try:
+                datas_por_turma[int(turma.id)] = list(
+                    proximas_datas(
+                        encontros=encontros[int(turma.id)], inicio=inicio, quantidade=len(aulas), feriados=feriados
+                    )
+                )
+            except ValueError as exc:
+                raise ValueError(f"{turma.nome}: {exc}") from None
+
+    # Cada turma recebe uma cópia, então o turma_id devolvido identifica a linha sem depender da ordem
+    # do RETURNING (o que permite ao dialeto juntar as linhas num só INSERT).
+    copias = {
+        int(turma_id): int(copia_id)
+        for copia_id, turma_id in db.session.execute(
+            insert(Atividade).returning(Atividade.id, Atividade.turma_id),
+            [
+                {
+                    "turma_id": int(turma.id),
+                    "titulo": atividade.titulo,
+                    "descricao": atividade.descricao,
+                    "data": atividade.data,
+                    "trimestre": atividade.trimestre,
+                    "peso": atividade.peso,
+                    "nota_maxima": atividade.nota_maxima,
+                    "aulas_planejadas": atividade.aulas_planejadas,
+                    "status": atividade.status,
+                }
+                for turma in turmas
+            ],
+        )
+    }
+
+    linhas = [
+        {"atividade_id": copias[int(turma.id)], "numero": int(aula.numero), "data": data}
+        for turma in turmas
+        for aula, data in zip(aulas, datas_por_turma[int(turma.id)])
+    ]
+    if linhas:
+        db.session.execute(insert(AtividadeAula), linhas)
+    return [copias[int(turma.id)] for turma in turmas]
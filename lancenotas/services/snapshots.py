@@ -0,0 +1,48 @@
+"""Escolha do snapshot de fechamento "vencedor" por (estudante, trimestre), resolvida no banco."""
+
+from __future__ import annotations
+
+from sqlalchemy import case, func
+
+from ..extensions import db
+from ..models import FechamentoTrimestreAluno
+
+
+def best_snapshots(
+    *,
+    ano_letivo: int,
+    estudante_ids: list[int],
+    prefer_turma_id: int | None = None,
+    exclude_turma_id: int | None = None,
+    trimestre: int | None = None,
+) -> dict[tuple[int, int], FechamentoTrimestreAluno]:
+    """Um snapshot por (estudante_id, trimestre): o da turma `prefer_turma_id`, senão o mais recente.
+
+    ROW_NUMBER() particionado por (estudante_id, trimestre) escolhe a linha no banco, que devolve só as
+    vencedoras (apoiado pelo índice ix_fechamento_aluno_ano_estudante_tri). `exclude_turma_id` ignora os
+    snapshots de uma turma (ex.: ao procurar o de origem de um aluno transferido).
+    """
+    if not estudante_ids:
+        return {}
+
+    f = FechamentoTrimestreAluno
+    order_by = [f.created_at.desc(), f.id.desc()]
+    if prefer_turma_id is not None:
+        order_by.insert(0, case((f.turma_id == int(prefer_turma_id), 0), else_=1))
+
+    filters = [f.ano_letivo == int(ano_letivo), f.estudante_id.in_(estudante_ids)]
+    if trimestre is not None:
+        filters.append(f.trimestre == int(trimestre))
+    if exclude_turma_id is not None:
+        filters.append(f.turma_id != int(exclude_turma_id))
+
+    ranked = (
+        db.session.query(
+            f.id.label("id"),
+            func.row_number().over(partition_by=(f.estudante_id, f.trimestre), order_by=order_by).label("rn"),
+        )
+        .filter(*filters)
+        .subquery()
+    )
+    rows = f.query.join(ranked, ranked.c.id == f.id).filter(ranked.c.rn == 1).all()
+    return {(int(r.estudante_id), int(r.trimestre)): r for r in rows}
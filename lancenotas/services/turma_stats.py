@@ -0,0 +1,322 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import case, func, null
+
+from ..extensions import db
+from ..models import (
+    Aluno,
+    Atividade,
+    AtividadeAlunoStats,
+    AtividadeAula,
+    LancamentoAulaAluno,
+    Turma,
+    TurmaStats,
+)
+from .upsert import upsert_insert
+
+# (nota, atestado) de um lançamento; None quando o lançamento não existe.
+LancamentoValor = tuple[float | None, bool]
+
+
+@dataclass(frozen=True)
+class StatsDrift:
+    tabela: str
+    chave: tuple[int, ...]
+    armazenado: tuple | None
+    calculado: tuple | None
+
+
+def _nota_valida():
+    # Lançamento com atestado não entra na soma, mesmo que tenha nota.
+    return case((LancamentoAulaAluno.atestado.is_(True), null()), else_=LancamentoAulaAluno.nota)
+
+
+def _atestado_int():
+    return case((LancamentoAulaAluno.atestado.is_(True), 1), else_=0)
+
+
+def _contribuicao(valor: LancamentoValor | None) -> tuple[float, int, int]:
+    if valor is None:
+        return 0.0, 0, 0
+    nota, atestado = valor
+    if atestado:
+        return 0.0, 0, 1
+    if nota is None:
+        return 0.0, 0, 0
+    return float(nota), 1, 0
+
+
+def _lancamento_totals(turma_id: int) -> tuple[float, int, int]:
+    row = (
+        db.session.query(func.sum(_nota_valida()), func.count(_nota_valida()), func.sum(_atestado_int()))
+        .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
+        .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+        .filter(Atividade.turma_id == turma_id)
+        .one()
+    )
+    return float(row[0] or 0.0), int(row[1] or 0), int(row[2] or 0)
+
+
+def _roster_counts(turma_id: int) -> tuple[int, int]:
+    row = (
+        db.session.query(func.count(Aluno.id), func.sum(case((Aluno.status == "ativo", 1), else_=0)))
+        .filter(Aluno.turma_id == turma_id)
+        .one()
+    )
+    return int(row[0] or 0), int(row[1] or 0)
+
+
+def _turma_stats_for_update(turma_id: int) -> tuple[TurmaStats, bool]:
+    """Devolve a linha de TurmaStats; se ainda não existir, cria já calculada a partir da origem."""
+    stats = db.session.get(TurmaStats, turma_id)
+    if stats is not None:
+        return stats, False
+
+    alunos_count, alunos_ativos_count = _roster_counts(turma_id)
+    notas_sum, notas_count, atestados_count = _lancamento_totals(turma_id)
+    stats = TurmaStats(
+        turma_id=turma_id,
+        alunos_count=alunos_count,
+        alunos_ativos_count=alunos_ativos_count,
+        notas_sum=notas_sum,
+        notas_count=notas_count,
+        atestados_count=atestados_count,
+    )
+    db.session.add(stats)
+    return stats, True
+
+
+def apply_lancamento_changes(
+    *,
+    turma_id: int,
+    atividade_id: int,
+    changes: list[tuple[int, LancamentoValor | None, LancamentoValor | None]],
+) -> None:
+    """Aplica incrementalmente as mudanças (aluno_id, antes, depois) de lançamentos de uma atividade.
+
+    As diferenças por aluno vão para AtividadeAlunoStats num único upsert, qualquer que seja o número
+    de alunos; TurmaStats recebe a soma. Deve rodar na mesma transação que grava os lançamentos; não faz commit.
+    """
+    deltas: dict[int, tuple[float, int, int]] = {}
+    for aluno_id, old, new in changes:
+        old_sum, old_count, old_atestados = _contribuicao(old)
+        new_sum, new_count, new_atestados = _contribuicao(new)
+        delta = (new_sum - old_sum, new_count - old_count, new_atestados - old_atestados)
+        if delta == (0.0, 0, 0):
+            continue
+        prev = deltas.get(int(aluno_id), (0.0, 0, 0))
+        deltas[int(aluno_id)] = (prev[0] + delta[0], prev[1] + delta[1], prev[2] + delta[2])
+
+    if not deltas:
+        return
+
+    # Um único INSERT … ON CONFLICT soma as diferenças às linhas existentes (ou cria as que faltam).
+    now = datetime.utcnow()
+    stmt = upsert_insert(AtividadeAlunoStats)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AtividadeAlunoStats.atividade_id, AtividadeAlunoStats.aluno_id],
+        set_={
+            "notas_sum": AtividadeAlunoStats.notas_sum + stmt.excluded.notas_sum,
+            "notas_count": AtividadeAlunoStats.notas_count + stmt.excluded.notas_count,
+            "atestados_count": AtividadeAlunoStats.atestados_count + stmt.excluded.atestados_count,
+            "updated_at": stmt.excluded.updated_at,
+        },
+    )
+    db.session.execute(
+        stmt,
+        [
+            {
+                "atividade_id": int(atividade_id),
+                "aluno_id": aluno_id,
+                "turma_id": int(turma_id),
+                "notas_sum": d_sum,
+                "notas_count": d_count,
+                "atestados_count": d_atestados,
+                "updated_at": now,
+            }
+            for aluno_id, (d_sum, d_count, d_atestados) in deltas.items()
+        ],
+    )
+
+    stats, created = _turma_stats_for_update(turma_id)
+    if created:
+        return
+    stats.notas_sum = float(stats.notas_sum or 0.0) + sum(d[0] for d in deltas.values())
+    stats.notas_count = int(stats.notas_count or 0) + sum(d[1] for d in deltas.values())
+    stats.atestados_count = int(stats.atestados_count or 0) + sum(d[2] for d in deltas.values())
+
+
+def _fresh_atividade_aluno_rows(*, atividade_id: int | None = None) -> dict[tuple[int, int], tuple[int, float, int, int]]:
+    query = (
+        db.session.query(
+            AtividadeAula.atividade_id,
+            LancamentoAulaAluno.aluno_id,
+            Atividade.turma_id,
+            func.sum(_nota_valida()),
+            func.count(_nota_valida()),
+            func.sum(_atestado_int()),
+        )
+        .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
+        .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+        .join(Turma, Atividade.turma_id == Turma.id)
+        .join(Aluno, LancamentoAulaAluno.aluno_id == Aluno.id)
+    )
+    if atividade_id is not None:
+        query = query.filter(AtividadeAula.atividade_id == atividade_id)
+    rows = query.group_by(AtividadeAula.atividade_id, LancamentoAulaAluno.aluno_id, Atividade.turma_id).all()
+    return {
+        (int(atv_id), int(aluno_id)): (int(turma_id), float(s or 0.0), int(c or 0), int(a or 0))
+        for atv_id, aluno_id, turma_id, s, c, a in rows
+    }
+
+
+def refresh_atividade_stats(atividade_id: int) -> None:
+    """Recalcula os agregados de uma atividade a partir dos lançamentos (ex.: após gravá-los direto no banco)."""
+    atividade = db.session.get(Atividade, atividade_id)
+    if atividade is None:
+        return
+
+    fresh = _fresh_atividade_aluno_rows(atividade_id=atividade_id)
+    AtividadeAlunoStats.query.filter_by(atividade_id=atividade_id).delete(synchronize_session=False)
+    db.session.add_all(
+        [
+            AtividadeAlunoStats(
+                atividade_id=atv_id,
+                aluno_id=aluno_id,
+                turma_id=turma_id,
+                notas_sum=s,
+                notas_count=c,
+                atestados_count=a,
+            )
+            for (atv_id, aluno_id), (turma_id, s, c, a) in fresh.items()
+        ]
+    )
+
+    stats, created = _turma_stats_for_update(int(atividade.turma_id))
+    if not created:
+        stats.notas_sum, stats.notas_count, stats.atestados_count = _lancamento_totals(int(atividade.turma_id))
+
+
+def refresh_roster_stats(turma_id: int) -> None:
+    """Atualiza as contagens de alunos da turma (importação, transferência)."""
+    stats, created = _turma_stats_for_update(turma_id)
+    if not created:
+        stats.alunos_count, stats.alunos_ativos_count = _roster_counts(turma_id)
+
+
+def delete_atividade_stats(atividade_id: int) -> None:
+    AtividadeAlunoStats.query.filter_by(atividade_id=atividade_id).delete(synchronize_session=False)
+
+
+def delete_turma_stats(turma_id: int) -> None:
+    AtividadeAlunoStats.query.filter_by(turma_id=turma_id).delete(synchronize_session=False)
+    TurmaStats.query.filter_by(turma_id=turma_id).delete(synchronize_session=False)
+
+
+def _round(values: tuple) -> tuple:
+    return tuple(round(v, 6) if isinstance(v, float) else v for v in values)
+
+
+def rebuild_stats(*, apply: bool = True) -> tuple[int, int, list[StatsDrift]]:
+    """Recalcula todas as estatísticas do zero e compara com o que está gravado.
+
+    Retorna (turmas, pares atividade/aluno, divergências). Com apply=True substitui o conteúdo das
+    tabelas pelos valores recalculados; o commit fica a cargo de quem chama.
+    """
+    fresh_pairs = _fresh_atividade_aluno_rows()
+
+    roster: dict[int, tuple[int, int]] = {
+        int(turma_id): (int(total or 0), int(ativos or 0))
+        for turma_id, total, ativos in (
+            db.session.query(Aluno.turma_id, func.count(Aluno.id), func.sum(case((Aluno.status == "ativo", 1), else_=0)))
+            .group_by(Aluno.turma_id)
+            .all()
+        )
+    }
+    lanc_totals: dict[int, list] = {}
+    for turma_id, s, c, a in fresh_pairs.values():
+        acc = lanc_totals.setdefault(turma_id, [0.0, 0, 0])
+        acc[0] += s
+        acc[1] += c
+        acc[2] += a
+
+    fresh_turmas: dict[int, tuple[int, int, float, int, int]] = {}
+    for (turma_id,) in db.session.query(Turma.id).all():
+        alunos_count, alunos_ativos_count = roster.get(int(turma_id), (0, 0))
+        s, c, a = lanc_totals.get(int(turma_id), (0.0, 0, 0))
+        fresh_turmas[int(turma_id)] = (alunos_count, alunos_ativos_count, float(s), int(c), int(a))
+
+    drifts: list[StatsDrift] = []
+
+    # Consultas por coluna: não carregam instâncias na sessão, que seriam substituídas abaixo.
+    stored_turmas = {
+        int(turma_id): (int(total or 0), int(ativos or 0), float(s or 0.0), int(c or 0), int(a or 0))
+        for turma_id, total, ativos, s, c, a in db.session.query(
+            TurmaStats.turma_id,
+            TurmaStats.alunos_count,
+            TurmaStats.alunos_ativos_count,
+            TurmaStats.notas_sum,
+            TurmaStats.notas_count,
+            TurmaStats.atestados_count,
+        ).all()
+    }
+    for turma_id in sorted(set(stored_turmas) | set(fresh_turmas)):
+        stored = stored_turmas.get(turma_id)
+        calc = fresh_turmas.get(turma_id)
+        if stored is None or calc is None or _round(stored) != _round(calc):
+            drifts.append(StatsDrift("turma_stats", (turma_id,), stored, calc))
+
+    stored_pairs = {
+        (int(atv_id), int(aluno_id)): (int(turma_id), float(s or 0.0), int(c or 0), int(a or 0))
+        for atv_id, aluno_id, turma_id, s, c, a in db.session.query(
+            AtividadeAlunoStats.atividade_id,
+            AtividadeAlunoStats.aluno_id,
+            AtividadeAlunoStats.turma_id,
+            AtividadeAlunoStats.notas_sum,
+            AtividadeAlunoStats.notas_count,
+            AtividadeAlunoStats.atestados_count,
+        ).all()
+    }
+    for key in sorted(set(stored_pairs) | set(fresh_pairs)):
+        stored = stored_pairs.get(key)
+        calc = fresh_pairs.get(key)
+        if calc is None and stored is not None and stored[1:] == (0.0, 0, 0):
+            # Linhas zeradas (ex.: lançamentos apagados) equivalem a ausência de lançamentos.
+            continue
+        if stored is None or calc is None or _round(stored) != _round(calc):
+            drifts.append(StatsDrift("atividade_aluno_stats", key, stored, calc))
+
+    if apply:
+        AtividadeAlunoStats.query.delete(synchronize_session=False)
+        TurmaStats.query.delete(synchronize_session=False)
+        db.session.add_all(
+            [
+                TurmaStats(
+                    turma_id=turma_id,
+                    alunos_count=v[0],
+                    alunos_ativos_count=v[1],
+                    notas_sum=v[2],
+                    notas_count=v[3],
+                    atestados_count=v[4],
+                )
+                for turma_id, v in fresh_turmas.items()
+            ]
+        )
+        db.session.add_all(
+            [
+                AtividadeAlunoStats(
+                    atividade_id=atv_id,
+                    aluno_id=aluno_id,
+                    turma_id=v[0],
+                    notas_sum=v[1],
+                    notas_count=v[2],
+                    atestados_count=v[3],
+                )
+                for (atv_id, aluno_id), v in fresh_pairs.items()
+            ]
+        )
+
+    return len(fresh_turmas), len(fresh_pairs), drifts
@@ -0,0 +1,282 @@
+"""Regras de cadastro de turmas (validação, nome gerado, horários) e importação em lote por CSV."""
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+from dataclasses import dataclass, field
+
+from ..extensions import db
+from ..models import Professor, Turma, TurmaHorario
+from ..text import norm_text
+
+ALLOWED_SERIES = {"5º", "6º", "7º", "8º", "9º", "1º Ano", "2º Ano"}
+ALLOWED_TURMAS = set("ABCDEFGH")
+ALLOWED_PERIODOS = {"Manhã", "Tarde", "Noite"}
+ALLOWED_WEEKDAYS = set(range(0, 7))
+PERIOD_ORDER = {"Manhã": 0, "Tarde": 1, "Noite": 2}
+TIME_PATTERN = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
+
+# Aceitos na coluna de horários do CSV, além do número 0 (segunda) a 6 (domingo).
+DIAS_CSV = {"seg": 0, "ter": 1, "qua": 2, "qui": 3, "sex": 4, "sab": 5, "dom": 6}
+
+Horario = tuple[int, str, str]  # (dia_semana, hora, periodo)
+
+
+def normalize_disciplina(raw: str) -> str:
+    raw = raw.strip()
+    return "Arte" if raw.lower() == "artes" else raw
+
+
+def ano_serie_for(serie: str) -> str | None:
+    if serie.endswith("º") and serie[:-1].isdigit():
+        return f"{serie} Ano"
+    if serie in {"1º Ano", "2º Ano"}:
+        return "Segundo Grau"
+    return None
+
+
+def parse_horario(dia_raw: str, hora_raw: str, periodo_raw: str) -> Horario | None:
+    """Valida um horário (dia 0–6, hora HH:MM, período conhecido); None se algum campo for inválido."""
+    try:
+        dia = int((dia_raw or "").strip())
+    except ValueError:
+        return None
+    hora = (hora_raw or "").strip()
+    periodo = (periodo_raw or "").strip()
+    if dia not in ALLOWED_WEEKDAYS or not TIME_PATTERN.match(hora) or periodo not in ALLOWED_PERIODOS:
+        return None
+    return dia, hora, periodo
+
+
+def parse_form_horarios(dias: list[str], horas: list[str], periodos: list[str]) -> list[Horario]:
+    """Horários do formulário de turma; linhas vazias ou incompletas são ignoradas."""
+    parsed: list[Horario] = []
+    for dia_raw, hora_raw, periodo_raw in zip(dias, horas, periodos):
+        horario = parse_horario(dia_raw, hora_raw, periodo_raw)
+        if horario is not None:
+            parsed.append(horario)
+    return parsed
+
+
+def turma_nome_e_periodo(serie: str, turma_letra: str, disciplina: str, horarios: list[Horario]) -> tuple[str, str | None]:
+    """Nome exibido da turma ("6º A - Arte - Manhã") e o período principal (None se houver mais de um)."""
+    periodos_unicos = sorted({p for _, _, p in horarios}, key=lambda p: PERIOD_ORDER.get(p, 99))
+    periodo_display = periodos_unicos[0] if len(periodos_unicos) == 1 else "/".join(periodos_unicos)
+    periodo_principal = periodos_unicos[0] if len(periodos_unicos) == 1 else None
+
+    serie_nome = serie.removesuffix(" Ano") if serie in {"1º Ano", "2º Ano"} else serie
+    return f"{serie_nome} {turma_letra} - {disciplina} - {periodo_display}", periodo_principal
+
+
+def sync_horarios(turma_id: int, horarios: list[Horario]) -> tuple[int, int]:
+    """Ajusta os TurmaHorario da turma para `horarios` mexendo só no que mudou.
+
+    Compara por (dia_semana, hora, periodo): slots que continuam mantêm a linha (e o id), os que saíram
+    são apagados num único DELETE e os novos inseridos. Linhas repetidas no banco são reduzidas a uma.
+    Retorna (inseridos, removidos). Não faz commit.
+    """
+    desejados = set(horarios)
+    existentes: set[Horario] = set()
+    remover: list[int] = []
+    for h in TurmaHorario.query.filter_by(turma_id=turma_id).all():
+        key = (int(h.dia_semana), h.hora, h.periodo)
+        if key in desejados and key not in existentes:
+            existentes.add(key)
+        else:
+            remover.append(int(h.id))
+
+    if remover:
+        TurmaHorario.query.filter(TurmaHorario.id.in_(remover)).delete(synchronize_session=False)
+    novos = [
+        TurmaHorario(turma_id=turma_id, dia_semana=dia, hora=hora, periodo=periodo)
+        for dia, hora, periodo in sorted(desejados - existentes)
+    ]
+    db.session.add_all(novos)
+    return len(novos), len(remover)
+
+
+def bump_data_version(*turma_ids: int) -> None:
+    """Incrementa Turma.data_version das turmas num único UPDATE (data_version = data_version + 1).
+
+    Chamado pelas rotas que alteram dados exibidos nas páginas da turma. Não faz commit.
+    """
+    ids = {int(t) for t in turma_ids}
+    if ids:
+        Turma.query.filter(Turma.id.in_(ids)).update(
+            {Turma.data_version: Turma.data_version + 1}, synchronize_session=False
+        )
+
+
+@dataclass
+class TurmaImportResult:
+    criadas: int = 0
+    professor_ids: set[int] = field(default_factory=set)
+    erros: list[str] = field(default_factory=list)
+
+
+def _parse_csv_horarios(raw: str) -> tuple[list[Horario], list[str]]:
+    horarios: list[Horario] = []
+    erros: list[str] = []
+    for item in (raw or "").split("|"):
+        item = item.strip()
+        if not item:
+            continue
+        parts = item.split()
+        if len(parts) != 3:
+            erros.append(f"horário “{item}” deve ter dia, hora e período")
+            continue
+        dia_raw = str(DIAS_CSV.get(norm_text(parts[0])[:3], parts[0]))
+        horario = parse_horario(dia_raw, parts[1], parts[2])
+        if horario is None:
+            erros.append(f"horário inválido “{item}”")
+        else:
+            horarios.append(horario)
+    return horarios, erros
+
+
+def import_turmas_csv(
+    content: str,
+    *,
+    default_professor_id: int | None = None,
+    allowed_professor_ids: set[int] | None = None,
+    default_ano_letivo: int = 2026,
+) -> TurmaImportResult:
+    """Valida e cria as turmas de um CSV numa única transação (tudo ou nada).
+
+    Colunas (cabeçalho obrigatório, separador "," ou ";"): professor_email, serie, turma, disciplina,
+    ano_letivo, horarios. Os horários vêm separados por "|", cada um como "SEG 07:30 Manhã".
+    `professor_email` pode ficar vazio quando há `default_professor_id`; `allowed_professor_ids` limita
+    para quem se pode criar turmas. Se qualquer linha tiver erro, nada é gravado e todos os erros voltam
+    juntos. Não faz commit.
+    """
+    result = TurmaImportResult()
+    try:
+        dialect = csv.Sniffer().sniff(content.split("\n", 1)[0], delimiters=",;")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(io.StringIO(content), dialect=dialect)
+    header = {(h or "").strip().lower() for h in (reader.fieldnames or [])}
+    faltando = {"serie", "turma", "disciplina", "horarios"} - header
+    if faltando:
+        result.erros.append(f"Cabeçalho sem a(s) coluna(s): {', '.join(sorted(faltando))}.")
+        return result
+
+    rows = [
+        ({(k or "").strip().lower(): (v or "").strip() for k, v in row.items() if k is not None}, line)
+        for line, row in enumerate(reader, start=2)
+    ]
+
+    emails = {r.get("professor_email", "").lower() for r, _ in rows if r.get("professor_email")}
+    professor_id_by_email = (
+        {
+            email: int(pid)
+            for pid, email in db.session.query(Professor.id, Professor.email).filter(Professor.email.in_(emails))
+        }
+        if emails
+        else {}
+    )
+
+    specs: list[tuple[int, dict, list[Horario]]] = []
+    erros_linha: list[tuple[int, str]] = []
+    for r, line in rows:
+        if not any(r.values()):
+            continue
+        erros: list[str] = []
+
+        email = r.get("professor_email", "").lower()
+        professor_id = professor_id_by_email.get(email) if email else default_professor_id
+        if professor_id is None:
+            erros.append(f"professor “{email}” não encontrado" if email else "professor_email obrigatório")
+        elif allowed_professor_ids is not None and professor_id not in allowed_professor_ids:
+            erros.append(f"sem permissão para criar turmas de “{email}”")
+
+        serie = r.get("serie", "")
+        if serie not in ALLOWED_SERIES:
+            erros.append(f"série inválida “{serie}”")
+        turma_letra = r.get("turma", "").upper()
+        if turma_letra not in ALLOWED_TURMAS:
+            erros.append(f"turma inválida “{turma_letra}”")
+        disciplina = normalize_disciplina(r.get("disciplina", ""))
+        if not disciplina:
+            erros.append("disciplina obrigatória")
+
+        ano_raw = r.get("ano_letivo", "")
+        try:
+            ano_letivo = int(ano_raw) if ano_raw else default_ano_letivo
+        except ValueError:
+            erros.append(f"ano letivo inválido “{ano_raw}”")
+            ano_letivo = default_ano_letivo
+
+        horarios, erros_horario = _parse_csv_horarios(r.get("horarios", ""))
+        erros.extend(erros_horario)
+        if not horarios and not erros_horario:
+            erros.append("informe pelo menos um horário")
+
+        if erros:
+            erros_linha.append((line, f"{'; '.join(erros)}."))
+            continue
+
+        nome, periodo_principal = turma_nome_e_periodo(serie, turma_letra, disciplina, horarios)
+        specs.append(
+            (
+                line,
+                {
+                    "professor_id": int(professor_id),
+                    "nome": nome,
+                    "serie": serie,
+                    "turma_letra": turma_letra,
+                    "periodo": periodo_principal,
+                    "disciplina": disciplina,
+                    "ano_serie": ano_serie_for(serie),
+                    "ano_letivo": ano_letivo,
+                },
+                horarios,
+            )
+        )
+
+    # Duplicadas no próprio arquivo ou já cadastradas (mesmo professor, ano, série, letra e disciplina).
+    def chave(professor_id, ano_letivo, serie, turma_letra, disciplina) -> tuple:
+        return int(professor_id), int(ano_letivo), serie, turma_letra, norm_text(disciplina or "")
+
+    existentes: set[tuple] = set()
+    professor_ids = {spec["professor_id"] for _, spec, _ in specs}
+    if professor_ids:
+        existentes = {
+            chave(*row)
+            for row in db.session.query(
+                Turma.professor_id, Turma.ano_letivo, Turma.serie, Turma.turma_letra, Turma.disciplina
+            ).filter(Turma.professor_id.in_(professor_ids))
+        }
+    vistas: dict[tuple, int] = {}
+    for line, spec, _ in specs:
+        k = chave(spec["professor_id"], spec["ano_letivo"], spec["serie"], spec["turma_letra"], spec["disciplina"])
+        if k in existentes:
+            erros_linha.append((line, f"a turma “{spec['nome']}” já existe."))
+        elif k in vistas:
+            erros_linha.append((line, f"turma repetida (igual à linha {vistas[k]})."))
+        else:
+            vistas[k] = line
+
+    if erros_linha:
+        result.erros = [f"Linha {line}: {msg}" for line, msg in sorted(erros_linha)]
+        return result
+    if not specs:
+        result.erros.append("Nenhuma turma no arquivo.")
+        return result
+
+    turmas = [Turma(**spec) for _, spec, _ in specs]
+    db.session.add_all(turmas)
+    db.session.flush()
+    db.session.add_all(
+        [
+            TurmaHorario(turma_id=turma.id, dia_semana=dia, hora=hora, periodo=periodo)
+            for turma, (_, _, horarios) in zip(turmas, specs)
+            for dia, hora, periodo in horarios
+        ]
+    )
+    db.session.flush()
+    result.criadas = len(turmas)
+    result.professor_ids = {int(t.professor_id) for t in turmas}
+    return result
@@ -0,0 +1,22 @@
+"""INSERT com ON CONFLICT para os bancos suportados (SQLite em desenvolvimento, PostgreSQL em produção)."""
+
+from __future__ import annotations
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from ..extensions import db
+
+
+def upsert_insert(model):
+    """`insert()` da tabela de `model` no dialeto da sessão, com `.on_conflict_do_update` / `.excluded`.
+
+    É um INSERT de Core (sobre `__table__`): uma lista de parâmetros vira um único executemany, em vez de
+    ser separada pelo ORM conforme as colunas nulas de cada linha.
+    """
+    table = model.__table__
+    dialect_name = db.session.get_bind().dialect.name
+    if dialect_name == "postgresql":
+        return postgresql.insert(table)
+    if dialect_name == "sqlite":
+        return sqlite.insert(table)
+    raise NotImplementedError(f"INSERT … ON CONFLICT não suportado em {dialect_name}")
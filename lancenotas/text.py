@@ -0,0 +1,12 @@
+from __future__ import annotations
+
+import re
+import unicodedata
+
+
+def norm_text(value: str) -> str:
+    """Minúsculas, sem acentos e com espaços colapsados; usado em comparações e buscas por nome."""
+    normalized = unicodedata.normalize("NFKD", value)
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    normalized = re.sub(r"\s+", " ", normalized).strip().lower()
+    return normalized
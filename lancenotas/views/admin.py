@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import csv
+import io
+import math
+from datetime import date
+
+from flask import Blueprint, Response, redirect, render_template, request, url_for
+from flask_login import current_user, login_required
+
+from ..services.dashboard_stats import compute_professor_metrics
+from .pages import _safe_int, _selected_ano_letivo
+
+admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
+
+PAINEL_PER_PAGE = 25
+
+
+def _painel_ano_letivo() -> int:
+    year = _safe_int((request.args.get("ano") or "").strip() or None, 0)
+    if 2000 <= year <= 2100:
+        return year
+    return _selected_ano_letivo(professor_id=int(current_user.id))
+
+
+@admin_bp.get("/painel")
+@login_required
+def painel():
+    if not current_user.is_admin:
+        return redirect(url_for("pages.dashboard"))
+
+    ano_letivo = _painel_ano_letivo()
+    page = max(1, _safe_int(request.args.get("page"), 1))
+    professores, total = compute_professor_metrics(
+        ano_letivo=ano_letivo,
+        today=date.today(),
+        page=page,
+        per_page=PAINEL_PER_PAGE,
+    )
+    pages_total = max(1, math.ceil(total / PAINEL_PER_PAGE))
+
+    return render_template(
+        "pages/admin_painel.html",
+        professores=professores,
+        ano_letivo=ano_letivo,
+        page=min(page, pages_total),
+        pages_total=pages_total,
+        total=total,
+    )
+
+
+@admin_bp.get("/painel.csv")
+@login_required
+def painel_csv():
+    if not current_user.is_admin:
+        return redirect(url_for("pages.dashboard"))
+
+    ano_letivo = _painel_ano_letivo()
+    professores, _ = compute_professor_metrics(ano_letivo=ano_letivo, today=date.today())
+
+    buf = io.StringIO()
+    writer = csv.writer(buf, delimiter=";")
+    writer.writerow(["professor", "email", "escola", "turmas", "alunos", "avaliacoes_pendentes", "media"])
+    for p in professores:
+        writer.writerow(
+            [
+                p.nome,
+                p.email,
+                p.escola or "",
+                p.turmas,
+                p.alunos,
+                p.pendentes,
+                "" if p.media is None else f"{p.media:.2f}".replace(".", ","),
+            ]
+        )
+
+    return Response(
+        buf.getvalue(),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename=painel_{ano_letivo}.csv"},
+    )
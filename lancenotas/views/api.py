@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+from flask import Blueprint, jsonify, request, url_for
+from flask_login import current_user, login_required
+from sqlalchemy.exc import IntegrityError
+
+from ..extensions import db
+from ..models import Aluno, Atividade, AtividadeAula, LancamentoAulaAluno, Turma
+from ..services.dashboard_cache import get_dashboard_stats, get_dashboard_summary
+from ..services.dashboard_rollup import dashboard_trend
+from ..services.lancamentos import (
+    LancamentoConflito,
+    SyncItem,
+    lancamento_json,
+    parse_lancamento,
+    save_lancamento,
+    sync_lancamentos,
+)
+from ..services.turmas import bump_data_version
+from .pages import _invalidate_dashboard, _medias_atividade, _safe_int, _selected_ano_letivo
+
+api_bp = Blueprint("api", __name__, url_prefix="/api")
+
+
+@api_bp.get("/dashboard/summary")
+@login_required
+def dashboard_summary():
+    professor_id = int(current_user.id)
+    ano_letivo = _selected_ano_letivo(professor_id=professor_id)
+    stats = get_dashboard_summary(professor_id=professor_id, ano_letivo=ano_letivo, today=date.today())
+    return jsonify(
+        {
+            "ano_letivo": ano_letivo,
+            "turmas_ativas": stats.turmas_ativas,
+            "total_alunos": stats.total_alunos,
+            "avaliacoes_pendentes": stats.avaliacoes_pendentes,
+            "desempenho_media": stats.desempenho_media,
+        }
+    )
+
+
+@api_bp.get("/dashboard/turmas")
+@login_required
+def dashboard_turmas():
+    professor_id = int(current_user.id)
+    ano_letivo = _selected_ano_letivo(professor_id=professor_id)
+    stats = get_dashboard_stats(professor_id=professor_id, ano_letivo=ano_letivo, today=date.today())
+    return jsonify(
+        {
+            "ano_letivo": ano_letivo,
+            "turmas": [
+                {**row, "url": url_for("pages.turma_detail", turma_id=row["id"], tab="detalhes")}
+                for row in stats.desempenho_por_turma
+            ],
+        }
+    )
+
+
+@api_bp.get("/dashboard/tendencia")
+@login_required
+def dashboard_tendencia():
+    professor_id = int(current_user.id)
+    ano_letivo = _selected_ano_letivo(professor_id=professor_id)
+    dias = max(1, min(366, _safe_int(request.args.get("dias"), 30)))
+    turma_id = _safe_int(request.args.get("turma_id"), 0) or None
+    serie = dashboard_trend(
+        professor_id=professor_id,
+        ano_letivo=ano_letivo,
+        desde=date.today() - timedelta(days=dias - 1),
+        turma_id=turma_id,
+    )
+    return jsonify({"ano_letivo": ano_letivo, "dias": dias, "turma_id": turma_id, "serie": serie})
+
+
+@api_bp.patch("/lancamentos/<int:aula_id>/<int:aluno_id>")
+@login_required
+def lancamento_patch(aula_id: int, aluno_id: int):
+    """Grava uma célula (nota / atestado / observação) de uma aula.
+
+    Corpo JSON: {"nota": "7,5" | 7.5 | "A" | null, "atestado": bool, "observacao": str, "updated_at": str | null}.
+    `updated_at` é o valor que o cliente recebeu por último (null se a célula estava vazia); se o lançamento
+    mudou desde então, responde 409 com o valor atual e nada é gravado. Campos vazios apagam o lançamento.
+    """
+    row = (
+        db.session.query(AtividadeAula, Atividade, Turma)
+        .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+        .join(Turma, Atividade.turma_id == Turma.id)
+        .filter(AtividadeAula.id == aula_id, Turma.professor_id == int(current_user.id))
+        .first()
+    )
+    aluno = (
+        Aluno.query.filter_by(id=aluno_id, turma_id=row[2].id, status="ativo").first() if row is not None else None
+    )
+    if row is None or aluno is None:
+        return jsonify({"error": "Lançamento não encontrado."}), 404
+    _, atividade, turma = row
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or "updated_at" not in payload:
+        return jsonify({"error": "Envie um objeto JSON com updated_at (null para célula vazia)."}), 400
+    try:
+        updated_at = datetime.fromisoformat(payload["updated_at"]) if payload["updated_at"] is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "updated_at inválido."}), 400
+    try:
+        nota = payload.get("nota")
+        entrada = parse_lancamento(
+            "" if nota is None else str(nota), payload.get("atestado") is True, str(payload.get("observacao") or "")
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    try:
+        save_lancamento(
+            turma_id=int(turma.id),
+            atividade_id=int(atividade.id),
+            aula_id=aula_id,
+            aluno_id=aluno_id,
+            professor_id=int(current_user.id),
+            entrada=entrada,
+            updated_at=updated_at,
+        )
+    except LancamentoConflito as conflito:
+        db.session.rollback()
+        return (
+            jsonify(
+                {
+                    "error": "Este lançamento foi alterado em outra sessão.",
+                    "atual": lancamento_json(aula_id=aula_id, aluno_id=aluno_id, lanc=conflito.atual),
+                }
+            ),
+            409,
+        )
+    bump_data_version(turma.id)
+    db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
+
+    lanc = LancamentoAulaAluno.query.filter_by(aula_id=aula_id, aluno_id=aluno_id).first()
+    media = _medias_atividade(turma=turma, alunos=[aluno], atividade=atividade, today=date.today()).get(aluno.id)
+    return jsonify({**lancamento_json(aula_id=aula_id, aluno_id=aluno_id, lanc=lanc), "media": media})
+
+
+MAX_SYNC_ITENS = 500
+
+
+def _parse_sync_item(raw) -> SyncItem:
+    """Valida um item do lote de sincronização; ValueError com a mensagem para o cliente."""
+    if not isinstance(raw, dict):
+        raise ValueError("Item deve ser um objeto JSON.")
+    try:
+        aula_id = int(raw["aula_id"])
+        aluno_id = int(raw["aluno_id"])
+    except (KeyError, TypeError, ValueError):
+        raise ValueError("Informe aula_id e aluno_id.") from None
+    if "updated_at" not in raw:
+        raise ValueError("Informe updated_at (null para célula vazia).")
+    try:
+        updated_at = datetime.fromisoformat(raw["updated_at"]) if raw["updated_at"] is not None else None
+        cliente_em = datetime.fromisoformat(raw["cliente_em"]) if raw.get("cliente_em") else None
+    except (TypeError, ValueError):
+        raise ValueError("updated_at / cliente_em inválido.") from None
+    if cliente_em is not None and cliente_em.tzinfo is not None:
+        cliente_em = cliente_em.astimezone(timezone.utc).replace(tzinfo=None)
+    nota = raw.get("nota")
+    entrada = parse_lancamento(
+        "" if nota is None else str(nota), raw.get("atestado") is True, str(raw.get("observacao") or "")
+    )
+    return SyncItem(
+        chave=raw["chave"],
+        aula_id=aula_id,
+        aluno_id=aluno_id,
+        entrada=entrada,
+        updated_at=updated_at,
+        cliente_em=cliente_em,
+    )
+
+
+@api_bp.post("/sync/lancamentos")
+@login_required
+def sync_lancamentos_post():
+    """Aplica, numa transação, as edições que o cliente acumulou sem conexão.
+
+    Corpo JSON: {"itens": [{"chave", "aula_id", "aluno_id", "nota", "atestado", "observacao", "updated_at",
+    "cliente_em"}, ...]}. `chave` (até 64 caracteres) identifica a edição: reenviar o mesmo lote devolve
+    os mesmos resultados sem reaplicar nada. `updated_at` é a versão que o cliente tinha da célula e
+    `cliente_em`, quando a edição foi feita (ordena edições da mesma célula). A resposta traz um resultado
+    por item, na ordem recebida: aplicado, conflito (com o valor atual), invalido ou nao_encontrado.
+    """
+    payload = request.get_json(silent=True)
+    itens_raw = payload.get("itens") if isinstance(payload, dict) else None
+    if not isinstance(itens_raw, list):
+        return jsonify({"error": "Envie um objeto JSON com a lista itens."}), 400
+    if len(itens_raw) > MAX_SYNC_ITENS:
+        return jsonify({"error": f"No máximo {MAX_SYNC_ITENS} itens por lote."}), 413
+
+    chaves: list[str | None] = []
+    itens: list[SyncItem] = []
+    invalidos: dict[int, str] = {}
+    for pos, raw in enumerate(itens_raw):
+        chave = raw.get("chave") if isinstance(raw, dict) else None
+        if not isinstance(chave, str) or not 0 < len(chave) <= 64:
+            chaves.append(None)
+            invalidos[pos] = "Informe chave (texto de até 64 caracteres)."
+            continue
+        chaves.append(chave)
+        try:
+            itens.append(_parse_sync_item(raw))
+        except ValueError as exc:
+            invalidos[pos] = str(exc)
+
+    professor_id = int(current_user.id)
+    try:
+        resultados, turma_ids = sync_lancamentos(professor_id=professor_id, itens=itens)
+        bump_data_version(*turma_ids)
+        db.session.commit()
+    except IntegrityError:
+        # Outro envio do mesmo lote gravou as chaves primeiro; o cliente reenvia e recebe os resultados.
+        db.session.rollback()
+        return jsonify({"error": "Lote já está sendo sincronizado; tente novamente."}), 409
+    if turma_ids:
+        _invalidate_dashboard(professor_id)
+
+    return jsonify(
+        {
+            "resultados": [
+                {"chave": chave, "status": "invalido", "error": invalidos[pos]}
+                if pos in invalidos
+                else {"chave": chave, **resultados[chave]}
+                for pos, chave in enumerate(chaves)
+            ]
+        }
+    )
@@ -1,14 +1,14 @@
 from __future__ import annotations
 
 import calendar
-import re
-import unicodedata
+import hashlib
+import math
 from datetime import date
 from datetime import datetime
 
-from flask import Blueprint, redirect, render_template, request, session, url_for
+from flask import Blueprint, current_app, jsonify, make_response, redirect, render_template, request, session, url_for
 from flask_login import current_user, login_required
-from sqlalchemy import func
+from sqlalchemy import case, func
 from sqlalchemy import or_
 
 from ..extensions import db
@@ -18,19 +18,57 @@ from ..models import (
     AvaliacaoAluno,
     Atividade,
     AtividadeAula,
+    DashboardDailyRollup,
     DiarioAnotacao,
     Estudante,
     FechamentoTrimestreAluno,
     FechamentoTrimestreTurma,
     HorarioEvento,
     LancamentoAulaAluno,
+    LancamentoHistorico,
     Turma,
     TurmaHorario,
 )
+from ..services.agenda import agendar_atividades
+from ..services.aula_plan import AulasComLancamentos, aplicar_plano_aulas
+from ..services.busca import buscar, estudantes_turma_recente
+from ..services.colunas import TrimestreFechado, operar_coluna
+from ..services.dashboard_cache import dashboard_cache, get_dashboard_summary
+from ..services.grade_engine import gradebook_from_lancamentos, gradebook_from_stats
+from ..services.historico import HISTORICO_PER_PAGE, historico_paginado
+from ..services.lancamentos import (
+    NOTA_INVALIDA,
+    LancamentoEntrada,
+    parse_lancamento,
+    save_atividade_notas,
+    save_aula_lancamentos,
+)
 from ..services.pdf_import import extract_resumo_registro_classe
+from ..services.replicacao import replicar_atividade
+from ..services.snapshots import best_snapshots
+from ..services.turma_stats import (
+    delete_atividade_stats,
+    delete_turma_stats,
+    refresh_roster_stats,
+)
+from ..services.turmas import (
+    ALLOWED_SERIES,
+    ALLOWED_TURMAS,
+    TIME_PATTERN,
+    ano_serie_for,
+    bump_data_version,
+    import_turmas_csv,
+    normalize_disciplina,
+    parse_form_horarios,
+    sync_horarios,
+    turma_nome_e_periodo,
+)
+from ..text import norm_text
 
 pages_bp = Blueprint("pages", __name__)
 
+TURMAS_PER_PAGE = 24
+
 
 def _safe_int(value: str | None, default: int) -> int:
     try:
@@ -39,6 +77,11 @@ def _safe_int(value: str | None, default: int) -> int:
         return default
 
 
+def _invalidate_dashboard(professor_id: int) -> None:
+    """Descarta os indicadores em cache do professor; chamar após o commit de qualquer escrita."""
+    dashboard_cache.invalidate_professor(int(professor_id))
+
+
 def _selected_ano_letivo(*, professor_id: int) -> int:
     raw = session.get("ano_letivo")
     if raw is not None:
@@ -59,6 +102,71 @@ def _selected_ano_letivo(*, professor_id: int) -> int:
     return year
 
 
+def _turmas_versao(professor_id: int) -> dict[int, int]:
+    """data_version de cada turma do professor (uma consulta pelo índice de professor_id)."""
+    return {
+        int(turma_id): int(version or 0)
+        for turma_id, version in db.session.query(Turma.id, Turma.data_version).filter(Turma.professor_id == professor_id)
+    }
+
+
+def _snapshots_versao(turma_id: int) -> list[tuple[int, int]]:
+    """(id, data_version) das turmas, de qualquer professor, com snapshots de fechamento dos alunos ativos
+    da turma no ano letivo dela.
+
+    A aba Detalhes recorre ao snapshot mais recente de outra turma (best_snapshots), e toda escrita em
+    snapshots (fechamento, transferência) incrementa o data_version da turma dona da linha; estas
+    versões cobrem o que a página mostra sem ler os snapshots.
+    """
+    f = FechamentoTrimestreAluno
+    estudantes = db.session.query(Aluno.estudante_id).filter(
+        Aluno.turma_id == turma_id, Aluno.status == "ativo", Aluno.estudante_id.isnot(None)
+    )
+    ano_letivo = db.session.query(Turma.ano_letivo).filter(Turma.id == turma_id).scalar_subquery()
+    return sorted(
+        (int(id_), int(version or 0))
+        for id_, version in db.session.query(Turma.id, Turma.data_version)
+        .join(f, f.turma_id == Turma.id)
+        .filter(f.ano_letivo == ano_letivo, f.estudante_id.in_(estudantes))
+        .distinct()
+    )
+
+
+def _page_etag(*parts: object) -> str:
+    """ETag de uma página: versões dos dados (`parts`) + usuário, caminho, query string e o dia de hoje.
+
+    O dia entra porque as médias dependem de quais aulas já aconteceram.
+    """
+    raw = repr(
+        (
+            current_app.config["ETAG_SEED"],
+            int(current_user.id),
+            bool(current_user.is_admin),
+            request.path,
+            sorted(request.args.items(multi=True)),
+            date.today().isoformat(),
+            parts,
+        )
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _not_modified(etag: str):
+    """Resposta 304 se o navegador já tem a versão `etag`; None quando é preciso renderizar."""
+    if not request.if_none_match.contains(etag):
+        return None
+    return _with_etag(make_response("", 304), etag)
+
+
+def _with_etag(response, etag: str):
+    response = make_response(response)
+    response.set_etag(etag)
+    # Sempre revalidar: o navegador guarda a página, mas pergunta antes de reutilizá-la.
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 def _aulas_iniciadas_ids(*, aulas_ids: list[int], today: date) -> set[int]:
     if not aulas_ids:
         return set()
@@ -126,9 +234,7 @@ def _validate_trimestre_completo_para_fechamento(*, turma: Turma, trimestre: int
     if not atividades:
         return None
 
-    aulas: list[AtividadeAula] = []
-    for atv in atividades:
-        aulas.extend(_ensure_aulas_for_atividade(atv))
+    aulas = AtividadeAula.query.filter(AtividadeAula.atividade_id.in_([int(a.id) for a in atividades])).all()
 
     if not aulas:
         return None
@@ -170,19 +276,9 @@ def _validate_trimestre_completo_para_fechamento(*, turma: Turma, trimestre: int
     return "Não é possível fechar: faltam lançamentos neste trimestre. " + " | ".join(issues)
 
 
-def _ensure_aulas_for_atividade(atividade: Atividade) -> list[AtividadeAula]:
-    aulas = AtividadeAula.query.filter_by(atividade_id=atividade.id).order_by(AtividadeAula.numero.asc()).all()
-    target = max(1, int(atividade.aulas_planejadas or 1))
-    if len(aulas) >= target:
-        return aulas
-
-    existing_nums = {a.numero for a in aulas}
-    for n in range(1, target + 1):
-        if n in existing_nums:
-            continue
-        db.session.add(AtividadeAula(atividade_id=atividade.id, numero=n))
-    db.session.commit()
-    return AtividadeAula.query.filter_by(atividade_id=atividade.id).order_by(AtividadeAula.numero.asc()).all()
+def _aulas_da_atividade(atividade_id: int) -> list[AtividadeAula]:
+    """Aulas da atividade por número. Só lê: as rotas de escrita mantêm as aulas 1..aulas_planejadas."""
+    return AtividadeAula.query.filter_by(atividade_id=atividade_id).order_by(AtividadeAula.numero.asc()).all()
 
 
 @pages_bp.get("/")
@@ -199,168 +295,160 @@ def dashboard():
     today = date.today()
 
     ano_letivo = _selected_ano_letivo(professor_id=professor_id)
-    turmas = Turma.query.filter_by(professor_id=professor_id, ano_letivo=ano_letivo).all()
-    turma_ids = [t.id for t in turmas]
+    stats = get_dashboard_summary(professor_id=professor_id, ano_letivo=ano_letivo, today=today)
 
-    turmas_ativas = len(turmas)
+    # Só os totais dos cartões: as linhas de "Desempenho por turma" são calculadas e ordenadas
+    # quando a página pede /api/dashboard/turmas, depois da primeira pintura.
+    return render_template(
+        "pages/dashboard.html",
+        selected_ano_letivo=ano_letivo,
+        turmas_ativas=stats.turmas_ativas,
+        total_alunos=stats.total_alunos,
+        avaliacoes_pendentes=stats.avaliacoes_pendentes,
+        desempenho_media=stats.desempenho_media,
+    )
 
-    if turma_ids:
-        total_alunos = (
-            db.session.query(func.count(Aluno.id))
-            .filter(Aluno.turma_id.in_(turma_ids))
-            .scalar()
-            or 0
-        )
-    else:
-        total_alunos = 0
 
-    atividades = Atividade.query.filter(Atividade.turma_id.in_(turma_ids)).all() if turma_ids else []
+@pages_bp.get("/dashboard/cache")
+@login_required
+def dashboard_cache_stats():
+    if not current_user.is_admin:
+        return redirect(url_for("pages.dashboard"))
+    return jsonify(dashboard_cache.stats())
 
-    alunos_por_turma: dict[int, int] = {}
-    if turma_ids:
-        for turma_id, count in (
-            db.session.query(Aluno.turma_id, func.count(Aluno.id))
-            .filter(Aluno.turma_id.in_(turma_ids))
-            .group_by(Aluno.turma_id)
-            .all()
-        ):
-            alunos_por_turma[int(turma_id)] = int(count or 0)
-
-    eligible_slots = 0
-    for a in atividades:
-        eligible_aulas = (
-            AtividadeAula.query.filter_by(atividade_id=a.id)
-            .filter(or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today))
-            .count()
-        )
-        if eligible_aulas <= 0:
+
+@pages_bp.get("/busca")
+@login_required
+def busca():
+    professor_id = int(current_user.id)
+    q = (request.args.get("q") or "").strip()
+    resultados = buscar(professor_id=professor_id, q=q) if q else []
+
+    turma_by_estudante = estudantes_turma_recente(
+        professor_id=professor_id,
+        estudante_ids=[r.ref_id for r in resultados if r.tipo == "estudante"],
+    )
+    turma_ids = {r.turma_id for r in resultados if r.turma_id is not None} | set(turma_by_estudante.values())
+    turma_nomes = (
+        dict(db.session.query(Turma.id, Turma.nome).filter(Turma.id.in_(turma_ids)).all()) if turma_ids else {}
+    )
+
+    tipo_labels = {
+        "aluno": "Aluno",
+        "estudante": "Estudante",
+        "turma": "Turma",
+        "atividade": "Atividade",
+        "anotacao": "Diário",
+    }
+    itens: list[dict] = []
+    for r in resultados:
+        turma_id = turma_by_estudante.get(r.ref_id) if r.tipo == "estudante" else r.turma_id
+        if turma_id is None:
             continue
-        eligible_slots += int(eligible_aulas) * int(alunos_por_turma.get(int(a.turma_id), 0))
-
-    notas_count = 0
-    atestados_count = 0
-    if turma_ids and eligible_slots > 0:
-        notas_count = (
-            db.session.query(func.count(LancamentoAulaAluno.id))
-            .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
-            .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
-            .join(Turma, Atividade.turma_id == Turma.id)
-            .filter(Turma.professor_id == professor_id)
-            .filter(or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today))
-            .filter(LancamentoAulaAluno.nota.isnot(None))
-            .scalar()
-            or 0
-        )
-        atestados_count = (
-            db.session.query(func.count(LancamentoAulaAluno.id))
-            .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
-            .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
-            .join(Turma, Atividade.turma_id == Turma.id)
-            .filter(Turma.professor_id == professor_id)
-            .filter(or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today))
-            .filter(LancamentoAulaAluno.atestado.is_(True))
-            .scalar()
-            or 0
+        if r.tipo == "atividade":
+            url = url_for("pages.turma_detail", turma_id=turma_id, tab="atividades")
+        elif r.tipo == "anotacao":
+            url = url_for("pages.turma_diario", turma_id=turma_id)
+        else:
+            url = url_for("pages.turma_detail", turma_id=turma_id)
+        itens.append(
+            {
+                "tipo": tipo_labels.get(r.tipo, r.tipo),
+                "texto": r.texto,
+                "turma_nome": turma_nomes.get(turma_id),
+                "url": url,
+            }
         )
 
-    avaliacoes_pendentes = max(0, int(eligible_slots) - int(notas_count) - int(atestados_count))
-
-    # Desempenho (0-10): soma das notas lançadas / total de notas esperadas.
-    # Nota não lançada conta como 0, então o denominador precisa considerar a carga planejada.
-    desempenho_media: float | None = None
-    denom = int(eligible_slots) - int(atestados_count)
-    if turma_ids and denom > 0:
-        sum_notas = (
-            db.session.query(func.sum(LancamentoAulaAluno.nota))
-            .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
-            .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
-            .join(Turma, Atividade.turma_id == Turma.id)
-            .filter(Turma.professor_id == professor_id)
-            .filter(or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today))
-            .filter(LancamentoAulaAluno.nota.isnot(None))
-            .scalar()
-            or 0.0
+    return render_template("pages/busca.html", q=q, itens=itens)
+
+
+def _turmas_list_context(*, professor_id: int, q: str, page: int) -> dict:
+    """Cartões de uma página da listagem de turmas (contagens agrupadas, busca e ordenação no banco)."""
+    ano_letivo = _selected_ano_letivo(professor_id=professor_id)
+
+    turmas_query = Turma.query.filter_by(professor_id=professor_id, ano_letivo=ano_letivo)
+    q_norm = norm_text(q)
+    if q_norm:
+        turmas_query = turmas_query.filter(Turma.busca.contains(q_norm, autoescape=True))
+
+    total = turmas_query.count()
+    pages_total = max(1, math.ceil(total / TURMAS_PER_PAGE))
+    page = min(page, pages_total)
+
+    serie_rank = case(
+        {"5º": 5, "6º": 6, "7º": 7, "8º": 8, "9º": 9, "1º Ano": 10, "2º Ano": 11},
+        value=func.trim(func.coalesce(Turma.serie, "")),
+        else_=99,
+    )
+    turmas_filtered = (
+        turmas_query.order_by(
+            serie_rank.asc(),
+            func.trim(func.coalesce(Turma.turma_letra, "")).asc(),
+            func.lower(func.trim(func.coalesce(Turma.disciplina, ""))).asc(),
+            func.lower(func.trim(Turma.nome)).asc(),
+            Turma.created_at.asc(),
         )
-        desempenho_media = round(float(sum_notas) / float(denom), 2)
+        .limit(TURMAS_PER_PAGE)
+        .offset((page - 1) * TURMAS_PER_PAGE)
+        .all()
+    )
 
-    desempenho_por_turma: list[dict] = []
+    turma_ids = [t.id for t in turmas_filtered]
+    horarios_by_turma: dict[int, list[dict]] = {}
+    alunos_count_by_turma: dict[int, int] = {}
+    atividades_count_by_turma: dict[int, int] = {}
     if turma_ids:
-        aulas_count_by_turma: dict[int, int] = {}
-        for turma_id, aulas_count in (
-            db.session.query(Atividade.turma_id, func.count(AtividadeAula.id))
-            .join(AtividadeAula, AtividadeAula.atividade_id == Atividade.id)
-            .filter(Atividade.turma_id.in_(turma_ids))
-            .filter(or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today))
-            .group_by(Atividade.turma_id)
+        horarios = (
+            TurmaHorario.query.filter(TurmaHorario.turma_id.in_(turma_ids))
+            .order_by(TurmaHorario.dia_semana.asc(), TurmaHorario.hora.asc())
             .all()
-        ):
-            aulas_count_by_turma[int(turma_id)] = int(aulas_count or 0)
-
-        notas_sum_by_turma: dict[int, float] = {}
-        notas_count_by_turma: dict[int, int] = {}
-        for turma_id, sum_notas, count_notas in (
-            db.session.query(Atividade.turma_id, func.sum(LancamentoAulaAluno.nota), func.count(LancamentoAulaAluno.id))
-            .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
-            .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
-            .filter(Atividade.turma_id.in_(turma_ids))
-            .filter(or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today))
-            .filter(LancamentoAulaAluno.nota.isnot(None))
-            .group_by(Atividade.turma_id)
+        )
+        for h in horarios:
+            horarios_by_turma.setdefault(int(h.turma_id), []).append(
+                {"dia_semana": int(h.dia_semana), "hora": h.hora, "periodo": h.periodo}
+            )
+
+        alunos_count_by_turma = {
+            int(turma_id): int(count)
+            for turma_id, count in db.session.query(Aluno.turma_id, func.count(Aluno.id))
+            .filter(Aluno.turma_id.in_(turma_ids), Aluno.status == "ativo")
+            .group_by(Aluno.turma_id)
             .all()
-        ):
-            notas_sum_by_turma[int(turma_id)] = float(sum_notas or 0.0)
-            notas_count_by_turma[int(turma_id)] = int(count_notas or 0)
-
-        atestados_count_by_turma: dict[int, int] = {}
-        for turma_id, count_atestados in (
-            db.session.query(Atividade.turma_id, func.count(LancamentoAulaAluno.id))
-            .join(AtividadeAula, LancamentoAulaAluno.aula_id == AtividadeAula.id)
-            .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+        }
+        atividades_count_by_turma = {
+            int(turma_id): int(count)
+            for turma_id, count in db.session.query(Atividade.turma_id, func.count(Atividade.id))
             .filter(Atividade.turma_id.in_(turma_ids))
-            .filter(or_(AtividadeAula.data.is_(None), AtividadeAula.data <= today))
-            .filter(LancamentoAulaAluno.atestado.is_(True))
             .group_by(Atividade.turma_id)
             .all()
-        ):
-            atestados_count_by_turma[int(turma_id)] = int(count_atestados or 0)
-
-        for t in turmas:
-            alunos_count = int(alunos_por_turma.get(int(t.id), 0))
-            aulas_count = int(aulas_count_by_turma.get(int(t.id), 0))
-            eligible_slots_turma = aulas_count * alunos_count
-            notas_count_turma = int(notas_count_by_turma.get(int(t.id), 0))
-            atestados_count_turma = int(atestados_count_by_turma.get(int(t.id), 0))
-            pendentes_turma = max(0, eligible_slots_turma - notas_count_turma - atestados_count_turma)
-            denom_turma = max(0, eligible_slots_turma - atestados_count_turma)
-            media_turma = (
-                round(float(notas_sum_by_turma.get(int(t.id), 0.0)) / float(denom_turma), 2)
-                if denom_turma > 0
-                else None
-            )
-            desempenho_por_turma.append(
-                {
-                    "id": int(t.id),
-                    "nome": t.nome,
-                    "serie": t.serie,
-                    "turma_letra": t.turma_letra,
-                    "disciplina": t.disciplina,
-                    "alunos": alunos_count,
-                    "media": media_turma,
-                    "pendentes": pendentes_turma,
-                }
-            )
+        }
 
-        desempenho_por_turma.sort(key=lambda x: (x["media"] is None, -(x["media"] or 0.0), x["nome"].lower()))
+    turma_cards: list[dict] = []
+    for t in turmas_filtered:
+        turma_cards.append(
+            {
+                "id": t.id,
+                "nome": t.nome,
+                "disciplina": t.disciplina,
+                "ano_serie": t.ano_serie,
+                "serie": t.serie,
+                "turma_letra": t.turma_letra,
+                "ano_letivo": t.ano_letivo,
+                "horarios": horarios_by_turma.get(int(t.id), []),
+                "alunos_count": alunos_count_by_turma.get(int(t.id), 0),
+                "atividades_count": atividades_count_by_turma.get(int(t.id), 0),
+            }
+        )
 
-    return render_template(
-        "pages/dashboard.html",
-        selected_ano_letivo=ano_letivo,
-        turmas_ativas=turmas_ativas,
-        total_alunos=total_alunos,
-        avaliacoes_pendentes=avaliacoes_pendentes,
-        desempenho_media=desempenho_media,
-        desempenho_por_turma=desempenho_por_turma,
-    )
+    return {
+        "turmas": turma_cards,
+        "q": q,
+        "page": page,
+        "pages_total": pages_total,
+        "total": total,
+        "selected_ano_letivo": ano_letivo,
+    }
 
 
 @pages_bp.route("/turmas", methods=["GET", "POST"])
@@ -388,13 +476,9 @@ def turmas():
                 400,
             )
 
-        allowed_series = {"5º", "6º", "7º", "8º", "9º", "1º Ano", "2º Ano"}
-        allowed_turmas = set("ABCDEFGH")
-        allowed_periodos = {"Manhã", "Tarde", "Noite"}
-
-        if serie not in allowed_series:
+        if serie not in ALLOWED_SERIES:
             return render_template("pages/turmas.html", error="Série inválida.", selected_ano_letivo=selected_year), 400
-        if turma_letra not in allowed_turmas:
+        if turma_letra not in ALLOWED_TURMAS:
             return render_template("pages/turmas.html", error="Turma inválida.", selected_ano_letivo=selected_year), 400
 
         try:
@@ -402,36 +486,10 @@ def turmas():
         except ValueError:
             return render_template("pages/turmas.html", error="Ano letivo inválido.", selected_ano_letivo=selected_year), 400
 
-        disciplina = "Arte" if disciplina_raw.strip().lower() == "artes" else disciplina_raw
-
-        if serie.endswith("º") and serie[:-1].isdigit():
-            ano_serie = f"{serie} Ano"
-        elif serie in {"1º Ano", "2º Ano"}:
-            ano_serie = "Segundo Grau"
-        else:
-            ano_serie = None
-
-        allowed_weekdays = set(range(0, 7))
-        time_pattern = re.compile(r"^([01]\d|2[0-3]):[0-5]\d$")
-        parsed_horarios: list[tuple[int, str, str]] = []
-        for dia_raw, hora_raw, periodo_raw in zip(horarios_dias, horarios_horas, horarios_periodos):
-            dia_raw = (dia_raw or "").strip()
-            hora_raw = (hora_raw or "").strip()
-            periodo_raw = (periodo_raw or "").strip()
-            if not dia_raw and not hora_raw and not periodo_raw:
-                continue
-            try:
-                dia = int(dia_raw)
-            except ValueError:
-                continue
-            if dia not in allowed_weekdays:
-                continue
-            if not time_pattern.match(hora_raw):
-                continue
-            if periodo_raw not in allowed_periodos:
-                continue
-            parsed_horarios.append((dia, hora_raw, periodo_raw))
+        disciplina = normalize_disciplina(disciplina_raw)
+        ano_serie = ano_serie_for(serie)
 
+        parsed_horarios = parse_form_horarios(horarios_dias, horarios_horas, horarios_periodos)
         if not parsed_horarios:
             return (
                 render_template(
@@ -442,13 +500,7 @@ def turmas():
                 400,
             )
 
-        period_order = {"Manhã": 0, "Tarde": 1, "Noite": 2}
-        periodos_unicos = sorted({p for _, _, p in parsed_horarios}, key=lambda p: period_order.get(p, 99))
-        periodo_display = periodos_unicos[0] if len(periodos_unicos) == 1 else "/".join(periodos_unicos)
-        periodo_principal = periodos_unicos[0] if len(periodos_unicos) == 1 else None
-
-        serie_nome = serie.removesuffix(" Ano") if serie in {"1º Ano", "2º Ano"} else serie
-        nome = f"{serie_nome} {turma_letra} - {disciplina} - {periodo_display}"
+        nome, periodo_principal = turma_nome_e_periodo(serie, turma_letra, disciplina, parsed_horarios)
 
         if turma_id_raw:
             try:
@@ -467,12 +519,10 @@ def turmas():
             turma.disciplina = disciplina
             turma.ano_serie = ano_serie
             turma.ano_letivo = ano_letivo
+            sync_horarios(turma.id, parsed_horarios)
+            bump_data_version(turma.id)
             db.session.commit()
-
-            TurmaHorario.query.filter_by(turma_id=turma.id).delete()
-            for dia, hora, p in parsed_horarios:
-                db.session.add(TurmaHorario(turma_id=turma.id, dia_semana=dia, hora=hora, periodo=p))
-            db.session.commit()
+            _invalidate_dashboard(int(current_user.id))
         else:
             turma = Turma(
                 professor_id=int(current_user.id),
@@ -485,120 +535,85 @@ def turmas():
                 ano_letivo=ano_letivo,
             )
             db.session.add(turma)
+            db.session.flush()
+            sync_horarios(turma.id, parsed_horarios)
             db.session.commit()
-
-            for dia, hora, p in parsed_horarios:
-                db.session.add(TurmaHorario(turma_id=turma.id, dia_semana=dia, hora=hora, periodo=p))
-            db.session.commit()
+            _invalidate_dashboard(int(current_user.id))
 
         return redirect(url_for("pages.turmas"))
 
     q = (request.args.get("q") or "").strip().lower()
+    page = max(1, _safe_int(request.args.get("page"), 1))
+    return render_template("pages/turmas.html", **_turmas_list_context(professor_id=int(current_user.id), q=q, page=page))
 
-    professor_id = int(current_user.id)
-    ano_letivo = _selected_ano_letivo(professor_id=professor_id)
-    turmas_db = Turma.query.filter_by(professor_id=professor_id, ano_letivo=ano_letivo).all()
-
-    serie_rank_map = {"5º": 5, "6º": 6, "7º": 7, "8º": 8, "9º": 9, "1º Ano": 10, "2º Ano": 11}
 
-    def sort_key(t: Turma) -> tuple:
-        return (
-            int(serie_rank_map.get((t.serie or "").strip(), 99)),
-            (t.turma_letra or "").strip(),
-            (t.disciplina or "").strip().lower(),
-            (t.nome or "").strip().lower(),
-            t.created_at,
-        )
+@pages_bp.post("/turmas/importar")
+@login_required
+def turmas_importar_csv():
+    professor_id = int(current_user.id)
+    uploaded = request.files.get("csv")
+    if uploaded is None or not (uploaded.filename or "").strip():
+        return redirect(url_for("pages.turmas", import_status="missing"))
 
-    turmas_db = sorted(turmas_db, key=sort_key)
+    raw = uploaded.read()
+    try:
+        content = raw.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        content = raw.decode("latin-1")
+
+    result = import_turmas_csv(
+        content,
+        default_professor_id=professor_id,
+        allowed_professor_ids=None if current_user.is_admin else {professor_id},
+        default_ano_letivo=_selected_ano_letivo(professor_id=professor_id),
+    )
+    if result.erros:
+        db.session.rollback()
+        context = _turmas_list_context(professor_id=professor_id, q="", page=1)
+        return render_template("pages/turmas.html", import_errors=result.erros, **context), 400
 
-    def matches_query(t: Turma) -> bool:
-        if not q:
-            return True
-        if q in (t.nome or "").lower():
-            return True
-        if t.disciplina and q in t.disciplina.lower():
-            return True
-        return False
+    db.session.commit()
+    for pid in result.professor_ids:
+        _invalidate_dashboard(pid)
+    return redirect(url_for("pages.turmas", import_status="ok", importadas=result.criadas))
 
-    turmas_filtered = [t for t in turmas_db if matches_query(t)]
 
-    turma_ids = [t.id for t in turmas_filtered]
-    horarios_by_turma: dict[int, list[dict]] = {}
-    if turma_ids:
-        horarios = (
-            TurmaHorario.query.filter(TurmaHorario.turma_id.in_(turma_ids))
-            .order_by(TurmaHorario.dia_semana.asc(), TurmaHorario.hora.asc())
-            .all()
-        )
-        for h in horarios:
-            horarios_by_turma.setdefault(int(h.turma_id), []).append(
-                {"dia_semana": int(h.dia_semana), "hora": h.hora, "periodo": h.periodo}
-            )
+def _trimestre_da_turma(*, turma: Turma, ano_letivo: int, raw: str | None) -> int:
+    """Trimestre pedido na URL; sem parâmetro, o primeiro trimestre ainda não fechado."""
+    raw = (raw or "").strip()
+    if raw:
+        try:
+            return max(1, min(MAX_TRIMESTRE, int(raw)))
+        except ValueError:
+            return 1
+    fechados = {
+        int(r.trimestre)
+        for r in FechamentoTrimestreTurma.query.filter_by(turma_id=turma.id, ano_letivo=ano_letivo, status="fechado").all()
+    }
+    return next((tri for tri in range(1, MAX_TRIMESTRE + 1) if tri not in fechados), MAX_TRIMESTRE)
 
-    turma_cards: list[dict] = []
-    for t in turmas_filtered:
-        alunos_count = Aluno.query.filter_by(turma_id=t.id, status="ativo").count()
-        atividades_count = Atividade.query.filter_by(turma_id=t.id).count()
-        turma_cards.append(
-            {
-                "id": t.id,
-                "nome": t.nome,
-                "disciplina": t.disciplina,
-                "ano_serie": t.ano_serie,
-                "serie": t.serie,
-                "turma_letra": t.turma_letra,
-                "ano_letivo": t.ano_letivo,
-                "horarios": horarios_by_turma.get(int(t.id), []),
-                "alunos_count": alunos_count,
-                "atividades_count": atividades_count,
-            }
-        )
 
-    return render_template(
-        "pages/turmas.html",
-        turmas=turma_cards,
-        q=q,
-        selected_ano_letivo=ano_letivo,
+def _alunos_ativos(turma_id: int) -> list[Aluno]:
+    return (
+        Aluno.query.filter_by(turma_id=turma_id, status="ativo")
+        .order_by(Aluno.numero_chamada.asc(), Aluno.nome_completo.asc())
+        .all()
     )
 
 
-@pages_bp.get("/turmas/<int:turma_id>")
-@login_required
-def turma_detail(turma_id: int):
-    turma = Turma.query.filter_by(id=turma_id, professor_id=int(current_user.id)).first()
-    if turma is None:
-        return redirect(url_for("pages.turmas"))
-
-    today = date.today()
-    ano_letivo = int(turma.ano_letivo or 2026)
+def _outras_turmas_do_ano(turma: Turma):
+    """Consulta das demais turmas do professor no ano letivo da turma (destinos de transferência e replicação)."""
+    return Turma.query.filter_by(professor_id=int(current_user.id), ano_letivo=turma.ano_letivo).filter(
+        Turma.id != turma.id
+    )
 
-    tab = (request.args.get("tab") or "detalhes").strip().lower()
-    if tab not in {"detalhes", "atividades"}:
-        tab = "detalhes"
-
-    trimestre_param = (request.args.get("trimestre") or "").strip()
-    if trimestre_param:
-        try:
-            current_trimestre = max(1, min(MAX_TRIMESTRE, int(trimestre_param)))
-        except ValueError:
-            current_trimestre = 1
-    else:
-        fechados = {
-            int(r.trimestre)
-            for r in FechamentoTrimestreTurma.query.filter_by(
-                turma_id=turma.id, ano_letivo=ano_letivo, status="fechado"
-            ).all()
-        }
-        current_trimestre = next(
-            (tri for tri in range(1, MAX_TRIMESTRE + 1) if tri not in fechados),
-            MAX_TRIMESTRE,
-        )
 
+def _detalhes_context(*, turma: Turma, alunos: list[Aluno], ano_letivo: int, trimestre: int, today: date) -> dict:
+    """Contexto da aba "Detalhes": fechamento do trimestre, turmas de destino e resumo por trimestre."""
     fechamento_rec = FechamentoTrimestreTurma.query.filter_by(
         turma_id=turma.id,
         ano_letivo=ano_letivo,
-        trimestre=current_trimestre,
+        trimestre=trimestre,
     ).first()
     fechamento_status = (
         {
@@ -610,219 +625,244 @@ def turma_detail(turma_id: int):
         else {"status": "aberto", "fechado_em": None, "reaberto_em": None}
     )
 
-    alunos_count = Aluno.query.filter_by(turma_id=turma.id, status="ativo").count()
-    atividades_count = Atividade.query.filter_by(turma_id=turma.id).count()
-    alunos = (
-        Aluno.query.filter_by(turma_id=turma.id, status="ativo")
-        .order_by(Aluno.numero_chamada.asc(), Aluno.nome_completo.asc())
-        .all()
+    turmas_destino = _outras_turmas_do_ano(turma).order_by(Turma.created_at.asc()).all()
+
+    all_atividades = Atividade.query.filter_by(turma_id=turma.id).order_by(Atividade.created_at.desc()).all()
+    book = gradebook_from_stats(
+        turma_id=turma.id,
+        aluno_ids=[int(a.id) for a in alunos],
+        atividades=all_atividades,
+        today=today,
     )
-    turmas_destino = (
-        Turma.query.filter_by(professor_id=int(current_user.id), ano_letivo=turma.ano_letivo)
-        .filter(Turma.id != turma.id)
-        .order_by(Turma.created_at.asc())
-        .all()
+    resultados_by_tri = {tri: book.resultados_trimestre(tri) for tri in range(1, MAX_TRIMESTRE + 1)}
+
+    # Prefer snapshot from this turma; otherwise fall back to the latest snapshot from any turma
+    # (useful when a student was transferred after a trimester was closed in another turma).
+    snapshot_best_by_estudante_tri = best_snapshots(
+        ano_letivo=ano_letivo,
+        estudante_ids=[int(a.estudante_id) for a in alunos if a.estudante_id is not None],
+        prefer_turma_id=int(turma.id),
     )
 
+    snapshot_media_by_estudante_tri: dict[tuple[int, int], float | None] = {
+        key: (float(row.media_final) if row.media_final is not None else None)
+        for key, row in snapshot_best_by_estudante_tri.items()
+    }
+
     detalhes_notas: dict[int, dict[str, float | None]] = {}
-    atividades: list[Atividade] = []
-    selected_atividade: Atividade | None = None
-    selected_aulas: list[AtividadeAula] = []
-    selected_aula_num = 1
+    for aluno in alunos:
+        aluno_row: dict[str, float | None] = {}
+        trimestre_vals: list[float] = []
+
+        for tri in range(1, MAX_TRIMESTRE + 1):
+            snap_val = None
+            if aluno.estudante_id is not None:
+                snap_val = snapshot_media_by_estudante_tri.get((int(aluno.estudante_id), tri))
+
+            if snap_val is not None:
+                aluno_row[f"t{tri}"] = round(float(snap_val), 2)
+                trimestre_vals.append(float(snap_val))
+                continue
+
+            tri_val = resultados_by_tri[tri][int(aluno.id)].media
+            aluno_row[f"t{tri}"] = tri_val
+            if tri_val is not None:
+                trimestre_vals.append(float(tri_val))
+
+        aluno_row["total"] = round(sum(trimestre_vals) / float(len(trimestre_vals)), 2) if trimestre_vals else None
+        detalhes_notas[int(aluno.id)] = aluno_row
+
+    return {
+        "fechamento_status": fechamento_status,
+        "turmas_destino": turmas_destino,
+        "detalhes_notas": detalhes_notas,
+    }
+
+
+def _medias_atividade(*, turma: Turma, alunos: list[Aluno], atividade: Atividade, today: date) -> dict[int, float | None]:
+    book = gradebook_from_stats(
+        turma_id=turma.id,
+        aluno_ids=[int(a.id) for a in alunos],
+        atividades=[atividade],
+        today=today,
+    )
+    return book.medias_atividade(atividade.id)
+
+
+def _notas_context(*, turma: Turma, alunos: list[Aluno], atividade: Atividade, aula_num: int, today: date) -> dict:
+    """Contexto do cartão "Lançar nota do dia" de uma (atividade, aula), com a coluna de médias."""
+    selected_aulas = _aulas_da_atividade(atividade.id)
+    selected_aula_num = max(1, min(len(selected_aulas) or 1, aula_num))
+    selected_aula = next((a for a in selected_aulas if a.numero == selected_aula_num), None)
+
     lancamentos_by_aluno: dict[int, LancamentoAulaAluno] = {}
-    medias_by_aluno: dict[int, float] = {}
+    if selected_aula is not None:
+        lancamentos = LancamentoAulaAluno.query.filter_by(aula_id=selected_aula.id).all()
+        lancamentos_by_aluno = {l.aluno_id: l for l in lancamentos}
+
+    return {
+        "selected_atividade": atividade,
+        "selected_aulas": selected_aulas,
+        "selected_aula_num": selected_aula_num,
+        "selected_aula": selected_aula,
+        "lancamentos_by_aluno": lancamentos_by_aluno,
+        "medias_by_aluno": _medias_atividade(turma=turma, alunos=alunos, atividade=atividade, today=today),
+    }
 
-    if tab == "detalhes":
-        all_atividades = Atividade.query.filter_by(turma_id=turma.id).order_by(Atividade.created_at.desc()).all()
 
-        atividade_ids = [a.id for a in all_atividades] if all_atividades else []
-        aulas = (
-            AtividadeAula.query.filter(AtividadeAula.atividade_id.in_(atividade_ids)).all()
-            if atividade_ids
-            else []
-        )
+def _atividades_context(*, turma: Turma, alunos: list[Aluno], trimestre: int, today: date) -> dict:
+    """Contexto da aba "Atividades": atividades do trimestre e a selecionada (atividade_id / aula da URL)."""
+    atividades = (
+        Atividade.query.filter_by(turma_id=turma.id, trimestre=trimestre).order_by(Atividade.created_at.desc()).all()
+    )
 
-        aulas_ids = [int(a.id) for a in aulas]
-        iniciadas_ids = _aulas_iniciadas_ids(aulas_ids=aulas_ids, today=today) if aulas_ids else set()
-        eligible_aulas = [a for a in aulas if int(a.id) in iniciadas_ids]
-        aula_ids = [a.id for a in eligible_aulas]
-        lancamentos = (
-            LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_(aula_ids)).all()
-            if aula_ids
-            else []
+    selected_atividade: Atividade | None = None
+    atividade_id = request.args.get("atividade_id")
+    if atividade_id:
+        selected_atividade = next((a for a in atividades if str(a.id) == str(atividade_id)), None)
+    if selected_atividade is None and atividades:
+        selected_atividade = atividades[0]
+
+    context: dict = {
+        "atividades": atividades,
+        "selected_atividade": None,
+        "selected_aulas": [],
+        "selected_aula_num": 1,
+        "lancamentos_by_aluno": {},
+        "medias_by_aluno": {},
+        "turmas_replicar": [],
+    }
+    if selected_atividade is not None:
+        context["turmas_replicar"] = _outras_turmas_do_ano(turma).order_by(Turma.nome.asc()).all()
+        context.update(
+            _notas_context(
+                turma=turma,
+                alunos=alunos,
+                atividade=selected_atividade,
+                aula_num=_safe_int(request.args.get("aula"), 1),
+                today=today,
+            )
         )
+    return context
 
-        aula_to_atividade: dict[int, int] = {int(a.id): int(a.atividade_id) for a in eligible_aulas}
-        eligible_aulas_count_by_atividade: dict[int, int] = {}
-        for a in eligible_aulas:
-            eligible_aulas_count_by_atividade[int(a.atividade_id)] = eligible_aulas_count_by_atividade.get(int(a.atividade_id), 0) + 1
 
-        sum_by_atividade_aluno: dict[tuple[int, int], float] = {}
-        atestado_by_atividade_aluno: dict[tuple[int, int], int] = {}
-        for l in lancamentos:
-            atividade_id = aula_to_atividade.get(int(l.aula_id))
-            if atividade_id is None:
-                continue
-            key = (atividade_id, int(l.aluno_id))
-            if l.atestado:
-                atestado_by_atividade_aluno[key] = atestado_by_atividade_aluno.get(key, 0) + 1
-                continue
-            if l.nota is None:
-                continue
-            sum_by_atividade_aluno[key] = sum_by_atividade_aluno.get(key, 0.0) + float(l.nota)
-
-        atividades_by_trimestre: dict[int, list[Atividade]] = {tri: [] for tri in range(1, MAX_TRIMESTRE + 1)}
-        for a in all_atividades:
-            tri = int(a.trimestre or 1)
-            tri = max(1, min(MAX_TRIMESTRE, tri))
-            atividades_by_trimestre[tri].append(a)
-
-        estudante_ids = [int(a.estudante_id) for a in alunos if a.estudante_id is not None]
-        snapshot_rows = (
-            FechamentoTrimestreAluno.query.filter_by(ano_letivo=ano_letivo)
-            .filter(FechamentoTrimestreAluno.estudante_id.in_(estudante_ids))
-            .all()
-            if estudante_ids
-            else []
-        )
-        # Prefer snapshot from this turma; otherwise fall back to the latest snapshot from any turma
-        # (useful when a student was transferred after a trimester was closed in another turma).
-        snapshot_best_by_estudante_tri: dict[tuple[int, int], FechamentoTrimestreAluno] = {}
-        for r in snapshot_rows:
-            key = (int(r.estudante_id), int(r.trimestre))
-            current = snapshot_best_by_estudante_tri.get(key)
-            if current is None:
-                snapshot_best_by_estudante_tri[key] = r
-                continue
-            if int(r.turma_id) == int(turma.id) and int(current.turma_id) != int(turma.id):
-                snapshot_best_by_estudante_tri[key] = r
-                continue
-            if int(r.turma_id) != int(turma.id) and int(current.turma_id) == int(turma.id):
-                continue
-            if getattr(r, "created_at", None) and getattr(current, "created_at", None):
-                if r.created_at > current.created_at:
-                    snapshot_best_by_estudante_tri[key] = r
+@pages_bp.get("/turmas/<int:turma_id>")
+@login_required
+def turma_detail(turma_id: int):
+    tab = (request.args.get("tab") or "detalhes").strip().lower()
+    if tab not in {"detalhes", "atividades"}:
+        tab = "detalhes"
 
-        snapshot_media_by_estudante_tri: dict[tuple[int, int], float | None] = {
-            key: (float(row.media_final) if row.media_final is not None else None)
-            for key, row in snapshot_best_by_estudante_tri.items()
-        }
+    # As demais turmas do professor entram no ETag: a lista de destino do remanejamento vem delas.
+    versoes = _turmas_versao(int(current_user.id))
+    if turma_id not in versoes:
+        return redirect(url_for("pages.turmas"))
+    snapshots_versao = _snapshots_versao(turma_id) if tab == "detalhes" else []
+    etag = _page_etag(sorted(versoes.items()), snapshots_versao)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
 
-        for aluno in alunos:
-            aluno_row: dict[str, float | None] = {}
-            trimestre_vals: list[float] = []
-
-            for tri in range(1, MAX_TRIMESTRE + 1):
-                snap_val = None
-                if aluno.estudante_id is not None:
-                    snap_val = snapshot_media_by_estudante_tri.get((int(aluno.estudante_id), tri))
-
-                if snap_val is not None:
-                    aluno_row[f"t{tri}"] = round(float(snap_val), 2)
-                    trimestre_vals.append(float(snap_val))
-                    continue
-
-                tri_sum = 0.0
-                tri_peso = 0.0
-                for atv in atividades_by_trimestre[tri]:
-                    eligible_cnt = int(eligible_aulas_count_by_atividade.get(int(atv.id), 0))
-                    if eligible_cnt <= 0:
-                        continue
-                    atestados_cnt = int(atestado_by_atividade_aluno.get((int(atv.id), int(aluno.id)), 0))
-                    denom = max(0, eligible_cnt - atestados_cnt)
-                    if denom <= 0:
-                        continue
-                    media_atv = sum_by_atividade_aluno.get((int(atv.id), int(aluno.id)), 0.0) / float(denom)
-                    peso = float(atv.peso or 1)
-                    tri_sum += media_atv * peso
-                    tri_peso += peso
-
-                tri_val = round(tri_sum / tri_peso, 2) if tri_peso > 0 else None
-                aluno_row[f"t{tri}"] = tri_val
-                if tri_val is not None:
-                    trimestre_vals.append(float(tri_val))
-
-            aluno_row["total"] = round(sum(trimestre_vals) / float(len(trimestre_vals)), 2) if trimestre_vals else None
-            detalhes_notas[int(aluno.id)] = aluno_row
-
-    if tab == "atividades":
-        atividades = (
-            Atividade.query.filter_by(turma_id=turma.id, trimestre=current_trimestre)
-            .order_by(Atividade.created_at.desc())
-            .all()
-        )
+    turma = db.session.get(Turma, turma_id)
 
-        atividade_id = request.args.get("atividade_id")
-        if atividade_id:
-            selected_atividade = next((a for a in atividades if str(a.id) == str(atividade_id)), None)
-        if selected_atividade is None and atividades:
-            selected_atividade = atividades[0]
-
-        if selected_atividade is not None:
-            selected_aulas = _ensure_aulas_for_atividade(selected_atividade)
-            selected_aula_num = max(1, min(len(selected_aulas) or 1, _safe_int(request.args.get("aula"), 1)))
-            selected_aula = next((a for a in selected_aulas if a.numero == selected_aula_num), None)
-
-            if selected_aula is not None:
-                lancamentos = LancamentoAulaAluno.query.filter_by(aula_id=selected_aula.id).all()
-                lancamentos_by_aluno = {l.aluno_id: l for l in lancamentos}
-
-            selected_aulas_ids = [int(a.id) for a in selected_aulas]
-            iniciadas_ids = _aulas_iniciadas_ids(aulas_ids=selected_aulas_ids, today=today)
-            eligible_aulas_for_media = [a for a in selected_aulas if int(a.id) in iniciadas_ids]
-            aulas_ids = [a.id for a in eligible_aulas_for_media]
-            all_lancamentos = (
-                LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_(aulas_ids)).all()
-                if aulas_ids
-                else []
-            )
+    today = date.today()
+    ano_letivo = int(turma.ano_letivo or 2026)
 
-            nota_by_aula_aluno: dict[tuple[int, int], float] = {}
-            atestado_by_aula_aluno: set[tuple[int, int]] = set()
-            for l in all_lancamentos:
-                if l.atestado:
-                    atestado_by_aula_aluno.add((l.aula_id, l.aluno_id))
-                    continue
-                if l.nota is None:
-                    continue
-                nota_by_aula_aluno[(l.aula_id, l.aluno_id)] = float(l.nota)
-
-            for aluno in alunos:
-                total = 0.0
-                denom = 0
-                for aula in eligible_aulas_for_media:
-                    if (aula.id, aluno.id) in atestado_by_aula_aluno:
-                        continue
-                    denom += 1
-                    total += nota_by_aula_aluno.get((aula.id, aluno.id), 0.0)
-                medias_by_aluno[aluno.id] = round(total / float(denom), 2) if denom > 0 else None
+    current_trimestre = _trimestre_da_turma(turma=turma, ano_letivo=ano_letivo, raw=request.args.get("trimestre"))
+    alunos = _alunos_ativos(turma.id)
+    if tab == "detalhes":
+        tab_context = _detalhes_context(
+            turma=turma, alunos=alunos, ano_letivo=ano_letivo, trimestre=current_trimestre, today=today
+        )
+    else:
+        tab_context = _atividades_context(turma=turma, alunos=alunos, trimestre=current_trimestre, today=today)
 
-    return render_template(
-        "pages/turma_detail.html",
-        turma=turma,
-        current_turma={"id": turma.id, "nome": turma.nome},
-        tab=tab,
-        current_trimestre=current_trimestre,
-        fechamento_status=fechamento_status,
-        alunos_count=alunos_count,
-        atividades_count=atividades_count,
-        alunos=alunos,
-        atividades=atividades,
-        selected_atividade=selected_atividade,
-        selected_aulas=selected_aulas,
-        selected_aula_num=selected_aula_num,
-        lancamentos_by_aluno=lancamentos_by_aluno,
-        medias_by_aluno=medias_by_aluno,
-        detalhes_notas=detalhes_notas,
-        error=(request.args.get("error") or "").strip(),
-        transfer_ok=(request.args.get("transfer_ok") or "").strip(),
-        imported=request.args.get("imported"),
-        import_status=request.args.get("import_status"),
-        import_mismatch=(request.args.get("import_mismatch") or "").strip(),
-        turmas_destino=turmas_destino,
+    return _with_etag(
+        render_template(
+            "pages/turma_detail.html",
+            turma=turma,
+            current_turma={"id": turma.id, "nome": turma.nome},
+            tab=tab,
+            current_trimestre=current_trimestre,
+            alunos_count=len(alunos),
+            atividades_count=Atividade.query.filter_by(turma_id=turma.id).count(),
+            alunos=alunos,
+            error=(request.args.get("error") or "").strip(),
+            transfer_ok=(request.args.get("transfer_ok") or "").strip(),
+            replicar_ok=(request.args.get("replicar_ok") or "").strip(),
+            imported=request.args.get("imported"),
+            import_status=request.args.get("import_status"),
+            import_mismatch=(request.args.get("import_mismatch") or "").strip(),
+            **tab_context,
+        ),
+        etag,
     )
 
 
+TURMA_FRAGMENTOS = {"detalhes", "atividades", "notas", "medias"}
+
+
+def _wants_fragment() -> bool:
+    return request.headers.get("X-Requested-With") == "fetch"
+
+
+@pages_bp.get("/turmas/<int:turma_id>/fragmentos/<parte>")
+@login_required
+def turma_detail_fragmento(turma_id: int, parte: str):
+    """Pedaços de turma_detail para o script da página trocar sem recarregar tudo.
+
+    - detalhes: conteúdo da aba Detalhes (troca de trimestre);
+    - atividades: conteúdo da aba Atividades (troca de trimestre ou de atividade);
+    - notas: cartão de lançamentos de uma (atividade_id, aula) (troca de aula);
+    - medias: só as células da coluna Média de atividade_id (depois de salvar).
+    Cada parte faz apenas as consultas que ela própria exibe.
+    """
+    if parte not in TURMA_FRAGMENTOS:
+        return "", 404
+    versoes = _turmas_versao(int(current_user.id))
+    if turma_id not in versoes:
+        return "", 404
+    snapshots_versao = _snapshots_versao(turma_id) if parte == "detalhes" else []
+    etag = _page_etag(sorted(versoes.items()), snapshots_versao)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    turma = db.session.get(Turma, turma_id)
+
+    today = date.today()
+    ano_letivo = int(turma.ano_letivo or 2026)
+    current_trimestre = _trimestre_da_turma(turma=turma, ano_letivo=ano_letivo, raw=request.args.get("trimestre"))
+    alunos = _alunos_ativos(turma.id)
+    context: dict = {"turma": turma, "current_trimestre": current_trimestre, "alunos": alunos}
+
+    if parte == "detalhes":
+        context.update(
+            _detalhes_context(turma=turma, alunos=alunos, ano_letivo=ano_letivo, trimestre=current_trimestre, today=today)
+        )
+        return _with_etag(render_template("partials/turma_detail/detalhes.html", **context), etag)
+    if parte == "atividades":
+        context.update(_atividades_context(turma=turma, alunos=alunos, trimestre=current_trimestre, today=today))
+        return _with_etag(render_template("partials/turma_detail/atividades.html", **context), etag)
+
+    atividade = Atividade.query.filter_by(id=_safe_int(request.args.get("atividade_id"), 0), turma_id=turma.id).first()
+    if atividade is None:
+        return "", 404
+    if parte == "notas":
+        context.update(
+            _notas_context(
+                turma=turma,
+                alunos=alunos,
+                atividade=atividade,
+                aula_num=_safe_int(request.args.get("aula"), 1),
+                today=today,
+            )
+        )
+        return _with_etag(render_template("partials/turma_detail/notas.html", **context), etag)
+    context["medias_by_aluno"] = _medias_atividade(turma=turma, alunos=alunos, atividade=atividade, today=today)
+    return _with_etag(render_template("partials/turma_detail/medias.html", **context), etag)
+
+
 @pages_bp.post("/turmas/<int:turma_id>/delete")
 @login_required
 def turma_delete(turma_id: int):
@@ -831,8 +871,12 @@ def turma_delete(turma_id: int):
         return redirect(url_for("pages.turmas"))
 
     try:
+        delete_turma_stats(int(turma.id))
+        DashboardDailyRollup.query.filter_by(turma_id=turma.id).delete(synchronize_session=False)
+        LancamentoHistorico.query.filter_by(turma_id=turma.id).delete(synchronize_session=False)
         db.session.delete(turma)
         db.session.commit()
+        _invalidate_dashboard(int(current_user.id))
     except Exception:
         db.session.rollback()
         return redirect(url_for("pages.turmas", error="Não foi possível deletar a turma."))
@@ -840,6 +884,54 @@ def turma_delete(turma_id: int):
     return redirect(url_for("pages.turmas"))
 
 
+def _agendar_inicio() -> date | None:
+    """Data de início pedida em "Agendar a partir de" (campo `agendar_inicio`); None sem data válida."""
+    try:
+        return date.fromisoformat((request.form.get("agendar_inicio") or "").strip())
+    except ValueError:
+        return None
+
+
+def _datas_aulas_form(aulas_planejadas: int) -> dict[int, date | None]:
+    """Datas digitadas nos campos data_aula_N: vazio tira a data; valor inválido mantém a atual."""
+    datas: dict[int, date | None] = {}
+    for n in range(1, aulas_planejadas + 1):
+        raw = (request.form.get(f"data_aula_{n}") or "").strip()
+        try:
+            datas[n] = date.fromisoformat(raw) if raw else None
+        except ValueError:
+            continue
+    return datas
+
+
+def _aplicar_plano(*, turma: Turma, atividade: Atividade, aulas_planejadas: int) -> str | None:
+    """Ajusta as aulas da atividade ao formulário: datas digitadas ou, com "Agendar a partir de", pelos
+    horários da turma. Devolve a mensagem de erro, se houver (quem chama desfaz a transação)."""
+    inicio = _agendar_inicio()
+    try:
+        aplicar_plano_aulas(
+            atividade_id=int(atividade.id),
+            aulas_planejadas=aulas_planejadas,
+            datas=None if inicio is not None else _datas_aulas_form(aulas_planejadas),
+        )
+    except AulasComLancamentos as exc:
+        return str(exc)
+    if inicio is not None:
+        return _agendar(turma=turma, atividade_ids=[int(atividade.id)], inicio=inicio)
+    return None
+
+
+def _agendar(*, turma: Turma, atividade_ids: list[int], inicio: date) -> str | None:
+    """Data as aulas das atividades pelos horários da turma; devolve a mensagem de erro, se houver."""
+    try:
+        agendar_atividades(
+            turma_id=int(turma.id), atividade_ids=atividade_ids, inicio=inicio, feriados=current_app.config["FERIADOS"]
+        )
+    except ValueError as exc:
+        return str(exc)
+    return None
+
+
 @pages_bp.post("/turmas/<int:turma_id>/atividades")
 @login_required
 def turma_criar_atividade(turma_id: int):
@@ -865,18 +957,15 @@ def turma_criar_atividade(turma_id: int):
         status="ativa",
     )
     db.session.add(atividade)
-    db.session.commit()
+    db.session.flush()
 
-    for n in range(1, aulas_planejadas + 1):
-        date_str = (request.form.get(f"data_aula_{n}") or "").strip()
-        aula_date = None
-        if date_str:
-            try:
-                aula_date = date.fromisoformat(date_str)
-            except ValueError:
-                aula_date = None
-        db.session.add(AtividadeAula(atividade_id=atividade.id, numero=n, data=aula_date))
+    error = _aplicar_plano(turma=turma, atividade=atividade, aulas_planejadas=aulas_planejadas)
+    if error:
+        db.session.rollback()
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id, tab="atividades", trimestre=trimestre, error=error))
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     return redirect(
         url_for(
@@ -904,54 +993,25 @@ def turma_planejar_atividade(turma_id: int, atividade_id: int):
     trimestre = max(1, min(MAX_TRIMESTRE, _safe_int(request.form.get("trimestre"), atividade.trimestre or 1)))
     aulas_planejadas = max(1, _safe_int(request.form.get("aulas_planejadas"), atividade.aulas_planejadas or 1))
 
-    aulas = AtividadeAula.query.filter_by(atividade_id=atividade.id).order_by(AtividadeAula.numero.asc()).all()
-    current_count = len(aulas)
-
-    if aulas_planejadas < current_count:
-        aulas_to_remove = [a for a in aulas if a.numero > aulas_planejadas]
-        if not aulas_to_remove:
-            atividade.aulas_planejadas = aulas_planejadas
-        else:
-            ids = [a.id for a in aulas_to_remove]
-            used = (
-                LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_(ids)).first()
-                is not None
-            )
-            if used:
-                return redirect(
-                    url_for(
-                        "pages.turma_detail",
-                        turma_id=turma_id,
-                        tab="atividades",
-                        trimestre=trimestre,
-                        atividade_id=atividade.id,
-                        error="Não é possível reduzir o número de aulas: há lançamentos nas aulas finais.",
-                    )
-                )
-            for a in aulas_to_remove:
-                db.session.delete(a)
-
-    if aulas_planejadas > current_count:
-        for n in range(current_count + 1, aulas_planejadas + 1):
-            db.session.add(AtividadeAula(atividade_id=atividade.id, numero=n))
-
     atividade.trimestre = trimestre
     atividade.aulas_planejadas = aulas_planejadas
+    error = _aplicar_plano(turma=turma, atividade=atividade, aulas_planejadas=aulas_planejadas)
+    if error:
+        db.session.rollback()
+        return redirect(
+            url_for(
+                "pages.turma_detail",
+                turma_id=turma_id,
+                tab="atividades",
+                trimestre=trimestre,
+                atividade_id=atividade.id,
+                error=error,
+            )
+        )
 
-    for n in range(1, aulas_planejadas + 1):
-        date_str = (request.form.get(f"data_aula_{n}") or "").strip()
-        aula = AtividadeAula.query.filter_by(atividade_id=atividade.id, numero=n).first()
-        if aula is None:
-            continue
-        if not date_str:
-            aula.data = None
-            continue
-        try:
-            aula.data = date.fromisoformat(date_str)
-        except ValueError:
-            pass
-
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     return redirect(
         url_for(
@@ -996,55 +1056,28 @@ def turma_configurar_atividade(turma_id: int, atividade_id: int):
             )
         )
 
-    aulas = AtividadeAula.query.filter_by(atividade_id=atividade.id).order_by(AtividadeAula.numero.asc()).all()
-    current_count = len(aulas)
-
-    if aulas_planejadas < current_count:
-        aulas_to_remove = [a for a in aulas if a.numero > aulas_planejadas]
-        if aulas_to_remove:
-            ids = [a.id for a in aulas_to_remove]
-            used = (
-                LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_(ids)).first()
-                is not None
-            )
-            if used:
-                return redirect(
-                    url_for(
-                        "pages.turma_detail",
-                        turma_id=turma_id,
-                        tab="atividades",
-                        trimestre=trimestre,
-                        atividade_id=atividade.id,
-                        aula=aula_num,
-                        error="Não é possível reduzir o número de aulas: há lançamentos nas aulas finais.",
-                    )
-                )
-            for a in aulas_to_remove:
-                db.session.delete(a)
-
-    if aulas_planejadas > current_count:
-        for n in range(current_count + 1, aulas_planejadas + 1):
-            db.session.add(AtividadeAula(atividade_id=atividade.id, numero=n))
-
     atividade.titulo = titulo
     atividade.descricao = descricao
     atividade.trimestre = trimestre
     atividade.aulas_planejadas = aulas_planejadas
+    error = _aplicar_plano(turma=turma, atividade=atividade, aulas_planejadas=aulas_planejadas)
+    if error:
+        db.session.rollback()
+        return redirect(
+            url_for(
+                "pages.turma_detail",
+                turma_id=turma_id,
+                tab="atividades",
+                trimestre=trimestre,
+                atividade_id=atividade.id,
+                aula=aula_num,
+                error=error,
+            )
+        )
 
-    for n in range(1, aulas_planejadas + 1):
-        date_str = (request.form.get(f"data_aula_{n}") or "").strip()
-        aula = AtividadeAula.query.filter_by(atividade_id=atividade.id, numero=n).first()
-        if aula is None:
-            continue
-        if not date_str:
-            aula.data = None
-            continue
-        try:
-            aula.data = date.fromisoformat(date_str)
-        except ValueError:
-            pass
-
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     return redirect(
         url_for(
@@ -1058,6 +1091,82 @@ def turma_configurar_atividade(turma_id: int, atividade_id: int):
     )
 
 
+@pages_bp.post("/turmas/<int:turma_id>/atividades/<int:atividade_id>/replicar")
+@login_required
+def turma_replicar_atividade(turma_id: int, atividade_id: int):
+    """Copia a atividade e suas aulas para as turmas marcadas (mesmo ano letivo), numa transação."""
+    turma = Turma.query.filter_by(id=turma_id, professor_id=int(current_user.id)).first()
+    if turma is None:
+        return redirect(url_for("pages.turmas"))
+
+    atividade = Atividade.query.filter_by(id=atividade_id, turma_id=turma.id).first()
+    if atividade is None:
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id, tab="atividades"))
+
+    destino_ids = {_safe_int(raw, 0) for raw in request.form.getlist("turma_ids")}
+    destinos = (
+        _outras_turmas_do_ano(turma).filter(Turma.id.in_(destino_ids)).order_by(Turma.nome.asc()).all()
+        if destino_ids
+        else []
+    )
+    redirect_args = {
+        "turma_id": turma_id,
+        "tab": "atividades",
+        "trimestre": atividade.trimestre,
+        "atividade_id": atividade.id,
+    }
+    if not destinos:
+        return redirect(url_for("pages.turma_detail", **redirect_args, error="Selecione ao menos uma turma."))
+
+    try:
+        replicar_atividade(
+            atividade=atividade,
+            turmas=destinos,
+            inicio=_agendar_inicio(),
+            feriados=current_app.config["FERIADOS"],
+        )
+    except ValueError as exc:
+        db.session.rollback()
+        return redirect(url_for("pages.turma_detail", **redirect_args, error=str(exc)))
+
+    bump_data_version(*[d.id for d in destinos])
+    db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
+
+    nomes = ", ".join(d.nome for d in destinos)
+    return redirect(url_for("pages.turma_detail", **redirect_args, replicar_ok=f"Atividade replicada em: {nomes}."))
+
+
+@pages_bp.post("/turmas/<int:turma_id>/trimestres/<int:trimestre>/agendar")
+@login_required
+def turma_agendar_trimestre(turma_id: int, trimestre: int):
+    """Data as aulas de todas as atividades do trimestre, uma depois da outra, pelos horários da turma."""
+    turma = Turma.query.filter_by(id=turma_id, professor_id=int(current_user.id)).first()
+    if turma is None:
+        return redirect(url_for("pages.turmas"))
+    trimestre = max(1, min(MAX_TRIMESTRE, trimestre))
+
+    inicio = _agendar_inicio()
+    atividade_ids = [
+        int(atividade_id)
+        for (atividade_id,) in db.session.query(Atividade.id)
+        .filter(Atividade.turma_id == turma.id, Atividade.trimestre == trimestre)
+        .order_by(Atividade.id.asc())
+    ]
+    error = "Informe a data de início." if inicio is None else None
+    if error is None and atividade_ids:
+        error = _agendar(turma=turma, atividade_ids=atividade_ids, inicio=inicio)
+    if error:
+        db.session.rollback()
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id, tab="atividades", trimestre=trimestre, error=error))
+
+    if atividade_ids:
+        bump_data_version(turma.id)
+        db.session.commit()
+        _invalidate_dashboard(int(current_user.id))
+    return redirect(url_for("pages.turma_detail", turma_id=turma_id, tab="atividades", trimestre=trimestre))
+
+
 @pages_bp.post("/turmas/<int:turma_id>/atividades/<int:atividade_id>/excluir")
 @login_required
 def turma_excluir_atividade(turma_id: int, atividade_id: int):
@@ -1098,8 +1207,11 @@ def turma_excluir_atividade(turma_id: int, atividade_id: int):
     if aulas_ids:
         LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_(aulas_ids)).delete(synchronize_session=False)
     AtividadeAula.query.filter_by(atividade_id=atividade.id).delete(synchronize_session=False)
+    delete_atividade_stats(int(atividade.id))
     db.session.delete(atividade)
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     return redirect(
         url_for(
@@ -1143,7 +1255,9 @@ def turma_editar_atividade(turma_id: int, atividade_id: int):
 
     atividade.titulo = titulo
     atividade.descricao = descricao
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     return redirect(
         url_for(
@@ -1160,63 +1274,63 @@ def turma_editar_atividade(turma_id: int, atividade_id: int):
 @pages_bp.post("/turmas/<int:turma_id>/atividades/<int:atividade_id>/lancamentos/<int:aula_num>")
 @login_required
 def turma_salvar_lancamentos(turma_id: int, atividade_id: int, aula_num: int):
+    fragment = _wants_fragment()
     turma = Turma.query.filter_by(id=turma_id, professor_id=int(current_user.id)).first()
     if turma is None:
-        return redirect(url_for("pages.turmas"))
+        return ("", 404) if fragment else redirect(url_for("pages.turmas"))
 
     atividade = Atividade.query.filter_by(id=atividade_id, turma_id=turma.id).first()
     if atividade is None:
-        return redirect(url_for("pages.turma_detail", turma_id=turma_id))
+        return ("", 404) if fragment else redirect(url_for("pages.turma_detail", turma_id=turma_id))
 
     trimestre = max(1, min(MAX_TRIMESTRE, _safe_int(request.form.get("trimestre"), atividade.trimestre or 1)))
     aula = AtividadeAula.query.filter_by(atividade_id=atividade.id, numero=aula_num).first()
     if aula is None:
+        if fragment:
+            return "", 404
         return redirect(url_for("pages.turma_detail", turma_id=turma_id, trimestre=trimestre, atividade_id=atividade.id))
 
-    alunos = Aluno.query.filter_by(turma_id=turma.id).all()
+    # Só alunos ativos aparecem no formulário; os demais (transferidos) não são tocados.
+    alunos = _alunos_ativos(turma.id)
+    entradas: dict[int, LancamentoEntrada | None] = {}
     for aluno in alunos:
-        nota_str = (request.form.get(f"nota_{aluno.id}") or "").strip()
         atestado_checked = (request.form.get(f"atestado_{aluno.id}") or "").strip().lower() in {"1", "true", "on", "yes"}
-        obs_str = (request.form.get(f"obs_{aluno.id}") or "").strip()
-
-        atestado = bool(atestado_checked)
-        nota = None
-        if nota_str != "":
-            if nota_str.strip().upper() == "A":
-                atestado = True
-                nota = None
-            elif not atestado:
-                try:
-                    nota_val = float(nota_str.replace(",", "."))
-                    nota = max(0.0, min(10.0, nota_val))
-                except ValueError:
-                    return redirect(
-                        url_for(
-                            "pages.turma_detail",
-                            turma_id=turma_id,
-                            tab="atividades",
-                            trimestre=trimestre,
-                            atividade_id=atividade.id,
-                            aula=aula_num,
-                            error="Valor inválido em nota. Use 0–10 ou 'A' (atestado).",
-                        )
-                    )
-
-        lanc = LancamentoAulaAluno.query.filter_by(aula_id=aula.id, aluno_id=aluno.id).first()
-        has_any_value = bool(atestado) or (nota is not None) or (obs_str != "")
-        if not has_any_value:
-            if lanc is not None:
-                db.session.delete(lanc)
-            continue
-
-        if lanc is None:
-            lanc = LancamentoAulaAluno(aula_id=aula.id, aluno_id=aluno.id)
-            db.session.add(lanc)
-        lanc.nota = nota
-        lanc.atestado = atestado
-        lanc.observacao = obs_str or None
+        try:
+            entradas[int(aluno.id)] = parse_lancamento(
+                request.form.get(f"nota_{aluno.id}") or "", atestado_checked, request.form.get(f"obs_{aluno.id}") or ""
+            )
+        except ValueError as exc:
+            if fragment:
+                return str(exc), 400
+            return redirect(
+                url_for(
+                    "pages.turma_detail",
+                    turma_id=turma_id,
+                    tab="atividades",
+                    trimestre=trimestre,
+                    atividade_id=atividade.id,
+                    aula=aula_num,
+                    error=str(exc),
+                )
+            )
 
+    save_aula_lancamentos(
+        turma_id=int(turma.id),
+        atividade_id=int(atividade.id),
+        aula_id=int(aula.id),
+        professor_id=int(current_user.id),
+        entradas=entradas,
+    )
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
+
+    if fragment:
+        return render_template(
+            "partials/turma_detail/medias.html",
+            alunos=alunos,
+            medias_by_aluno=_medias_atividade(turma=turma, alunos=alunos, atividade=atividade, today=date.today()),
+        )
 
     return redirect(
         url_for(
@@ -1230,6 +1344,280 @@ def turma_salvar_lancamentos(turma_id: int, atividade_id: int, aula_num: int):
     )
 
 
+@pages_bp.post("/turmas/<int:turma_id>/atividades/<int:atividade_id>/lancamentos/<int:aula_num>/coluna")
+@login_required
+def turma_coluna_lancamentos(turma_id: int, atividade_id: int, aula_num: int):
+    """Preenche, limpa ou copia de outra aula a coluna inteira da aula, para os alunos ativos."""
+    turma = Turma.query.filter_by(id=turma_id, professor_id=int(current_user.id)).first()
+    if turma is None:
+        return redirect(url_for("pages.turmas"))
+    atividade = Atividade.query.filter_by(id=atividade_id, turma_id=turma.id).first()
+    if atividade is None:
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id))
+
+    trimestre = max(1, min(MAX_TRIMESTRE, _safe_int(request.form.get("trimestre"), atividade.trimestre or 1)))
+    aulas_by_num = {int(a.numero): a for a in _aulas_da_atividade(atividade.id)}
+    aula = aulas_by_num.get(aula_num)
+    if aula is None:
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id, trimestre=trimestre, atividade_id=atividade.id))
+
+    def voltar(**extra):
+        return redirect(
+            url_for(
+                "pages.turma_detail",
+                turma_id=turma_id,
+                tab="atividades",
+                trimestre=trimestre,
+                atividade_id=atividade.id,
+                aula=aula_num,
+                **extra,
+            )
+        )
+
+    operacao = (request.form.get("operacao") or "").strip().lower()
+    valor: tuple[float | None, bool] | None = None
+    origem = None
+    if operacao == "preencher":
+        try:
+            entrada = parse_lancamento(request.form.get("valor") or "", False, "")
+        except ValueError as exc:
+            return voltar(error=str(exc))
+        if entrada is None:
+            return voltar(error="Informe a nota (ou A para atestado) para preencher a coluna.")
+        valor = (entrada[0], entrada[1])
+    elif operacao == "copiar":
+        origem = aulas_by_num.get(_safe_int(request.form.get("origem"), 0))
+        if origem is None or origem.id == aula.id:
+            return voltar(error="Escolha outra aula desta atividade para copiar.")
+    elif operacao != "limpar":
+        return voltar(error="Operação inválida.")
+
+    try:
+        alteradas = operar_coluna(
+            turma_id=int(turma.id),
+            atividade_id=int(atividade.id),
+            aula_id=int(aula.id),
+            professor_id=int(current_user.id),
+            operacao=operacao,
+            valor=valor,
+            apenas_vazias=(request.form.get("apenas_vazias") or "").strip().lower() in {"1", "true", "on", "yes"},
+            origem_aula_id=int(origem.id) if origem is not None else None,
+        )
+    except TrimestreFechado as exc:
+        db.session.rollback()
+        return voltar(error=str(exc))
+    if alteradas:
+        bump_data_version(turma.id)
+        db.session.commit()
+        _invalidate_dashboard(int(current_user.id))
+    else:
+        db.session.rollback()
+    return voltar()
+
+
+def _celula_texto(lanc: LancamentoAulaAluno | None) -> str:
+    """Valor de uma célula da grade: "A" para atestado, a nota sem zeros à direita ou vazio."""
+    if lanc is None:
+        return ""
+    if lanc.atestado:
+        return "A"
+    if lanc.nota is None:
+        return ""
+    return ("%.2f" % lanc.nota).rstrip("0").rstrip(".")
+
+
+def _render_matriz(
+    *,
+    turma: Turma,
+    atividade: Atividade,
+    alunos: list[Aluno],
+    aulas: list[AtividadeAula],
+    enviados: dict[tuple[int, int], str] | None = None,
+    invalidas: set[tuple[int, int]] | None = None,
+    error: str = "",
+    status: int = 200,
+):
+    lancamentos = (
+        LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_([a.id for a in aulas])).all() if aulas else []
+    )
+    lancamentos_by_celula = {(int(l.aula_id), int(l.aluno_id)): l for l in lancamentos}
+    celulas = {
+        (int(aula.id), int(aluno.id)): _celula_texto(lancamentos_by_celula.get((int(aula.id), int(aluno.id))))
+        for aula in aulas
+        for aluno in alunos
+    }
+    celulas.update(enviados or {})
+    html = render_template(
+        "pages/atividade_matriz.html",
+        turma=turma,
+        atividade=atividade,
+        alunos=alunos,
+        aulas=aulas,
+        celulas=celulas,
+        observacoes={k: l.observacao for k, l in lancamentos_by_celula.items() if l.observacao},
+        invalidas=invalidas or set(),
+        medias_by_aluno=_medias_atividade(turma=turma, alunos=alunos, atividade=atividade, today=date.today()),
+        current_trimestre=max(1, min(MAX_TRIMESTRE, int(atividade.trimestre or 1))),
+        error=error,
+        gravados=_safe_int(request.args.get("gravados"), -1),
+        apagados=_safe_int(request.args.get("apagados"), 0),
+    )
+    return html, status
+
+
+@pages_bp.get("/turmas/<int:turma_id>/atividades/<int:atividade_id>/matriz")
+@login_required
+def turma_atividade_matriz(turma_id: int, atividade_id: int):
+    """Grade aluno × aula de uma atividade, para lançar (ou revisar) todas as aulas de uma vez."""
+    versoes = _turmas_versao(int(current_user.id))
+    if turma_id not in versoes:
+        return redirect(url_for("pages.turmas"))
+    etag = _page_etag(sorted(versoes.items()))
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    turma = db.session.get(Turma, turma_id)
+    atividade = Atividade.query.filter_by(id=atividade_id, turma_id=turma.id).first()
+    if atividade is None:
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id, tab="atividades"))
+    return _with_etag(
+        _render_matriz(
+            turma=turma,
+            atividade=atividade,
+            alunos=_alunos_ativos(turma.id),
+            aulas=_aulas_da_atividade(atividade.id),
+        ),
+        etag,
+    )
+
+
+@pages_bp.post("/turmas/<int:turma_id>/atividades/<int:atividade_id>/matriz")
+@login_required
+def turma_salvar_matriz(turma_id: int, atividade_id: int):
+    """Valida a grade inteira antes de gravar; com erro, devolve a grade com o que foi digitado (400)."""
+    turma = Turma.query.filter_by(id=turma_id, professor_id=int(current_user.id)).first()
+    if turma is None:
+        return redirect(url_for("pages.turmas"))
+    atividade = Atividade.query.filter_by(id=atividade_id, turma_id=turma.id).first()
+    if atividade is None:
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id, tab="atividades"))
+
+    alunos = _alunos_ativos(turma.id)
+    aulas = _aulas_da_atividade(atividade.id)
+    enviados: dict[tuple[int, int], str] = {}
+    notas: dict[tuple[int, int], tuple[float | None, bool] | None] = {}
+    invalidas: list[tuple[int, int]] = []
+    for aula in aulas:
+        for aluno in alunos:
+            raw = request.form.get(f"c_{aula.id}_{aluno.id}")
+            if raw is None:
+                continue
+            celula = (int(aula.id), int(aluno.id))
+            enviados[celula] = raw.strip()
+            try:
+                entrada = parse_lancamento(raw, False, "")
+            except ValueError:
+                invalidas.append(celula)
+                continue
+            notas[celula] = (entrada[0], entrada[1]) if entrada is not None else None
+
+    if invalidas:
+        nomes = {int(a.id): a.nome_completo for a in alunos}
+        numeros = {int(a.id): int(a.numero) for a in aulas}
+        onde = ", ".join(f"{nomes[aluno_id]} (aula {numeros[aula_id]})" for aula_id, aluno_id in invalidas[:5])
+        if len(invalidas) > 5:
+            onde += f" e mais {len(invalidas) - 5}"
+        return _render_matriz(
+            turma=turma,
+            atividade=atividade,
+            alunos=alunos,
+            aulas=aulas,
+            enviados=enviados,
+            invalidas=set(invalidas),
+            error=f"{NOTA_INVALIDA} Nada foi salvo. Verifique: {onde}.",
+            status=400,
+        )
+
+    gravados, apagados = save_atividade_notas(
+        turma_id=int(turma.id), atividade_id=int(atividade.id), professor_id=int(current_user.id), notas=notas
+    )
+    if gravados or apagados:
+        bump_data_version(turma.id)
+        db.session.commit()
+        _invalidate_dashboard(int(current_user.id))
+    return redirect(
+        url_for(
+            "pages.turma_atividade_matriz",
+            turma_id=turma.id,
+            atividade_id=atividade.id,
+            gravados=gravados,
+            apagados=apagados,
+        )
+    )
+
+
+def _render_historico(*, turma: Turma, titulo: str, aluno_id: int | None = None, aula_id: int | None = None):
+    page = max(1, _safe_int(request.args.get("page"), 1))
+    linhas, total = historico_paginado(turma_id=int(turma.id), aluno_id=aluno_id, aula_id=aula_id, page=page)
+    pages_total = max(1, math.ceil(total / HISTORICO_PER_PAGE))
+    return render_template(
+        "pages/lancamento_historico.html",
+        turma=turma,
+        titulo=titulo,
+        linhas=linhas,
+        total=total,
+        page=page,
+        pages_total=pages_total,
+        por_aluno=aluno_id is not None,
+    )
+
+
+@pages_bp.get("/turmas/<int:turma_id>/alunos/<int:aluno_id>/historico")
+@login_required
+def turma_aluno_historico(turma_id: int, aluno_id: int):
+    """Mudanças de nota/atestado de um aluno na turma, da mais recente para a mais antiga."""
+    versoes = _turmas_versao(int(current_user.id))
+    if turma_id not in versoes:
+        return redirect(url_for("pages.turmas"))
+    etag = _page_etag(versoes[turma_id])
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    turma = db.session.get(Turma, turma_id)
+    aluno = Aluno.query.filter_by(id=aluno_id, turma_id=turma.id).first()
+    if aluno is None:
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id))
+    return _with_etag(_render_historico(turma=turma, titulo=aluno.nome_completo, aluno_id=int(aluno.id)), etag)
+
+
+@pages_bp.get("/turmas/<int:turma_id>/aulas/<int:aula_id>/historico")
+@login_required
+def turma_aula_historico(turma_id: int, aula_id: int):
+    """Mudanças de nota/atestado de uma aula, da mais recente para a mais antiga."""
+    versoes = _turmas_versao(int(current_user.id))
+    if turma_id not in versoes:
+        return redirect(url_for("pages.turmas"))
+    etag = _page_etag(versoes[turma_id])
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    row = (
+        db.session.query(AtividadeAula.id, AtividadeAula.numero, Atividade.titulo)
+        .join(Atividade, AtividadeAula.atividade_id == Atividade.id)
+        .filter(AtividadeAula.id == aula_id, Atividade.turma_id == turma_id)
+        .first()
+    )
+    if row is None:
+        return redirect(url_for("pages.turma_detail", turma_id=turma_id, tab="atividades"))
+    turma = db.session.get(Turma, turma_id)
+    return _with_etag(
+        _render_historico(turma=turma, titulo=f"{row.titulo} — Aula {row.numero}", aula_id=int(row.id)), etag
+    )
+
+
 @pages_bp.post("/turmas/<int:turma_id>/importar-alunos-pdf")
 @login_required
 def turma_importar_alunos_pdf(turma_id: int):
@@ -1272,18 +1660,12 @@ def turma_importar_alunos_pdf(turma_id: int):
         except OSError:
             pass
 
-    def _norm_text(value: str) -> str:
-        normalized = unicodedata.normalize("NFKD", value)
-        normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
-        normalized = re.sub(r"\s+", " ", normalized).strip().lower()
-        return normalized
-
     # Build roster maps for sync import (add/reactivate/mark removed).
     alunos_turma = Aluno.query.filter_by(turma_id=turma_id).all()
     ativos_by_name: dict[str, Aluno] = {}
     inativos_by_name: dict[str, list[Aluno]] = {}
     for aluno in alunos_turma:
-        name_key = _norm_text(aluno.nome_completo or "")
+        name_key = norm_text(aluno.nome_completo or "")
         if not name_key:
             continue
         if aluno.status == "ativo":
@@ -1305,7 +1687,7 @@ def turma_importar_alunos_pdf(turma_id: int):
     )
     estudante_id_by_name: dict[str, int] = {}
     for aluno in other_alunos:
-        name_key = _norm_text(aluno.nome_completo or "")
+        name_key = norm_text(aluno.nome_completo or "")
         if not name_key or aluno.estudante_id is None:
             continue
         estudante_id_by_name.setdefault(name_key, int(aluno.estudante_id))
@@ -1315,7 +1697,7 @@ def turma_importar_alunos_pdf(turma_id: int):
     moved_out = 0
     imported_names: set[str] = set()
     for idx, s in enumerate(students, start=1):
-        name_key = _norm_text(s.nome or "")
+        name_key = norm_text(s.nome or "")
         if not name_key:
             continue
         imported_names.add(name_key)
@@ -1365,31 +1747,34 @@ def turma_importar_alunos_pdf(turma_id: int):
             aluno.status = "inativo"
             moved_out += 1
 
+    refresh_roster_stats(int(turma.id))
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     # Basic mismatch check (only if we could parse turma info from PDF)
     mismatch_fields: list[str] = []
-    if info.serie and turma.serie and _norm_text(info.serie) != _norm_text(turma.serie):
+    if info.serie and turma.serie and norm_text(info.serie) != norm_text(turma.serie):
         mismatch_fields.append("serie")
-    if info.turma_letra and turma.turma_letra and _norm_text(info.turma_letra) != _norm_text(turma.turma_letra):
+    if info.turma_letra and turma.turma_letra and norm_text(info.turma_letra) != norm_text(turma.turma_letra):
         mismatch_fields.append("turma")
     if info.periodo:
         horarios_periodos = {
-            _norm_text(h.periodo)
+            norm_text(h.periodo)
             for h in TurmaHorario.query.filter_by(turma_id=turma_id).all()
             if h.periodo
         }
-        periodo_pdf = _norm_text(info.periodo)
+        periodo_pdf = norm_text(info.periodo)
         if horarios_periodos:
             if periodo_pdf not in horarios_periodos:
                 mismatch_fields.append("periodo")
-        elif turma.periodo and periodo_pdf != _norm_text(turma.periodo):
+        elif turma.periodo and periodo_pdf != norm_text(turma.periodo):
             mismatch_fields.append("periodo")
     if info.ano_letivo and turma.ano_letivo and info.ano_letivo != turma.ano_letivo:
         mismatch_fields.append("ano_letivo")
     if info.disciplina and turma.disciplina:
-        disciplina_pdf = _norm_text(info.disciplina).removesuffix("s")
-        disciplina_db = _norm_text(turma.disciplina).removesuffix("s")
+        disciplina_pdf = norm_text(info.disciplina).removesuffix("s")
+        disciplina_db = norm_text(turma.disciplina).removesuffix("s")
         if disciplina_pdf != disciplina_db:
             mismatch_fields.append("disciplina")
 
@@ -1470,28 +1855,16 @@ def _build_fechamento_snapshots(*, turma: Turma, trimestre: int) -> int:
     if not alunos:
         return 0
 
-    estudante_ids = [int(a.estudante_id) for a in alunos if a.estudante_id is not None]
-    other_snapshot_rows = (
-        FechamentoTrimestreAluno.query.filter(
-            FechamentoTrimestreAluno.ano_letivo == ano_letivo,
-            FechamentoTrimestreAluno.trimestre == trimestre,
-            FechamentoTrimestreAluno.estudante_id.in_(estudante_ids),
-            FechamentoTrimestreAluno.turma_id != int(turma.id),
-        ).all()
-        if estudante_ids
-        else []
-    )
-    # Best snapshot per estudante (used for transferred students)
-    other_best_by_estudante: dict[int, FechamentoTrimestreAluno] = {}
-    for r in other_snapshot_rows:
-        sid = int(r.estudante_id)
-        current = other_best_by_estudante.get(sid)
-        if current is None:
-            other_best_by_estudante[sid] = r
-            continue
-        if getattr(r, "created_at", None) and getattr(current, "created_at", None):
-            if r.created_at > current.created_at:
-                other_best_by_estudante[sid] = r
+    # Best snapshot per estudante from other turmas (used for transferred students)
+    other_best_by_estudante: dict[int, FechamentoTrimestreAluno] = {
+        estudante_id: row
+        for (estudante_id, _), row in best_snapshots(
+            ano_letivo=ano_letivo,
+            estudante_ids=[int(a.estudante_id) for a in alunos if a.estudante_id is not None],
+            exclude_turma_id=int(turma.id),
+            trimestre=trimestre,
+        ).items()
+    }
 
     atividades = Atividade.query.filter_by(turma_id=turma.id, trimestre=trimestre).all()
     if not atividades:
@@ -1542,42 +1915,8 @@ def _build_fechamento_snapshots(*, turma: Turma, trimestre: int) -> int:
         db.session.flush()
         return len([a for a in alunos if a.estudante_id is not None])
 
-    atividade_ids = [a.id for a in atividades]
-    aulas = AtividadeAula.query.filter(AtividadeAula.atividade_id.in_(atividade_ids)).all()
-    aulas_ids = [int(a.id) for a in aulas]
-    iniciadas_ids = _aulas_iniciadas_ids(aulas_ids=aulas_ids, today=today)
-    eligible_aulas = [a for a in aulas if int(a.id) in iniciadas_ids]
-
-    aula_to_atividade: dict[int, int] = {int(a.id): int(a.atividade_id) for a in eligible_aulas}
-    eligible_aulas_count_by_atividade: dict[int, int] = {}
-    for a in eligible_aulas:
-        eligible_aulas_count_by_atividade[int(a.atividade_id)] = eligible_aulas_count_by_atividade.get(int(a.atividade_id), 0) + 1
-
-    aula_ids = [a.id for a in eligible_aulas]
-    lancamentos = (
-        LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_(aula_ids)).all()
-        if aula_ids
-        else []
-    )
-
-    sum_by_atividade_aluno: dict[tuple[int, int], float] = {}
-    atestado_by_atividade_aluno: dict[tuple[int, int], int] = {}
-    avaliadas_by_aluno: dict[int, int] = {}
-
-    for l in lancamentos:
-        atividade_id = aula_to_atividade.get(int(l.aula_id))
-        if atividade_id is None:
-            continue
-        key = (atividade_id, int(l.aluno_id))
-        if l.atestado:
-            atestado_by_atividade_aluno[key] = atestado_by_atividade_aluno.get(key, 0) + 1
-            continue
-        if l.nota is None:
-            continue
-        sum_by_atividade_aluno[key] = sum_by_atividade_aluno.get(key, 0.0) + float(l.nota)
-        avaliadas_by_aluno[int(l.aluno_id)] = avaliadas_by_aluno.get(int(l.aluno_id), 0) + 1
-
-    peso_by_atividade: dict[int, float] = {int(a.id): float(a.peso or 1) for a in atividades}
+    book = gradebook_from_lancamentos(aluno_ids=[int(a.id) for a in alunos], atividades=atividades, today=today)
+    resultados = book.resultados_trimestre(trimestre)
 
     snapshots = 0
     for aluno in alunos:
@@ -1617,33 +1956,11 @@ def _build_fechamento_snapshots(*, turma: Turma, trimestre: int) -> int:
             snapshots += 1
             continue
 
-        tri_sum = 0.0
-        tri_peso = 0.0
-        total_previstas = 0
-        total_pontos = 0.0
-
-        for atv in atividades:
-            eligible_cnt = int(eligible_aulas_count_by_atividade.get(int(atv.id), 0))
-            if eligible_cnt <= 0:
-                continue
-            atestados_cnt = int(atestado_by_atividade_aluno.get((int(atv.id), int(aluno.id)), 0))
-            denom = max(0, eligible_cnt - atestados_cnt)
-            if denom <= 0:
-                continue
-
-            total_previstas += denom
-
-            sum_notas = float(sum_by_atividade_aluno.get((int(atv.id), int(aluno.id)), 0.0))
-            total_pontos += sum_notas
-
-            media_atv = sum_notas / float(denom)
-            peso = float(peso_by_atividade.get(int(atv.id), 1.0))
-            tri_sum += media_atv * peso
-            tri_peso += peso
-
-        media_final = round(tri_sum / tri_peso, 2) if tri_peso > 0 else None
-        total_pontos_val = round(total_pontos, 2) if total_previstas > 0 else None
-        avaliadas = int(avaliadas_by_aluno.get(int(aluno.id), 0))
+        resultado = resultados[int(aluno.id)]
+        media_final = resultado.media
+        total_pontos_val = resultado.total_pontos
+        avaliadas = resultado.avaliadas
+        total_previstas = resultado.total_previstas
 
         existing = FechamentoTrimestreAluno.query.filter_by(
             turma_id=turma.id, estudante_id=aluno.estudante_id, ano_letivo=ano_letivo, trimestre=trimestre
@@ -1724,7 +2041,9 @@ def fechamento_fechar():
     if int(turma.trimestre_atual or 1) == int(trimestre):
         turma.trimestre_atual = min(MAX_TRIMESTRE, int(trimestre) + 1)
 
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     if (request.form.get("return_to") or "").strip() == "turma_detail":
         return redirect(url_for("pages.turma_detail", turma_id=turma.id, tab="detalhes", trimestre=trimestre))
@@ -1750,7 +2069,9 @@ def fechamento_reabrir():
 
     rec.status = "aberto"
     rec.reaberto_em = datetime.utcnow()
+    bump_data_version(turma.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     if (request.form.get("return_to") or "").strip() == "turma_detail":
         return redirect(url_for("pages.turma_detail", turma_id=turma.id, tab="detalhes", trimestre=trimestre))
@@ -1871,7 +2192,11 @@ def turma_transferir_aluno(turma_id: int):
             created_at=datetime.utcnow(),
         )
     )
+    refresh_roster_stats(int(turma_origem.id))
+    refresh_roster_stats(int(turma_destino.id))
+    bump_data_version(turma_origem.id, turma_destino.id)
     db.session.commit()
+    _invalidate_dashboard(int(current_user.id))
 
     return redirect(
         url_for(
@@ -1933,16 +2258,6 @@ def horario():
     dias_cols = [(0, "SEG"), (1, "TER"), (2, "QUAR"), (3, "QUI"), (4, "SEX")]
     periods = ["Manhã", "Tarde", "Noite"]
 
-    turma_rows = (
-        db.session.query(TurmaHorario.dia_semana, TurmaHorario.hora, TurmaHorario.periodo, Turma.nome, Turma.id)
-        .join(Turma, TurmaHorario.turma_id == Turma.id)
-        .filter(Turma.professor_id == professor_id)
-        .filter(Turma.ano_letivo == ano_letivo)
-        .filter(TurmaHorario.dia_semana.in_([d for d, _ in dias_cols]))
-        .order_by(TurmaHorario.periodo.asc(), TurmaHorario.hora.asc(), TurmaHorario.dia_semana.asc(), Turma.nome.asc())
-        .all()
-    )
-
     evento_rows = (
         db.session.query(
             HorarioEvento.dia_semana,
@@ -1957,6 +2272,24 @@ def horario():
         .order_by(HorarioEvento.periodo.asc(), HorarioEvento.hora.asc(), HorarioEvento.dia_semana.asc())
         .all()
     )
+    # Os eventos exibidos entram inteiros no ETag: são poucos e já seriam lidos, e (quantidade, maior id)
+    # se repete quando o SQLite reaproveita o id de um evento apagado.
+    etag = _page_etag(
+        ano_letivo, sorted(_turmas_versao(professor_id).items()), [tuple(row) for row in evento_rows]
+    )
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    turma_rows = (
+        db.session.query(TurmaHorario.dia_semana, TurmaHorario.hora, TurmaHorario.periodo, Turma.nome, Turma.id)
+        .join(Turma, TurmaHorario.turma_id == Turma.id)
+        .filter(Turma.professor_id == professor_id)
+        .filter(Turma.ano_letivo == ano_letivo)
+        .filter(TurmaHorario.dia_semana.in_([d for d, _ in dias_cols]))
+        .order_by(TurmaHorario.periodo.asc(), TurmaHorario.hora.asc(), TurmaHorario.dia_semana.asc(), Turma.nome.asc())
+        .all()
+    )
 
     grade: dict[str, dict[str, dict[int, list[dict]]]] = {p: {} for p in periods}
     for dia_semana, hora, periodo, nome, turma_id in turma_rows:
@@ -1996,13 +2329,16 @@ def horario():
     for p in periods:
         times_by_period[p] = sorted(grade.get(p, {}).keys())
 
-    return render_template(
-        "pages/horario.html",
-        selected_ano_letivo=ano_letivo,
-        dias_cols=dias_cols,
-        periods=periods,
-        grade=grade,
-        times_by_period=times_by_period,
+    return _with_etag(
+        render_template(
+            "pages/horario.html",
+            selected_ano_letivo=ano_letivo,
+            dias_cols=dias_cols,
+            periods=periods,
+            grade=grade,
+            times_by_period=times_by_period,
+        ),
+        etag,
     )
 
 
@@ -2028,7 +2364,7 @@ def horario_evento_create():
     if dia not in set(range(0, 7)):
         return redirect(url_for("pages.horario"))
 
-    if not re.match(r"^([01]\d|2[0-3]):[0-5]\d$", hora):
+    if not TIME_PATTERN.match(hora):
         return redirect(url_for("pages.horario"))
 
     existing = HorarioEvento.query.filter_by(
@@ -2065,9 +2401,17 @@ def horario_evento_delete(evento_id: int):
 @pages_bp.get("/turmas/<int:turma_id>/diario")
 @login_required
 def turma_diario(turma_id: int):
-    turma = Turma.query.filter_by(id=turma_id, professor_id=int(current_user.id)).first()
-    if turma is None:
+    data_version = (
+        db.session.query(Turma.data_version).filter_by(id=turma_id, professor_id=int(current_user.id)).scalar()
+    )
+    if data_version is None:
         return redirect(url_for("pages.turmas"))
+    etag = _page_etag(turma_id, data_version)
+    not_modified = _not_modified(etag)
+    if not_modified is not None:
+        return not_modified
+
+    turma = db.session.get(Turma, turma_id)
 
     hoje = date.today()
 
@@ -2178,24 +2522,27 @@ def turma_diario(turma_id: int):
     ]
     mes_label = f"{mes_nomes[mes_numero - 1].capitalize()} {mes_ano}"
 
-    return render_template(
-        "pages/diario.html",
-        turma=turma,
-        hoje=hoje,
-        anotacao_hoje=anotacao_hoje,
-        mes_atual_str=f"{mes_ano:04d}-{mes_numero:02d}",
-        mes_ano=mes_ano,
-        mes_numero=mes_numero,
-        mes_label=mes_label,
-        dia_selecionado=dia_selecionado,
-        anotacoes_dia_selecionado=anotacoes_dia_selecionado,
-        contagens_mes=contagens_mes,
-        cal_weeks=cal_weeks,
-        weekday_labels=weekday_labels,
-        prev_mes_str=prev_mes_str,
-        next_mes_str=next_mes_str,
-        prev_dia_str=prev_dia.isoformat(),
-        next_dia_str=next_dia.isoformat(),
+    return _with_etag(
+        render_template(
+            "pages/diario.html",
+            turma=turma,
+            hoje=hoje,
+            anotacao_hoje=anotacao_hoje,
+            mes_atual_str=f"{mes_ano:04d}-{mes_numero:02d}",
+            mes_ano=mes_ano,
+            mes_numero=mes_numero,
+            mes_label=mes_label,
+            dia_selecionado=dia_selecionado,
+            anotacoes_dia_selecionado=anotacoes_dia_selecionado,
+            contagens_mes=contagens_mes,
+            cal_weeks=cal_weeks,
+            weekday_labels=weekday_labels,
+            prev_mes_str=prev_mes_str,
+            next_mes_str=next_mes_str,
+            prev_dia_str=prev_dia.isoformat(),
+            next_dia_str=next_dia.isoformat(),
+        ),
+        etag,
     )
 
 
@@ -2252,6 +2599,7 @@ def turma_diario_salvar(turma_id: int):
             )
         )
 
+    bump_data_version(turma.id)
     db.session.commit()
 
     return redirect(url_for("pages.turma_diario", turma_id=turma.id))
@@ -2272,6 +2620,7 @@ def turma_diario_excluir(turma_id: int, anotacao_id: int):
 
     if anotacao:
         db.session.delete(anotacao)
+        bump_data_version(turma.id)
         db.session.commit()
 
     return redirect(url_for("pages.turma_diario", turma_id=turma.id))
@@ -0,0 +1,111 @@
+"""add turma stats (materialized dashboard counters)
+
+Revision ID: a41c7e9d2b10
+Revises: 68b63e003575
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a41c7e9d2b10"
+down_revision = "68b63e003575"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "turma_stats",
+        sa.Column("turma_id", sa.Integer(), nullable=False),
+        sa.Column("alunos_count", sa.Integer(), nullable=False),
+        sa.Column("alunos_ativos_count", sa.Integer(), nullable=False),
+        sa.Column("notas_sum", sa.Float(), nullable=False),
+        sa.Column("notas_count", sa.Integer(), nullable=False),
+        sa.Column("atestados_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["turma_id"], ["turma.id"]),
+        sa.PrimaryKeyConstraint("turma_id"),
+    )
+    op.create_table(
+        "atividade_aluno_stats",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("atividade_id", sa.Integer(), nullable=False),
+        sa.Column("aluno_id", sa.Integer(), nullable=False),
+        sa.Column("turma_id", sa.Integer(), nullable=False),
+        sa.Column("notas_sum", sa.Float(), nullable=False),
+        sa.Column("notas_count", sa.Integer(), nullable=False),
+        sa.Column("atestados_count", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["aluno_id"], ["aluno.id"]),
+        sa.ForeignKeyConstraint(["atividade_id"], ["atividade.id"]),
+        sa.ForeignKeyConstraint(["turma_id"], ["turma.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("atividade_id", "aluno_id", name="uq_atividade_aluno_stats"),
+    )
+    with op.batch_alter_table("atividade_aluno_stats", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_atividade_aluno_stats_atividade_id"), ["atividade_id"], unique=False)
+        batch_op.create_index(batch_op.f("ix_atividade_aluno_stats_aluno_id"), ["aluno_id"], unique=False)
+        batch_op.create_index(batch_op.f("ix_atividade_aluno_stats_turma_id"), ["turma_id"], unique=False)
+
+    # Backfill a partir dos lançamentos existentes (lançamento com atestado não soma nota).
+    op.execute(
+        """
+        INSERT INTO atividade_aluno_stats
+            (atividade_id, aluno_id, turma_id, notas_sum, notas_count, atestados_count, updated_at)
+        SELECT aa.atividade_id,
+               l.aluno_id,
+               a.turma_id,
+               COALESCE(SUM(CASE WHEN l.atestado THEN NULL ELSE l.nota END), 0),
+               COUNT(CASE WHEN l.atestado THEN NULL ELSE l.nota END),
+               SUM(CASE WHEN l.atestado THEN 1 ELSE 0 END),
+               CURRENT_TIMESTAMP
+        FROM lancamento_aula_aluno l
+        JOIN atividade_aula aa ON aa.id = l.aula_id
+        JOIN atividade a ON a.id = aa.atividade_id
+        GROUP BY aa.atividade_id, l.aluno_id, a.turma_id
+        """
+    )
+    op.execute(
+        """
+        INSERT INTO turma_stats
+            (turma_id, alunos_count, alunos_ativos_count, notas_sum, notas_count, atestados_count, updated_at)
+        SELECT t.id,
+               COALESCE(r.total, 0),
+               COALESCE(r.ativos, 0),
+               COALESCE(s.notas_sum, 0),
+               COALESCE(s.notas_count, 0),
+               COALESCE(s.atestados_count, 0),
+               CURRENT_TIMESTAMP
+        FROM turma t
+        LEFT JOIN (
+            SELECT turma_id,
+                   COUNT(id) AS total,
+                   SUM(CASE WHEN status = 'ativo' THEN 1 ELSE 0 END) AS ativos
+            FROM aluno
+            GROUP BY turma_id
+        ) r ON r.turma_id = t.id
+        LEFT JOIN (
+            SELECT turma_id,
+                   SUM(notas_sum) AS notas_sum,
+                   SUM(notas_count) AS notas_count,
+                   SUM(atestados_count) AS atestados_count
+            FROM atividade_aluno_stats
+            GROUP BY turma_id
+        ) s ON s.turma_id = t.id
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table("atividade_aluno_stats", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_atividade_aluno_stats_turma_id"))
+        batch_op.drop_index(batch_op.f("ix_atividade_aluno_stats_aluno_id"))
+        batch_op.drop_index(batch_op.f("ix_atividade_aluno_stats_atividade_id"))
+    op.drop_table("atividade_aluno_stats")
+    op.drop_table("turma_stats")
@@ -0,0 +1,52 @@
+"""backfill atividade_aula rows 1..aulas_planejadas for every atividade
+
+Revision ID: a8d3e6f0b152
+Revises: f2c8d5a19e47
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a8d3e6f0b152"
+down_revision = "f2c8d5a19e47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Antes as páginas criavam as aulas que faltavam ao abrir a atividade (escrevendo num GET);
+    # agora elas só leem, então toda atividade precisa já ter as aulas 1..aulas_planejadas.
+    bind = op.get_bind()
+    atividade = sa.table("atividade", sa.column("id", sa.Integer), sa.column("aulas_planejadas", sa.Integer))
+    atividade_aula = sa.table(
+        "atividade_aula",
+        sa.column("atividade_id", sa.Integer),
+        sa.column("numero", sa.Integer),
+        sa.column("created_at", sa.DateTime),
+    )
+
+    existentes: dict[int, set[int]] = {}
+    for atividade_id, numero in bind.execute(sa.select(atividade_aula.c.atividade_id, atividade_aula.c.numero)):
+        existentes.setdefault(int(atividade_id), set()).add(int(numero))
+
+    now = sa.func.current_timestamp()
+    faltando = []
+    for atividade_id, aulas_planejadas in bind.execute(sa.select(atividade.c.id, atividade.c.aulas_planejadas)):
+        numeros = existentes.get(int(atividade_id), set())
+        for n in range(1, max(1, int(aulas_planejadas or 1)) + 1):
+            if n not in numeros:
+                faltando.append({"atividade_id": int(atividade_id), "numero": n})
+
+    if faltando:
+        bind.execute(atividade_aula.insert().values(created_at=now), faltando)
+
+
+def downgrade():
+    # As aulas criadas são indistinguíveis das demais; nada a desfazer.
+    pass
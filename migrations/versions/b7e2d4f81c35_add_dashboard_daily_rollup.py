@@ -0,0 +1,58 @@
+"""add dashboard daily rollup
+
+Revision ID: b7e2d4f81c35
+Revises: a41c7e9d2b10
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b7e2d4f81c35"
+down_revision = "a41c7e9d2b10"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "dashboard_daily_rollup",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("professor_id", sa.Integer(), nullable=False),
+        sa.Column("turma_id", sa.Integer(), nullable=False),
+        sa.Column("ano_letivo", sa.Integer(), nullable=False),
+        sa.Column("alunos", sa.Integer(), nullable=False),
+        sa.Column("eligible_slots", sa.Integer(), nullable=False),
+        sa.Column("notas_count", sa.Integer(), nullable=False),
+        sa.Column("notas_sum", sa.Float(), nullable=False),
+        sa.Column("atestados_count", sa.Integer(), nullable=False),
+        sa.Column("pendentes", sa.Integer(), nullable=False),
+        sa.Column("media", sa.Float(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["professor_id"], ["professor.id"]),
+        sa.ForeignKeyConstraint(["turma_id"], ["turma.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("dia", "turma_id", name="uq_dashboard_rollup_dia_turma"),
+    )
+    with op.batch_alter_table("dashboard_daily_rollup", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_dashboard_daily_rollup_dia"), ["dia"], unique=False)
+        batch_op.create_index(batch_op.f("ix_dashboard_daily_rollup_professor_id"), ["professor_id"], unique=False)
+        batch_op.create_index(batch_op.f("ix_dashboard_daily_rollup_turma_id"), ["turma_id"], unique=False)
+        batch_op.create_index(
+            "ix_dashboard_rollup_professor_ano_dia", ["professor_id", "ano_letivo", "dia"], unique=False
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("dashboard_daily_rollup", schema=None) as batch_op:
+        batch_op.drop_index("ix_dashboard_rollup_professor_ano_dia")
+        batch_op.drop_index(batch_op.f("ix_dashboard_daily_rollup_turma_id"))
+        batch_op.drop_index(batch_op.f("ix_dashboard_daily_rollup_professor_id"))
+        batch_op.drop_index(batch_op.f("ix_dashboard_daily_rollup_dia"))
+    op.drop_table("dashboard_daily_rollup")
@@ -0,0 +1,57 @@
+"""add turma busca (normalized nome/disciplina for list search)
+
+Revision ID: c3f8a1d2e9b4
+Revises: b7e2d4f81c35
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c3f8a1d2e9b4"
+down_revision = "b7e2d4f81c35"
+branch_labels = None
+depends_on = None
+
+
+def _norm_text(value: str) -> str:
+    normalized = unicodedata.normalize("NFKD", value)
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", normalized).strip().lower()
+
+
+def upgrade():
+    with op.batch_alter_table("turma", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("busca", sa.String(length=255), nullable=True))
+        batch_op.create_index("ix_turma_professor_ano_letivo", ["professor_id", "ano_letivo"], unique=False)
+
+    # Backfill em Python: a remoção de acentos não é portável em SQL.
+    bind = op.get_bind()
+    turma = sa.table(
+        "turma",
+        sa.column("id", sa.Integer),
+        sa.column("nome", sa.String),
+        sa.column("disciplina", sa.String),
+        sa.column("busca", sa.String),
+    )
+    rows = bind.execute(sa.select(turma.c.id, turma.c.nome, turma.c.disciplina)).all()
+    for turma_id, nome, disciplina in rows:
+        bind.execute(
+            turma.update()
+            .where(turma.c.id == turma_id)
+            .values(busca=_norm_text(f"{nome or ''} {disciplina or ''}"))
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("turma", schema=None) as batch_op:
+        batch_op.drop_index("ix_turma_professor_ano_letivo")
+        batch_op.drop_column("busca")
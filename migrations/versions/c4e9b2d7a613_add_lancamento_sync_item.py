@@ -0,0 +1,41 @@
+"""add lancamento sync item
+
+Revision ID: c4e9b2d7a613
+Revises: a8d3e6f0b152
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c4e9b2d7a613"
+down_revision = "a8d3e6f0b152"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "lancamento_sync_item",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("professor_id", sa.Integer(), nullable=False),
+        sa.Column("chave", sa.String(length=64), nullable=False),
+        sa.Column("resultado", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["professor_id"], ["professor.id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("professor_id", "chave", name="uq_lancamento_sync_professor_chave"),
+    )
+    with op.batch_alter_table("lancamento_sync_item", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_lancamento_sync_item_created_at"), ["created_at"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("lancamento_sync_item", schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f("ix_lancamento_sync_item_created_at"))
+    op.drop_table("lancamento_sync_item")
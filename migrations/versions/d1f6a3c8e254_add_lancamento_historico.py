@@ -0,0 +1,50 @@
+"""add lancamento historico
+
+Revision ID: d1f6a3c8e254
+Revises: c4e9b2d7a613
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "d1f6a3c8e254"
+down_revision = "c4e9b2d7a613"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "lancamento_historico",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("turma_id", sa.Integer(), nullable=False),
+        sa.Column("aula_id", sa.Integer(), nullable=False),
+        sa.Column("aluno_id", sa.Integer(), nullable=False),
+        sa.Column("professor_id", sa.Integer(), nullable=False),
+        sa.Column("nota_antes", sa.Float(), nullable=True),
+        sa.Column("atestado_antes", sa.Boolean(), nullable=False),
+        sa.Column("nota_depois", sa.Float(), nullable=True),
+        sa.Column("atestado_depois", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["professor_id"], ["professor.id"]),
+        sa.ForeignKeyConstraint(["turma_id"], ["turma.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    with op.batch_alter_table("lancamento_historico", schema=None) as batch_op:
+        batch_op.create_index(batch_op.f("ix_lancamento_historico_turma_id"), ["turma_id"], unique=False)
+        batch_op.create_index("ix_lancamento_historico_aluno_id", ["aluno_id", "id"], unique=False)
+        batch_op.create_index("ix_lancamento_historico_aula_id", ["aula_id", "id"], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table("lancamento_historico", schema=None) as batch_op:
+        batch_op.drop_index("ix_lancamento_historico_aula_id")
+        batch_op.drop_index("ix_lancamento_historico_aluno_id")
+        batch_op.drop_index(batch_op.f("ix_lancamento_historico_turma_id"))
+    op.drop_table("lancamento_historico")
@@ -0,0 +1,186 @@
+"""add busca_fts (FTS5 global search index kept in sync by triggers)
+
+Revision ID: d9a4c2e71f05
+Revises: c3f8a1d2e9b4
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "d9a4c2e71f05"
+down_revision = "c3f8a1d2e9b4"
+branch_labels = None
+depends_on = None
+
+_TRIGGERS = [
+    "busca_aluno_ai",
+    "busca_aluno_au",
+    "busca_aluno_ad",
+    "busca_estudante_ai",
+    "busca_estudante_au",
+    "busca_estudante_ad",
+    "busca_turma_ai",
+    "busca_turma_au",
+    "busca_turma_ad",
+    "busca_atividade_ai",
+    "busca_atividade_au",
+    "busca_atividade_ad",
+    "busca_anotacao_ai",
+    "busca_anotacao_au",
+    "busca_anotacao_ad",
+]
+
+_DDL = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS busca_fts USING fts5(
+        texto,
+        tipo UNINDEXED,
+        ref_id UNINDEXED,
+        turma_id UNINDEXED,
+        professor_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    # aluno
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_aluno_ai AFTER INSERT ON aluno BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 1, new.nome_completo, 'aluno', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_aluno_au AFTER UPDATE OF nome_completo, turma_id ON aluno BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 1;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 1, new.nome_completo, 'aluno', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_aluno_ad AFTER DELETE ON aluno BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 1;
+    END
+    """,
+    # estudante (sem professor: o escopo vem dos alunos vinculados)
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_estudante_ai AFTER INSERT ON estudante BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 2, new.nome_completo, 'estudante', new.id, NULL, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_estudante_au AFTER UPDATE OF nome_completo ON estudante BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 2;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 2, new.nome_completo, 'estudante', new.id, NULL, NULL);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_estudante_ad AFTER DELETE ON estudante BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 2;
+    END
+    """,
+    # turma
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_turma_ai AFTER INSERT ON turma BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 3, new.nome, 'turma', new.id, new.id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_turma_au AFTER UPDATE OF nome, professor_id ON turma BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 3;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 3, new.nome, 'turma', new.id, new.id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_turma_ad AFTER DELETE ON turma BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 3;
+    END
+    """,
+    # atividade
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_atividade_ai AFTER INSERT ON atividade BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 4, new.titulo, 'atividade', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_atividade_au AFTER UPDATE OF titulo, turma_id ON atividade BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 4;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        SELECT new.id * 8 + 4, new.titulo, 'atividade', new.id, new.turma_id, t.professor_id
+        FROM turma t WHERE t.id = new.turma_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_atividade_ad AFTER DELETE ON atividade BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 4;
+    END
+    """,
+    # diario_anotacao
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_anotacao_ai AFTER INSERT ON diario_anotacao BEGIN
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 5, coalesce(new.titulo || ' ', '') || new.anotacao, 'anotacao', new.id,
+                new.turma_id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_anotacao_au
+    AFTER UPDATE OF titulo, anotacao, turma_id, professor_id ON diario_anotacao BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 5;
+        INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+        VALUES (new.id * 8 + 5, coalesce(new.titulo || ' ', '') || new.anotacao, 'anotacao', new.id,
+                new.turma_id, new.professor_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS busca_anotacao_ad AFTER DELETE ON diario_anotacao BEGIN
+        DELETE FROM busca_fts WHERE rowid = old.id * 8 + 5;
+    END
+    """,
+]
+
+
+_POPULATE = """
+    INSERT INTO busca_fts (rowid, texto, tipo, ref_id, turma_id, professor_id)
+    SELECT a.id * 8 + 1, a.nome_completo, 'aluno', a.id, a.turma_id, t.professor_id
+    FROM aluno a JOIN turma t ON t.id = a.turma_id
+    UNION ALL
+    SELECT e.id * 8 + 2, e.nome_completo, 'estudante', e.id, NULL, NULL FROM estudante e
+    UNION ALL
+    SELECT t.id * 8 + 3, t.nome, 'turma', t.id, t.id, t.professor_id FROM turma t
+    UNION ALL
+    SELECT at.id * 8 + 4, at.titulo, 'atividade', at.id, at.turma_id, t.professor_id
+    FROM atividade at JOIN turma t ON t.id = at.turma_id
+    UNION ALL
+    SELECT d.id * 8 + 5, coalesce(d.titulo || ' ', '') || d.anotacao, 'anotacao', d.id, d.turma_id, d.professor_id
+    FROM diario_anotacao d
+"""
+
+
+def upgrade():
+    # Só SQLite tem FTS5; nos demais bancos a busca usa LIKE nas tabelas de origem.
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for ddl in _DDL:
+        op.execute(ddl)
+    op.execute(_POPULATE)
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "sqlite":
+        return
+    for name in _TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    op.execute("DROP TABLE IF EXISTS busca_fts")
@@ -0,0 +1,32 @@
+"""add composite index for best snapshot per estudante/trimestre
+
+Revision ID: e5b1f7c3a820
+Revises: d9a4c2e71f05
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e5b1f7c3a820"
+down_revision = "d9a4c2e71f05"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("fechamento_trimestre_aluno", schema=None) as batch_op:
+        batch_op.create_index(
+            "ix_fechamento_aluno_ano_estudante_tri",
+            ["ano_letivo", "estudante_id", "trimestre", "created_at"],
+            unique=False,
+        )
+
+
+def downgrade():
+    with op.batch_alter_table("fechamento_trimestre_aluno", schema=None) as batch_op:
+        batch_op.drop_index("ix_fechamento_aluno_ano_estudante_tri")
@@ -0,0 +1,59 @@
+"""add busca trigram indexes (PostgreSQL: pg_trgm over accent-folded columns)
+
+Revision ID: e8b3f5a2c917
+Revises: d1f6a3c8e254
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+import re
+import unicodedata
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e8b3f5a2c917"
+down_revision = "d1f6a3c8e254"
+branch_labels = None
+depends_on = None
+
+
+def _norm_text(value: str) -> str:
+    normalized = unicodedata.normalize("NFKD", value)
+    normalized = "".join(ch for ch in normalized if not unicodedata.combining(ch))
+    return re.sub(r"\s+", " ", normalized).strip().lower()
+
+
+# Cópia de services.busca: a expressão precisa ser a mesma que a busca usa, para o planejador usar o índice.
+_ACENTUADAS = "áàâãäåéèêëíìîïóòôõöúùûüçñýÿÁÀÂÃÄÅÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇÑÝ"
+_SEM_ACENTO = "".join(_norm_text(ch) for ch in _ACENTUADAS)
+
+_INDEXES = [
+    ("ix_busca_trgm_aluno", "aluno", "nome_completo"),
+    ("ix_busca_trgm_estudante", "estudante", "nome_completo"),
+    ("ix_busca_trgm_turma", "turma", "nome"),
+    ("ix_busca_trgm_atividade", "atividade", "titulo"),
+    ("ix_busca_trgm_anotacao", "diario_anotacao", "coalesce(titulo || ' ', '') || anotacao"),
+]
+
+
+def upgrade():
+    # No SQLite a busca usa o FTS5 (d9a4c2e71f05).
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, table, expr in _INDEXES:
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} ON {table} "
+            f"USING gin (lower(translate({expr}, '{_ACENTUADAS}', '{_SEM_ACENTO}')) gin_trgm_ops)"
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != "postgresql":
+        return
+    for name, _table, _expr in _INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
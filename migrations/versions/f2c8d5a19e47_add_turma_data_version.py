@@ -0,0 +1,30 @@
+"""add turma data_version (ETag das páginas da turma)
+
+Revision ID: f2c8d5a19e47
+Revises: e5b1f7c3a820
+Create Date: 2026-10-17
+
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f2c8d5a19e47"
+down_revision = "e5b1f7c3a820"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("turma", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("data_version", sa.Integer(), nullable=False, server_default="0"))
+
+
+def downgrade():
+    # ALTER TABLE ... DROP COLUMN direto (SQLite >= 3.35): o batch recriaria a tabela turma, o que os
+    # gatilhos de busca_fts que a referenciam não permitem.
+    op.drop_column("turma", "data_version")
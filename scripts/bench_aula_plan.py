@@ -0,0 +1,74 @@
+"""Compara a gravação antiga das datas das aulas (uma consulta por número de aula) com `aplicar_plano_aulas`
+(aulas lidas uma vez, mudanças num único flush), ao redatar atividades de 5, 20 e 40 aulas.
+
+Cada rodada muda a data de todas as aulas e desfaz a transação.
+
+Uso: python scripts/bench_aula_plan.py
+"""
+
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from benchlib import count_queries, make_app, seed_professor, seed_turmas, timed
+
+from lancenotas.extensions import db
+from lancenotas.models import Atividade, AtividadeAula
+from lancenotas.services.aula_plan import aplicar_plano_aulas
+
+REPETICOES = 5
+
+
+def redatar_por_aula(*, atividade_id: int, aulas_planejadas: int, datas: dict[int, date | None]) -> None:
+    """Implementação anterior (cópia do laço de turma_configurar_atividade), usada como referência."""
+    for n in range(1, aulas_planejadas + 1):
+        aula = AtividadeAula.query.filter_by(atividade_id=atividade_id, numero=n).first()
+        if aula is None:
+            continue
+        aula.data = datas.get(n)
+    db.session.flush()
+
+
+def redatar_em_lote(*, atividade_id: int, aulas_planejadas: int, datas: dict[int, date | None]) -> None:
+    aplicar_plano_aulas(atividade_id=atividade_id, aulas_planejadas=aulas_planejadas, datas=datas)
+
+
+def _datas(atividade_id: int) -> list[tuple[int, date | None]]:
+    db.session.expire_all()
+    return sorted(
+        (int(numero), data)
+        for numero, data in db.session.query(AtividadeAula.numero, AtividadeAula.data).filter_by(
+            atividade_id=atividade_id
+        )
+    )
+
+
+def main() -> None:
+    app = make_app()
+    with app.app_context():
+        professor = seed_professor()
+        turmas = [
+            seed_turmas(professor_id=professor.id, turmas=1, atividades=1, aulas=n, alunos=5)[0] for n in (5, 20, 40)
+        ]
+        print(f"{'aulas':>5} {'implementação':<18} {'comandos':>10} {'tempo (ms)':>11}")
+        for turma in turmas:
+            atividade = Atividade.query.filter_by(turma_id=turma.id).one()
+            atividade_id = int(atividade.id)
+            total = AtividadeAula.query.filter_by(atividade_id=atividade_id).count()
+            datas = {n: date(2026, 8, 3) + timedelta(days=2 * n) for n in range(1, total + 1)}
+            esperado = None
+            for nome, fn in [("por aula (antigo)", redatar_por_aula), ("plano em lote", redatar_em_lote)]:
+                melhor = float("inf")
+                for _ in range(REPETICOES):
+                    with count_queries() as counter, timed() as elapsed:
+                        fn(atividade_id=atividade_id, aulas_planejadas=total, datas=datas)
+                    melhor = min(melhor, elapsed[0])
+                    resultado = _datas(atividade_id)
+                    db.session.rollback()
+                    esperado = esperado or resultado
+                    assert resultado == esperado, nome
+                print(f"{total:>5} {nome:<18} {counter.count:>10} {melhor * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Mede a busca global (FTS5) num banco com 100 mil anotações de diário.
+
+Uso: python scripts/bench_busca.py
+"""
+
+from __future__ import annotations
+
+import random
+from datetime import date
+
+from benchlib import db, make_app, seed_professor, seed_turmas, timed
+
+from lancenotas.models import DiarioAnotacao
+from lancenotas.services.busca import buscar
+
+ANOTACOES = 100_000
+PALAVRAS = "aula prova leitura desenho pintura escultura música teatro projeto revisão exercício avaliação".split()
+CONSULTAS = ["aluno 3-1", "atividade", "escultura", "musica teatro", "revisao", "xyzzy"]
+
+
+def main() -> None:
+    app = make_app()
+    with app.app_context():
+        professor = seed_professor()
+        outro = seed_professor(nome="Outro Professor", email="outro@example.com")
+        turmas = seed_turmas(professor_id=professor.id, turmas=10, atividades=8, aulas=1, alunos=30)
+        seed_turmas(professor_id=outro.id, turmas=10, atividades=8, aulas=1, alunos=30)
+
+        rng = random.Random(42)
+        db.session.execute(
+            DiarioAnotacao.__table__.insert(),
+            [
+                {
+                    "turma_id": turmas[i % len(turmas)].id,
+                    "professor_id": professor.id,
+                    "data": date.today(),
+                    "titulo": None,
+                    "anotacao": " ".join(rng.choice(PALAVRAS) for _ in range(12)),
+                }
+                for i in range(ANOTACOES)
+            ],
+        )
+        db.session.commit()
+
+        print(f"{'consulta':<16} {'resultados':>10} {'tempo (ms)':>11}")
+        for q in CONSULTAS:
+            buscar(professor_id=professor.id, q=q)  # aquece o cache de páginas
+            with timed() as elapsed:
+                resultados = buscar(professor_id=professor.id, q=q)
+            print(f"{q:<16} {len(resultados):>10} {elapsed[0] * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""Mostra que o número de consultas do dashboard não cresce com o volume de dados, para o cálculo
+completo (linhas por turma, /api/dashboard/turmas) e para os totais dos cartões (página /dashboard).
+
+Uso: python scripts/bench_dashboard_stats.py
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+from benchlib import count_queries, db, make_app, seed_professor, seed_turmas, timed
+
+from lancenotas.services.dashboard_stats import compute_dashboard_stats, compute_dashboard_summary
+
+SIZES = [(1, 5), (4, 10), (12, 25), (20, 40)]  # (turmas, atividades por turma)
+
+
+def main() -> None:
+    today = date.today()
+    print(f"{'turmas':>7} {'atividades':>11} {'cálculo':<9} {'consultas':>10} {'tempo (ms)':>11}")
+    for idx, (turmas, atividades) in enumerate(SIZES):
+        app = make_app()
+        with app.app_context():
+            professor = seed_professor(email=f"bench{idx}@example.com")
+            seed_turmas(professor_id=professor.id, turmas=turmas, atividades=atividades, aulas=2, alunos=25)
+            for nome, fn in [("completo", compute_dashboard_stats), ("cartões", compute_dashboard_summary)]:
+                with count_queries() as counter, timed() as elapsed:
+                    fn(professor_id=professor.id, ano_letivo=2026, today=today)
+                print(f"{turmas:>7} {turmas * atividades:>11} {nome:<9} {counter.count:>10} {elapsed[0] * 1000:>11.1f}")
+            db.session.remove()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Compara o cálculo antigo das médias do trimestre (objetos ORM + dicts por (atividade, aluno)) com o
+grade_engine, numa turma de 45 alunos com 30 atividades × 4 aulas.
+
+Uso: python scripts/bench_grade_engine.py
+"""
+
+from __future__ import annotations
+
+from datetime import date
+
+from benchlib import count_queries, make_app, seed_professor, seed_turmas, timed
+
+from lancenotas.models import Aluno, Atividade, AtividadeAula, LancamentoAulaAluno
+from lancenotas.services.grade_engine import gradebook_from_lancamentos, gradebook_from_stats
+
+REPETICOES = 5
+
+
+def medias_dicts(*, alunos: list[Aluno], atividades: list[Atividade], trimestre: int, today: date) -> dict:
+    """Implementação anterior (cópia do laço de _build_fechamento_snapshots), usada como referência."""
+    atividades = [a for a in atividades if int(a.trimestre) == trimestre]
+    aulas = AtividadeAula.query.filter(AtividadeAula.atividade_id.in_([a.id for a in atividades])).all()
+    lancamentos = LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_([a.id for a in aulas])).all()
+    lancadas = {int(l.aula_id) for l in lancamentos}
+    eligible = [a for a in aulas if (a.data is not None and a.data <= today) or int(a.id) in lancadas]
+    aula_to_atividade = {int(a.id): int(a.atividade_id) for a in eligible}
+    eligible_count: dict[int, int] = {}
+    for a in eligible:
+        eligible_count[int(a.atividade_id)] = eligible_count.get(int(a.atividade_id), 0) + 1
+
+    sums: dict[tuple[int, int], float] = {}
+    atestados: dict[tuple[int, int], int] = {}
+    for l in lancamentos:
+        atividade_id = aula_to_atividade.get(int(l.aula_id))
+        if atividade_id is None:
+            continue
+        key = (atividade_id, int(l.aluno_id))
+        if l.atestado:
+            atestados[key] = atestados.get(key, 0) + 1
+        elif l.nota is not None:
+            sums[key] = sums.get(key, 0.0) + float(l.nota)
+
+    medias = {}
+    for aluno in alunos:
+        tri_sum = 0.0
+        tri_peso = 0.0
+        for atv in atividades:
+            denom = eligible_count.get(int(atv.id), 0) - atestados.get((int(atv.id), int(aluno.id)), 0)
+            if eligible_count.get(int(atv.id), 0) <= 0 or denom <= 0:
+                continue
+            tri_sum += sums.get((int(atv.id), int(aluno.id)), 0.0) / float(denom) * float(atv.peso or 1)
+            tri_peso += float(atv.peso or 1)
+        medias[int(aluno.id)] = round(tri_sum / tri_peso, 2) if tri_peso > 0 else None
+    return medias
+
+
+def main() -> None:
+    today = date.today()
+    app = make_app()
+    with app.app_context():
+        professor = seed_professor()
+        turma = seed_turmas(professor_id=professor.id, turmas=1, atividades=30, aulas=4, alunos=45)[0]
+        alunos = Aluno.query.filter_by(turma_id=turma.id).all()
+        atividades = Atividade.query.filter_by(turma_id=turma.id).all()
+        aluno_ids = [int(a.id) for a in alunos]
+
+        def antigo() -> dict:
+            return {
+                tri: medias_dicts(alunos=alunos, atividades=atividades, trimestre=tri, today=today) for tri in (1, 2, 3)
+            }
+
+        def engine_lancamentos() -> dict:
+            book = gradebook_from_lancamentos(aluno_ids=aluno_ids, atividades=atividades, today=today)
+            return {tri: {k: v.media for k, v in book.resultados_trimestre(tri).items()} for tri in (1, 2, 3)}
+
+        def engine_stats() -> dict:
+            book = gradebook_from_stats(turma_id=turma.id, aluno_ids=aluno_ids, atividades=atividades, today=today)
+            return {tri: {k: v.media for k, v in book.resultados_trimestre(tri).items()} for tri in (1, 2, 3)}
+
+        esperado = antigo()
+        print(f"{'implementação':<24} {'consultas':>10} {'tempo (ms)':>11}")
+        implementacoes = [
+            ("dicts (antigo)", antigo),
+            ("engine (lançamentos)", engine_lancamentos),
+            ("engine (stats)", engine_stats),
+        ]
+        for nome, fn in implementacoes:
+            assert fn() == esperado, nome
+            melhor = float("inf")
+            for _ in range(REPETICOES):
+                with count_queries() as counter, timed() as elapsed:
+                    fn()
+                melhor = min(melhor, elapsed[0])
+            print(f"{nome:<24} {counter.count:>10} {melhor * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""Compara a gravação antiga dos lançamentos de uma aula (uma consulta e uma escrita por aluno) com
+`save_aula_lancamentos` (consulta única + upsert + DELETE em lote), numa turma de 45 alunos, e a grade
+de uma atividade de 6 aulas salva aula por aula com `save_atividade_notas` (a grade inteira de uma vez),
+e o atestado na aula inteira pelo formulário com `operar_coluna` (INSERT … SELECT).
+
+Cada rodada grava a aula (ou a grade) inteira (notas alteradas, atestados e lançamentos apagados) e
+desfaz a transação.
+
+Uso: python scripts/bench_lancamentos.py
+"""
+
+from __future__ import annotations
+
+from benchlib import count_queries, make_app, seed_professor, seed_turmas, timed
+
+from lancenotas.extensions import db
+from lancenotas.models import Aluno, Atividade, AtividadeAlunoStats, AtividadeAula, LancamentoAulaAluno, TurmaStats
+from lancenotas.services.colunas import operar_coluna
+from lancenotas.services.lancamentos import LancamentoEntrada, save_atividade_notas, save_aula_lancamentos
+
+REPETICOES = 5
+
+
+def _contribuicao(nota: float | None, atestado: bool) -> tuple[float, int, int]:
+    if atestado:
+        return 0.0, 0, 1
+    if nota is None:
+        return 0.0, 0, 0
+    return float(nota), 1, 0
+
+
+def salvar_por_aluno(*, turma_id: int, atividade_id: int, aula_id: int, entradas: dict) -> None:
+    """Implementação anterior (cópia do laço de turma_salvar_lancamentos e das estatísticas), usada como referência."""
+    deltas: dict[int, tuple[float, int, int]] = {}
+    for aluno_id, entrada in entradas.items():
+        lanc = LancamentoAulaAluno.query.filter_by(aula_id=aula_id, aluno_id=aluno_id).first()
+        old = _contribuicao(lanc.nota, bool(lanc.atestado)) if lanc is not None else (0.0, 0, 0)
+        if entrada is None:
+            if lanc is not None:
+                db.session.delete(lanc)
+            new = (0.0, 0, 0)
+        else:
+            if lanc is None:
+                lanc = LancamentoAulaAluno(aula_id=aula_id, aluno_id=aluno_id)
+                db.session.add(lanc)
+            lanc.nota, lanc.atestado, lanc.observacao = entrada
+            new = _contribuicao(entrada[0], entrada[1])
+        if new != old:
+            deltas[aluno_id] = (new[0] - old[0], new[1] - old[1], new[2] - old[2])
+
+    rows = AtividadeAlunoStats.query.filter(
+        AtividadeAlunoStats.atividade_id == atividade_id, AtividadeAlunoStats.aluno_id.in_(list(deltas))
+    ).all()
+    for row in rows:
+        d_sum, d_count, d_atestados = deltas[int(row.aluno_id)]
+        row.notas_sum += d_sum
+        row.notas_count += d_count
+        row.atestados_count += d_atestados
+    stats = db.session.get(TurmaStats, turma_id)
+    stats.notas_sum += sum(d[0] for d in deltas.values())
+    stats.notas_count += sum(d[1] for d in deltas.values())
+    stats.atestados_count += sum(d[2] for d in deltas.values())
+    db.session.flush()
+
+
+def _estado(aula_ids: list[int], atividade_id: int) -> tuple:
+    db.session.expire_all()
+    lancamentos = sorted(
+        (int(l.aula_id), int(l.aluno_id), l.nota, bool(l.atestado), l.observacao)
+        for l in LancamentoAulaAluno.query.filter(LancamentoAulaAluno.aula_id.in_(aula_ids))
+    )
+    stats = sorted(
+        (int(s.aluno_id), round(s.notas_sum, 6), s.notas_count, s.atestados_count)
+        for s in AtividadeAlunoStats.query.filter_by(atividade_id=atividade_id)
+    )
+    return lancamentos, stats
+
+
+def _entradas(alunos: list[Aluno], deslocamento: int = 0) -> dict[int, LancamentoEntrada | None]:
+    """Aula reenviada inteira: um terço das notas muda, alguns viram atestado, alguns são apagados."""
+    entradas: dict[int, LancamentoEntrada | None] = {}
+    for i, aluno in enumerate(alunos):
+        j = i + deslocamento
+        if j % 9 == 4:
+            entradas[int(aluno.id)] = None
+        elif j % 9 == 7:
+            entradas[int(aluno.id)] = (None, True, None)
+        elif j % 3 == 0:
+            entradas[int(aluno.id)] = (float((i + 3) % 11), False, None)
+        else:
+            entradas[int(aluno.id)] = (None, True, None) if i % 10 == 0 else (float(i % 11), False, None)
+    return entradas
+
+
+def _medir(nome: str, fn, estado, esperado: tuple | None) -> tuple:
+    melhor = float("inf")
+    for _ in range(REPETICOES):
+        with count_queries() as counter, timed() as elapsed:
+            fn()
+        melhor = min(melhor, elapsed[0])
+        resultado = estado()
+        db.session.rollback()
+        esperado = esperado or resultado
+        assert resultado == esperado, nome
+    print(f"{nome:<24} {counter.count:>10} {melhor * 1000:>11.1f}")
+    return esperado
+
+
+def main() -> None:
+    app = make_app()
+    with app.app_context():
+        professor = seed_professor()
+        turma = seed_turmas(professor_id=professor.id, turmas=1, atividades=6, aulas=6, alunos=45)[0]
+        atividade = Atividade.query.filter_by(turma_id=turma.id).first()
+        aulas = AtividadeAula.query.filter_by(atividade_id=atividade.id).order_by(AtividadeAula.numero).all()
+        alunos = Aluno.query.filter_by(turma_id=turma.id).order_by(Aluno.numero_chamada).all()
+        turma_id, atividade_id, professor_id = int(turma.id), int(atividade.id), int(professor.id)
+        aula_id = int(aulas[0].id)
+        entradas = _entradas(alunos)
+        grade = {int(aula.id): _entradas(alunos, deslocamento=k) for k, aula in enumerate(aulas)}
+
+        def aula_por_aluno() -> None:
+            salvar_por_aluno(turma_id=turma_id, atividade_id=atividade_id, aula_id=aula_id, entradas=entradas)
+
+        def aula_em_lote() -> None:
+            save_aula_lancamentos(
+                turma_id=turma_id,
+                atividade_id=atividade_id,
+                aula_id=aula_id,
+                professor_id=professor_id,
+                entradas=entradas,
+            )
+            db.session.flush()
+
+        def grade_por_aula() -> None:
+            for aula_id_, entradas_ in grade.items():
+                salvar_por_aluno(turma_id=turma_id, atividade_id=atividade_id, aula_id=aula_id_, entradas=entradas_)
+
+        def grade_em_lote() -> None:
+            save_atividade_notas(
+                turma_id=turma_id,
+                atividade_id=atividade_id,
+                professor_id=professor_id,
+                notas={
+                    (aula_id_, aluno_id): (e[0], e[1]) if e is not None else None
+                    for aula_id_, entradas_ in grade.items()
+                    for aluno_id, e in entradas_.items()
+                },
+            )
+            db.session.flush()
+
+        print(f"{'implementação':<24} {'comandos':>10} {'tempo (ms)':>11}")
+        esperado = None
+        for nome, fn in [("por aluno (antigo)", aula_por_aluno), ("upsert em lote", aula_em_lote)]:
+            esperado = _medir(nome, fn, lambda: _estado([aula_id], atividade_id), esperado)
+
+        print(f"\ngrade de {len(aulas)} aulas × {len(alunos)} alunos")
+        esperado = None
+        for nome, fn in [("aula por aula (antigo)", grade_por_aula), ("grade em lote", grade_em_lote)]:
+            esperado = _medir(nome, fn, lambda: _estado(list(grade), atividade_id), esperado)
+
+        # Atestado para a turma inteira numa aula: digitado linha a linha e salvo, ou `operar_coluna`.
+        observacoes = {
+            int(l.aluno_id): l.observacao for l in LancamentoAulaAluno.query.filter_by(aula_id=aula_id)
+        }
+        ativos = [int(a.id) for a in alunos if a.status == "ativo"]
+
+        def coluna_pelo_formulario() -> None:
+            save_aula_lancamentos(
+                turma_id=turma_id,
+                atividade_id=atividade_id,
+                aula_id=aula_id,
+                professor_id=professor_id,
+                entradas={aluno_id: (None, True, observacoes.get(aluno_id)) for aluno_id in ativos},
+            )
+            db.session.flush()
+
+        def coluna_em_conjunto() -> None:
+            operar_coluna(
+                turma_id=turma_id,
+                atividade_id=atividade_id,
+                aula_id=aula_id,
+                professor_id=professor_id,
+                operacao="preencher",
+                valor=(None, True),
+            )
+            db.session.flush()
+
+        print(f"\natestado na aula inteira ({len(ativos)} alunos ativos)")
+        esperado = None
+        for nome, fn in [("formulário da aula", coluna_pelo_formulario), ("operação na coluna", coluna_em_conjunto)]:
+            esperado = _medir(nome, fn, lambda: _estado([aula_id], atividade_id), esperado)
+
+if __name__ == "__main__":
+    main()
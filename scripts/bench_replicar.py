@@ -0,0 +1,76 @@
+"""Compara a criação manual de uma atividade em cada turma (uma atividade e suas aulas por vez, como em
+turma_criar_atividade) com `replicar_atividade` (um INSERT de atividades e um de aulas para todas as
+turmas), ao copiar atividades de 5 e 20 aulas para 4 e 12 turmas.
+
+Cada rodada desfaz a transação.
+
+Uso: python scripts/bench_replicar.py
+"""
+
+from __future__ import annotations
+
+from benchlib import count_queries, make_app, seed_professor, seed_turmas, timed
+
+from lancenotas.extensions import db
+from lancenotas.models import Atividade, AtividadeAula, Turma
+from lancenotas.services.aula_plan import aplicar_plano_aulas
+from lancenotas.services.replicacao import replicar_atividade
+
+REPETICOES = 5
+
+
+def criar_por_turma(*, atividade: Atividade, turmas: list[Turma]) -> None:
+    """Referência: o que o professor fazia à mão, uma atividade por turma."""
+    for turma in turmas:
+        copia = Atividade(
+            turma_id=turma.id,
+            titulo=atividade.titulo,
+            descricao=atividade.descricao,
+            trimestre=atividade.trimestre,
+            aulas_planejadas=atividade.aulas_planejadas,
+            nota_maxima=atividade.nota_maxima,
+            status=atividade.status,
+        )
+        db.session.add(copia)
+        db.session.flush()
+        aplicar_plano_aulas(atividade_id=int(copia.id), aulas_planejadas=int(atividade.aulas_planejadas))
+
+
+def replicar_em_lote(*, atividade: Atividade, turmas: list[Turma]) -> None:
+    replicar_atividade(atividade=atividade, turmas=turmas)
+
+
+def main() -> None:
+    app = make_app()
+    with app.app_context():
+        professor = seed_professor()
+        turmas = seed_turmas(professor_id=professor.id, turmas=13, atividades=0, aulas=1, alunos=1)
+        origem, destinos = turmas[0], turmas[1:]
+        print(f"{'aulas':>5} {'turmas':>6} {'implementação':<18} {'comandos':>10} {'tempo (ms)':>11}")
+        for aulas in (5, 20):
+            atividade = Atividade(turma_id=origem.id, titulo=f"Projeto {aulas}", trimestre=1, aulas_planejadas=aulas)
+            db.session.add(atividade)
+            db.session.flush()
+            db.session.add_all(AtividadeAula(atividade_id=atividade.id, numero=n) for n in range(1, aulas + 1))
+            db.session.commit()
+            for n_turmas in (4, 12):
+                alvo = destinos[:n_turmas]
+                for nome, fn in [("por turma (antigo)", criar_por_turma), ("replicar em lote", replicar_em_lote)]:
+                    melhor = float("inf")
+                    for _ in range(REPETICOES):
+                        # O rollback anterior expira os objetos; recarrega fora da medição.
+                        for objeto in [atividade, *alvo]:
+                            db.session.refresh(objeto)
+                        with count_queries() as counter, timed() as elapsed:
+                            fn(atividade=atividade, turmas=alvo)
+                        melhor = min(melhor, elapsed[0])
+                        criadas = AtividadeAula.query.join(Atividade).filter(
+                            Atividade.turma_id.in_([t.id for t in alvo])
+                        ).count()
+                        db.session.rollback()
+                        assert criadas == aulas * n_turmas, nome
+                    print(f"{aulas:>5} {n_turmas:>6} {nome:<18} {counter.count:>10} {melhor * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
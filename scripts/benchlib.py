@@ -0,0 +1,144 @@
+"""Utilitários compartilhados pelos scripts de benchmark (banco SQLite em memória)."""
+
+from __future__ import annotations
+
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+from typing import Iterator
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_DIR not in sys.path:
+    sys.path.insert(0, PROJECT_DIR)
+
+from sqlalchemy import event  # noqa: E402
+
+from lancenotas import create_app  # noqa: E402
+from lancenotas.extensions import db  # noqa: E402
+from lancenotas.models import (  # noqa: E402
+    Aluno,
+    Atividade,
+    AtividadeAula,
+    LancamentoAulaAluno,
+    Professor,
+    Turma,
+)
+from lancenotas.services.busca import install_busca_index  # noqa: E402
+from lancenotas.services.turma_stats import rebuild_stats  # noqa: E402
+
+
+def make_app():
+    os.environ["DATABASE_URL"] = "sqlite://"
+    app = create_app()
+    app.config.update(TESTING=True)
+    with app.app_context():
+        db.create_all()
+        install_busca_index()
+        db.session.commit()
+    return app
+
+
+class QueryCounter:
+    def __init__(self) -> None:
+        self.count = 0
+
+    def __call__(self, *args, **kwargs) -> None:
+        self.count += 1
+
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    counter = QueryCounter()
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", counter)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter)
+
+
+@contextmanager
+def timed() -> Iterator[list[float]]:
+    elapsed: list[float] = [0.0]
+    start = time.perf_counter()
+    try:
+        yield elapsed
+    finally:
+        elapsed[0] = time.perf_counter() - start
+
+
+def seed_professor(*, nome: str = "Professor Benchmark", email: str = "bench@example.com") -> Professor:
+    professor = Professor(nome=nome, email=email, senha_hash="x")
+    db.session.add(professor)
+    db.session.flush()
+    return professor
+
+
+def seed_turmas(
+    *,
+    professor_id: int,
+    turmas: int,
+    atividades: int,
+    aulas: int,
+    alunos: int,
+    ano_letivo: int = 2026,
+    today: date | None = None,
+) -> list[Turma]:
+    """Cria turmas completas com lançamentos em todas as aulas (alunos alternam nota/atestado).
+
+    Os dados são inseridos direto pelo ORM, então as estatísticas materializadas são recalculadas no fim.
+    """
+    today = today or date.today()
+    created: list[Turma] = []
+    for t in range(turmas):
+        turma = Turma(
+            professor_id=professor_id,
+            nome=f"6º {chr(65 + t % 8)}{t} - Arte - Manhã",
+            serie="6º",
+            turma_letra=chr(65 + t % 8),
+            disciplina="Arte",
+            ano_letivo=ano_letivo,
+        )
+        db.session.add(turma)
+        db.session.flush()
+
+        roster = [
+            Aluno(turma_id=turma.id, nome_completo=f"Aluno {t}-{n}", numero_chamada=n, status="ativo")
+            for n in range(1, alunos + 1)
+        ]
+        db.session.add_all(roster)
+
+        for a in range(atividades):
+            atividade = Atividade(
+                turma_id=turma.id,
+                titulo=f"Atividade {a + 1}",
+                trimestre=1 + a % 3,
+                aulas_planejadas=aulas,
+                status="ativa",
+            )
+            db.session.add(atividade)
+            db.session.flush()
+            aula_rows = [
+                AtividadeAula(atividade_id=atividade.id, numero=n, data=today - timedelta(days=n))
+                for n in range(1, aulas + 1)
+            ]
+            db.session.add_all(aula_rows)
+            db.session.flush()
+            for aula in aula_rows:
+                db.session.add_all(
+                    [
+                        LancamentoAulaAluno(
+                            aula_id=aula.id,
+                            aluno_id=aluno.id,
+                            nota=None if i % 10 == 0 else float(i % 11),
+                            atestado=i % 10 == 0,
+                        )
+                        for i, aluno in enumerate(roster)
+                    ]
+                )
+        created.append(turma)
+    rebuild_stats()
+    db.session.commit()
+    return created
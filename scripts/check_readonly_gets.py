@@ -0,0 +1,124 @@
+"""Confere que nenhuma página GET escreve no banco.
+
+Visita cada rota GET da aplicação (com as variantes de aba, fragmento e filtros que mudam o que a página
+lê) como um professor administrador, registrando no engine todo comando SQL que não seja leitura. Depois
+confere que a proteção de lancenotas/readonly.py barra um UPDATE textual durante um GET.
+Sai com código 1 se alguma página escreveu, falhou ou ficou sem visita.
+
+Uso: python scripts/check_readonly_gets.py
+"""
+
+from __future__ import annotations
+
+import sys
+
+from benchlib import db, make_app, seed_professor, seed_turmas
+from sqlalchemy import event, text
+from werkzeug.security import generate_password_hash
+
+from lancenotas.models import Aluno, Atividade, AtividadeAula, DiarioAnotacao, HorarioEvento
+from lancenotas.readonly import ReadOnlyRequestError, is_read_only_statement
+
+# Rotas GET que não são páginas da aplicação.
+IGNORADAS = {"static", "auth.login"}
+
+
+def _urls(ids: dict[str, int]) -> dict[str, list[str]]:
+    turma, atividade = ids["turma_id"], ids["atividade_id"]
+    return {
+        "pages.index": ["/"],
+        "pages.dashboard": ["/dashboard"],
+        "pages.dashboard_cache_stats": ["/dashboard/cache"],
+        "pages.busca": ["/busca?q=aluno", "/busca?q=pintura"],
+        "pages.turmas": ["/turmas", "/turmas?q=arte&ordem=nome&page=1"],
+        "pages.turma_detail": [
+            f"/turmas/{turma}",
+            f"/turmas/{turma}?tab=atividades&trimestre=1&atividade_id={atividade}&aula=2",
+        ],
+        "pages.turma_detail_fragmento": [
+            f"/turmas/{turma}/fragmentos/{parte}?trimestre=1&atividade_id={atividade}&aula=1"
+            for parte in ("detalhes", "atividades", "notas", "medias")
+        ],
+        "pages.turma_atividade_matriz": [f"/turmas/{turma}/atividades/{atividade}/matriz"],
+        "pages.turma_aluno_historico": [f"/turmas/{turma}/alunos/{ids['aluno_id']}/historico"],
+        "pages.turma_aula_historico": [f"/turmas/{turma}/aulas/{ids['aula_id']}/historico"],
+        "pages.turma_diario": [f"/turmas/{turma}/diario"],
+        "pages.atividades": ["/atividades"],
+        "pages.fechamento": ["/fechamento", f"/fechamento?turma_id={turma}&trimestre=1"],
+        "pages.horario": ["/horario"],
+        "pages.configuracoes": ["/configuracoes"],
+        "api.dashboard_summary": ["/api/dashboard/summary"],
+        "api.dashboard_turmas": ["/api/dashboard/turmas"],
+        "api.dashboard_tendencia": ["/api/dashboard/tendencia?dias=30"],
+        "admin.painel": ["/admin/painel", "/admin/painel?page=1"],
+        "admin.painel_csv": ["/admin/painel.csv"],
+    }
+
+
+def main() -> int:
+    app = make_app()
+    falhas: list[str] = []
+    with app.app_context():
+        professor = seed_professor()
+        professor.senha_hash = generate_password_hash("senha")
+        professor.is_admin = True
+        turma = seed_turmas(professor_id=professor.id, turmas=2, atividades=3, aulas=2, alunos=4)[0]
+        atividade = Atividade.query.filter_by(turma_id=turma.id, trimestre=1).first()
+        aula = AtividadeAula.query.filter_by(atividade_id=atividade.id).first()
+        db.session.add(DiarioAnotacao(turma_id=turma.id, professor_id=professor.id, titulo="Pintura", anotacao="Tinta"))
+        db.session.add(HorarioEvento(professor_id=professor.id, dia_semana=1, hora="07:30", periodo="Manhã", titulo="HA"))
+        db.session.commit()
+        ids = {
+            "turma_id": int(turma.id),
+            "atividade_id": int(atividade.id),
+            "aula_id": int(aula.id),
+            "aluno_id": int(Aluno.query.filter_by(turma_id=turma.id).first().id),
+        }
+        email = professor.email
+
+        urls = _urls(ids)
+        for rule in app.url_map.iter_rules():
+            if "GET" in rule.methods and rule.endpoint not in IGNORADAS and rule.endpoint not in urls:
+                falhas.append(f"{rule.rule}: rota GET sem visita neste script")
+
+        escritas: list[str] = []
+
+        def spy(_conn, _cursor, statement, _parameters, _context, _executemany) -> None:
+            if not is_read_only_statement(statement):
+                escritas.append(" ".join(statement.split())[:100])
+
+        client = app.test_client()
+        client.post("/login", data={"email": email, "senha": "senha"})
+        event.listen(db.engine, "before_cursor_execute", spy)
+        try:
+            for url in (u for lista in urls.values() for u in lista):
+                escritas.clear()
+                try:
+                    status = client.get(url).status_code
+                except Exception as exc:  # noqa: BLE001 - o script relata qualquer falha da página
+                    falhas.append(f"{url}: {type(exc).__name__}: {exc}")
+                    continue
+                if status >= 500:
+                    falhas.append(f"{url}: HTTP {status}")
+                falhas.extend(f"{url}: {sql}" for sql in escritas)
+                print(f"{status} {url}")
+        finally:
+            event.remove(db.engine, "before_cursor_execute", spy)
+
+        with app.test_request_context("/verificacao", method="GET"):
+            try:
+                db.session.execute(text("UPDATE turma SET nome = nome WHERE id = :id"), {"id": ids["turma_id"]})
+                falhas.append("UPDATE textual num GET não foi barrado")
+            except ReadOnlyRequestError:
+                pass
+            finally:
+                db.session.rollback()
+
+    for falha in falhas:
+        print(f"FALHA {falha}", file=sys.stderr)
+    print("ok" if not falhas else f"{len(falhas)} falha(s)")
+    return 1 if falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())